@@ -5,20 +5,21 @@ import json
 import re
 
 import requests
-import yaml
 import queue
 import re
 import threading
 from typing import Any, Callable, Dict, List, Set, Tuple
-import sys
 import loguru
 import time
 
 from constant.chatgpt_config import ChatGPTCommandType
 from model.method import Method
 from model.request_response import Request, Response
-from util.chatgpt import ChatGPT
-import concurrent.futures
+from algo.prompt_context import PromptContextBuilder
+from util.chatgpt import PROVIDER, ChatGPT, get_rate_limiter
+from util.deadline import DeadlineExceeded
+from util.llm_cache import LLMCache
+from util.priority_task_queue import PriorityTaskQueue
 
 logger = loguru.logger
 
@@ -27,12 +28,12 @@ class APIRequester:
     def __init__(self, fuzzer: "Fuzzer", target_method: Method):
         self.fuzzer: "Fuzzer" = fuzzer
         self.target_method: Method = target_method
-        self.chatgpt: ChatGPT = ChatGPT()
+        self.chatgpt: ChatGPT = fuzzer.chatgpt_agent.chatgpt
 
-    def _assemble_method_list(self, method_list: List[Method]) -> str:
-        method_str_list: List[str] = [f"- {method.method_type.value.upper()} {method.method_path} {method.description}"
-                                      for method in method_list]
-        return "".join(method_str_list)
+    def _assemble_method_list(self, target_method: Method) -> str:
+        return self.fuzzer.chatgpt_agent.prompt_context.build_method_list(
+            target_method, self.fuzzer.config.prompt_token_budget
+        )
 
     def extract_api_info(self, text):
         # Define the regular expression pattern to match the API method and path
@@ -74,7 +75,7 @@ Plan: 1. GET /products/search to search for couches
 
 Here are endpoints you can use. Do not reference any of the endpoints above.
 
-{self._assemble_method_list(list(self.fuzzer.operation_id_to_method_map.values()))}
+{self._assemble_method_list(self.target_method)}
 
 ----
 
@@ -92,18 +93,9 @@ Plan:
         return method_sequence, raw_response
 
     def _get_method_list_description(self, method_list: List[Method]):
-        method_doc_description_str = ""
-        for method in method_list:
-            method_doc_dict = {
-                "description": method.description,
-                "parameters": method.method_raw_body.get("parameters", method.method_raw_body.get("requestBody", [])),
-                "responses": method.method_raw_body.get("responses", {}).get("200", [])
-            }
-            method_doc_description_str += f"""
-== Docs for {method.method_type.value.upper()} {method.method_path} ==
-{yaml.dump(method_doc_dict)}
-        """
-        return method_doc_description_str
+        return self.fuzzer.chatgpt_agent.prompt_context.build_documentation(
+            method_list, self.fuzzer.config.prompt_document_token_budget
+        )
 
     def _generate_parameter_value(self, api_doc: str, plan: str, thought: str):
         prompt = f"""You are an agent that gets a sequence of API calls and given their documentation, should execute them and return the final response. Do not generate observations and only generate one Action and one Action Input.
@@ -192,6 +184,10 @@ Output:"""
             if self.target_method not in self.fuzzer.never_success_method_set:
                 return
 
+            # every step waits for the model, stop between steps at the deadline
+            if self.fuzzer.deadline.is_expired:
+                return
+
             # generate parameter value
             raw_response, prompt = self._generate_parameter_value(doc_description, plan, thought)
 
@@ -208,7 +204,7 @@ Output:"""
             response: Response = self.fuzzer.sequence_converter.request_chatgpt_single_instance(method, request_url,
                                                                                                 request_data, session)
             # if not success then return
-            if response.status_code > 300:
+            if response is None or response.status_code > 300:
                 return
 
             if method == self.target_method:
@@ -228,44 +224,99 @@ Output:"""
             thought += f"{raw_response}\nObservation: {parsed_response}\nThought: "
 
 
-EXECUTOR_NUMBER = 2
+# seconds a consumer waits for a task before checking the deadline again
+TASK_POLL_INTERVAL = 0.5
 
 
 class ChatGPTAgent:
+    """
+    Consumer threads running an APIRequester for the methods submitted to the task queue.
+    Methods are queued once and ranked by expected gain. The threads are daemons and stop
+    at the deadline of the fuzzer or on shutdown, a call to the model still running then
+    is abandoned.
+    """
+
     def __init__(self, fuzzer: "Fuzzer"):
         self.fuzzer: "Fuzzer" = fuzzer
-        self.task_queue: queue.Queue = queue.Queue()
-        self.consumers: List[Callable] = [self._execute_api_requester] * EXECUTOR_NUMBER
-        self.executor: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(
-            max_workers=EXECUTOR_NUMBER)
-        self.future_list: List[concurrent.futures.Future] = []
-        threading.Thread(target=self.execute).start()
+        config = fuzzer.config
+        self.task_queue: PriorityTaskQueue = PriorityTaskQueue(config.chatgpt_task_queue_size)
+        self.consumers: List[Callable] = [self._execute_api_requester] * config.chatgpt_worker_count
+        self.thread_list: List[threading.Thread] = []
+        self._stop_event: threading.Event = threading.Event()
+        # requester runs per method, repeated failures lower the expected gain
+        self.attempt_count_map: Dict[Method, int] = {}
+        self.llm_cache: LLMCache = None
+        if config.llm_cache_dir:
+            self.llm_cache = LLMCache(
+                config.llm_cache_dir, config.llm_cache_ttl, config.llm_cache_max_size
+            )
+        self.chatgpt: ChatGPT = ChatGPT(
+            self.llm_cache,
+            replay=config.llm_mode == "replay",
+            rate_limiter=(
+                get_rate_limiter(PROVIDER, config.llm_rate_limit, config.llm_rate_burst)
+                if config.llm_rate_limit > 0 else None
+            ),
+            metrics=fuzzer.metrics,
+            stop_event=self._stop_event,
+        )
+        self.prompt_context: PromptContextBuilder = PromptContextBuilder(fuzzer.graph)
+        self.task_counter = fuzzer.metrics.counter(
+            "morest_llm_tasks_total", "Api requester runs, by result"
+        )
+        self.task_queue_gauge = fuzzer.metrics.gauge(
+            "morest_llm_task_queue_size", "Methods waiting for an api requester"
+        )
+        self.task_dropped_gauge = fuzzer.metrics.gauge(
+            "morest_llm_tasks_dropped", "Methods dropped from the full task queue"
+        )
+
+    def expected_gain(self, method: Method) -> float:
+        """
+        Methods with many consumers in the ODG unlock more sequences once they succeed,
+        methods tried often without success are less likely to succeed next time
+        """
+        consumer_count = len(self.fuzzer.graph.get_consumers(method))
+        return (1 + consumer_count) / (1 + self.attempt_count_map.get(method, 0))
+
+    def submit(self, method: Method) -> bool:
+        """
+        Queue a method for an api requester, a method already queued or running is not added again
+        """
+        is_queued = self.task_queue.put(method, self.expected_gain(method))
+        self.task_queue_gauge.set(len(self.task_queue))
+        self.task_dropped_gauge.set(self.task_queue.dropped_count)
+        return is_queued
 
     def consumer(self, task):
-        return
         # disable chatgpt
         if not self.fuzzer.config.enable_chatgpt:
             logger.info("chatgpt disabled")
             return
 
-        while True:
+        while not self._stop_event.is_set():
             # check if time budget is reached
-            if self.fuzzer.begin_time + self.fuzzer.time_budget < time.time():
+            if self.fuzzer.deadline.is_expired:
                 logger.info(f"time budget reached: {self.fuzzer.time_budget}s")
                 return
 
-            if not self.task_queue.empty():
-                data = self.task_queue.get()
-                try:
-                    task(data)
-                except Exception as e:
-                    logger.error(e)
-
-    def check_exception(self) -> bool:
-        for future in self.futures:
-            if future.exception():
-                logger.info(f"An exception occurred: {future.exception()}")
-                sys.exit(1)
+            # blocks until a method is submitted, wakes up on shutdown
+            data = self.task_queue.get(timeout=TASK_POLL_INTERVAL)
+            if data is None:
+                continue
+            self.task_queue_gauge.set(len(self.task_queue))
+            self.attempt_count_map[data] = self.attempt_count_map.get(data, 0) + 1
+            try:
+                task(data)
+                self.task_counter.inc(result="done")
+            except DeadlineExceeded as e:
+                logger.info(f"abandoned the api requester for {data.signature}: {e}")
+                self.task_counter.inc(result="abandoned")
+            except Exception as e:
+                logger.error(e)
+                self.task_counter.inc(result="failed")
+            finally:
+                self.task_queue.task_done(data)
 
     def _execute_api_requester(self, target_method: Method):
         logger.info(f"execute api requester for {target_method.signature}")
@@ -273,8 +324,27 @@ class ChatGPTAgent:
         requester.run()
 
     def execute(self):
-        for task in self.consumers:
-            future = self.executor.submit(self.consumer, task)
-            self.future_list.append(future)
-        # add exception checker
-        # self.future_list.append(self.executor.submit(self.check_exception))
+        for index, task in enumerate(self.consumers):
+            thread = threading.Thread(
+                target=self.consumer, args=(task,), name=f"chatgpt-agent-{index}", daemon=True
+            )
+            thread.start()
+            self.thread_list.append(thread)
+
+    def shutdown(self, timeout: float) -> bool:
+        """
+        Stop the consumers and wait for them up to timeout seconds in total
+
+        :return: False if a consumer is still running
+        """
+        self._stop_event.set()
+        self.task_queue.close()
+        end_time = time.time() + timeout
+        for thread in self.thread_list:
+            thread.join(timeout=max(0.0, end_time - time.time()))
+        if self.llm_cache is not None:
+            logger.info(
+                f"llm cache: {self.llm_cache.hit_count} hits, {self.llm_cache.miss_count} misses, "
+                f"{self.chatgpt.stub_count} stub responses"
+            )
+        return not any(thread.is_alive() for thread in self.thread_list)
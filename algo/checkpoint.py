@@ -0,0 +1,401 @@
+import gzip
+import json
+import os
+import pathlib
+import re
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import loguru
+
+from constant.parameter import ParameterType
+from model.method import Method
+from model.parameter import ParameterAttribute
+from model.parameter_dependency import ParameterDependency
+
+logger = loguru.logger
+
+# checkpoint format, bumped on incompatible changes
+CHECKPOINT_VERSION = 1
+BASE_FILE_NAME = "base.json.gz"
+DELTA_FILE_PATTERN = re.compile(r"delta-(\d+)\.json\.gz$")
+
+# a state is a map of sections, each section a map of entries keyed by a string
+State = Dict[str, Dict[str, Any]]
+
+
+def _write_atomic(path: pathlib.Path, document: Dict[str, Any]) -> int:
+    """
+    :return: bytes written
+    """
+    data = gzip.compress(json.dumps(document, ensure_ascii=False).encode("utf-8"))
+    with tempfile.NamedTemporaryFile(
+            "wb", dir=path.parent, suffix=".tmp", delete=False
+    ) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f.name, path)
+    return len(data)
+
+
+def _read(path: pathlib.Path) -> Dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _json_value_list(value_list) -> List[Any]:
+    """
+    The values which survive a round trip through json, bytes bodies are dropped
+    """
+    value_list = list(value_list)
+    try:
+        json.dumps(value_list)
+        return value_list
+    except (TypeError, ValueError):
+        pass
+    json_value_list = []
+    for value in value_list:
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        json_value_list.append(value)
+    return json_value_list
+
+
+class CheckpointWriter:
+    """
+    Checkpoints in a directory: a full base state and the deltas written after it, gzipped json.
+    A delta holds the entries changed since the previous checkpoint and the removed keys, a new
+    base is written when the deltas add up to the size of the base. Every file is written to a
+    temporary name and renamed, a run killed while writing leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, checkpoint_dir: pathlib.Path, max_delta_count: int = 50):
+        self.checkpoint_dir: pathlib.Path = pathlib.Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.max_delta_count: int = max_delta_count
+        self.last_state: State = None
+        self.index: int = 0
+        self.base_size: int = 0
+        self.delta_size: int = 0
+        self.delta_count: int = 0
+
+    def _delta_path(self, index: int) -> pathlib.Path:
+        return self.checkpoint_dir / f"delta-{index:08d}.json.gz"
+
+    def resume_from(self, state: State, index: int):
+        """
+        Continue the checkpoints of a restored run in its directory
+        """
+        self.last_state = state
+        self.index = index
+        # the next checkpoint is a base, deltas are not written against a state read from deltas
+        self.delta_count = self.max_delta_count
+
+    def write(self, state: State) -> int:
+        """
+        :return: bytes written
+        """
+        self.index += 1
+        if (
+                self.last_state is None
+                or self.delta_count >= self.max_delta_count
+                or self.delta_size > self.base_size
+        ):
+            size = _write_atomic(
+                self.checkpoint_dir / BASE_FILE_NAME,
+                {"version": CHECKPOINT_VERSION, "index": self.index, "state": state},
+            )
+            # deltas of the previous base are outdated now
+            for path in self.checkpoint_dir.glob("delta-*.json.gz"):
+                path.unlink()
+            self.base_size = size
+            self.delta_size = 0
+            self.delta_count = 0
+            logger.info(f"checkpoint {self.index}: base of {size} bytes")
+        else:
+            changed_state: State = {}
+            removed_key_map: Dict[str, List[str]] = {}
+            for section, entry_map in state.items():
+                last_entry_map = self.last_state.get(section, {})
+                changed_entry_map = {
+                    key: entry
+                    for key, entry in entry_map.items()
+                    if last_entry_map.get(key, None) != entry
+                }
+                if changed_entry_map:
+                    changed_state[section] = changed_entry_map
+                removed_key_list = [key for key in last_entry_map if key not in entry_map]
+                if removed_key_list:
+                    removed_key_map[section] = removed_key_list
+            size = _write_atomic(
+                self._delta_path(self.index),
+                {
+                    "version": CHECKPOINT_VERSION,
+                    "index": self.index,
+                    "state": changed_state,
+                    "removed": removed_key_map,
+                },
+            )
+            self.delta_size += size
+            self.delta_count += 1
+            logger.info(f"checkpoint {self.index}: delta of {size} bytes")
+        self.last_state = state
+        return size
+
+
+def load_checkpoint(checkpoint_dir: pathlib.Path) -> Optional[Tuple[State, int]]:
+    """
+    Read the base state of a directory and apply its deltas in order
+
+    :return: the state and the index of the last checkpoint, None if there is no checkpoint
+    """
+    checkpoint_dir = pathlib.Path(checkpoint_dir)
+    base_path = checkpoint_dir / BASE_FILE_NAME
+    if not base_path.exists():
+        return None
+    base = _read(base_path)
+    if base.get("version", None) != CHECKPOINT_VERSION:
+        raise ValueError(f"unsupported checkpoint version {base.get('version', None)} in {checkpoint_dir}")
+    state: State = base["state"]
+    index: int = base["index"]
+
+    delta_list = []
+    for path in checkpoint_dir.glob("delta-*.json.gz"):
+        match = DELTA_FILE_PATTERN.search(path.name)
+        if match is not None and int(match.group(1)) > index:
+            delta_list.append((int(match.group(1)), path))
+    for delta_index, path in sorted(delta_list):
+        if delta_index != index + 1:
+            # a missing delta, the later ones do not apply
+            logger.warning(f"checkpoint {index + 1} is missing, ignoring the later ones")
+            break
+        try:
+            delta = _read(path)
+        except (OSError, ValueError, EOFError) as e:
+            logger.warning(f"checkpoint {delta_index} is unreadable: {e}")
+            break
+        for section, entry_map in delta["state"].items():
+            state.setdefault(section, {}).update(entry_map)
+        for section, removed_key_list in delta["removed"].items():
+            for key in removed_key_list:
+                state.get(section, {}).pop(key, None)
+        index = delta_index
+    return state, index
+
+
+def _dependency_key(source: str, parameter_dependency: ParameterDependency) -> str:
+    return "\t".join(
+        [
+            source,
+            parameter_dependency.producer.endpoint,
+            parameter_dependency.producer_parameter.attribute_path,
+            parameter_dependency.consumer.endpoint,
+            parameter_dependency.consumer_parameter.attribute_path,
+        ]
+    )
+
+
+def _dependency_entry(parameter_dependency: ParameterDependency, is_promoted: bool) -> Dict[str, Any]:
+    return {
+        "producer": parameter_dependency.producer.endpoint,
+        "producer_parameter": parameter_dependency.producer_parameter.attribute_path,
+        "producer_parameter_type": parameter_dependency.producer_parameter.parameter_type.value,
+        "consumer": parameter_dependency.consumer.endpoint,
+        "consumer_parameter": parameter_dependency.consumer_parameter.attribute_path,
+        "match_rule": parameter_dependency.match_rule,
+        "N": parameter_dependency.N,
+        "Q": parameter_dependency.Q,
+        "promoted": is_promoted,
+    }
+
+
+def capture_runtime_values(runtime_dictionary: "RuntimeDictionary") -> Dict[str, Any]:
+    """
+    The values of the runtime dictionary keyed by "TYPE path" and attribute path
+    """
+    runtime_value_map: Dict[str, Any] = {}
+    for (method, parameter_attribute), value_list in list(
+            runtime_dictionary.method_parameter_attribute_to_value_map.items()
+    ):
+        runtime_value_map[f"{method.endpoint}\t{parameter_attribute.attribute_path}"] = {
+            "method": method.endpoint,
+            "attribute_path": parameter_attribute.attribute_path,
+            "parameter_type": parameter_attribute.parameter_type.value,
+            "value_list": _json_value_list(value_list),
+        }
+    return runtime_value_map
+
+
+def capture_state(fuzzer: "Fuzzer") -> State:
+    """
+    The learned state of a run keyed by "TYPE path" of the methods and attribute paths, so it
+    can be applied to a graph built again from the same or an edited document
+    """
+    runtime_dictionary = fuzzer.sequence_converter.runtime_dictionary
+    dependency_map: Dict[str, Any] = {}
+    for edge in fuzzer.graph.edge_list:
+        for parameter_dependency in edge.parameter_dependency_list:
+            if parameter_dependency in runtime_dictionary.promoted_dependency_set:
+                continue
+            dependency_map[_dependency_key("odg", parameter_dependency)] = _dependency_entry(
+                parameter_dependency, False
+            )
+    for dependency_set in list(runtime_dictionary.consumer_method_parameter_to_dependency_map.values()):
+        for parameter_dependency in sorted(dependency_set, key=lambda dependency: dependency.sort_key):
+            dependency_map[_dependency_key("runtime", parameter_dependency)] = _dependency_entry(
+                parameter_dependency,
+                parameter_dependency in runtime_dictionary.promoted_dependency_set,
+            )
+
+    analysis_map: Dict[str, Any] = {}
+    for analysis in fuzzer.analysis_list:
+        analysis_state = analysis.get_state()
+        if analysis_state is not None:
+            analysis_map[analysis.name] = analysis_state
+
+    return {
+        "fuzzer": {
+            "elapsed": time.time() - fuzzer.begin_time,
+            "method_list": sorted(method.endpoint for method in fuzzer.graph.method_list),
+            "never_success_method_list": sorted(
+                method.endpoint for method in fuzzer.never_success_method_set
+            ),
+        },
+        "dependency": dependency_map,
+        "runtime_value": capture_runtime_values(runtime_dictionary),
+        "analysis": analysis_map,
+    }
+
+
+def _find_request_attribute(method: Method, attribute_path: str) -> Optional[ParameterAttribute]:
+    for parameter in method.request_parameter.values():
+        if parameter.parameter is not None and parameter.parameter.attribute_path == attribute_path:
+            return parameter.parameter
+        parameter_attribute = parameter.attribute_dict.get(attribute_path, None)
+        if parameter_attribute is not None:
+            return parameter_attribute
+    return None
+
+
+def _runtime_attribute(attribute_path: str, parameter_type: str) -> ParameterAttribute:
+    """
+    An attribute of a response, as parsed at runtime
+    """
+    parameter_attribute = ParameterAttribute(attribute_path.split(".")[-1], attribute_path, None, {})
+    parameter_attribute.parameter_type = ParameterType(parameter_type)
+    return parameter_attribute
+
+
+def restore_runtime_values(fuzzer: "Fuzzer", runtime_value_map: Dict[str, Any]) -> int:
+    """
+    Add the captured values to the runtime dictionary
+
+    :return: number of restored attributes, attributes of unknown methods are skipped
+    """
+    runtime_dictionary = fuzzer.sequence_converter.runtime_dictionary
+    endpoint_to_method_map = {method.endpoint: method for method in fuzzer.graph.method_list}
+    restored_count = 0
+    for entry in runtime_value_map.values():
+        method = endpoint_to_method_map.get(entry["method"], None)
+        if method is None or not entry["value_list"]:
+            continue
+        parameter_attribute = _runtime_attribute(entry["attribute_path"], entry["parameter_type"])
+        # values known already are not added twice when several sources are merged
+        known_value_list = runtime_dictionary.method_parameter_attribute_to_value_map.get(
+            (method, parameter_attribute), ()
+        )
+        runtime_dictionary.add_request_values(
+            method,
+            [
+                (parameter_attribute, value)
+                for value in entry["value_list"]
+                if value not in known_value_list
+            ],
+        )
+        restored_count += 1
+    return restored_count
+
+
+def restore_dependencies(
+        fuzzer: "Fuzzer", dependency_map: Dict[str, Any], max_count: float = None
+) -> int:
+    """
+    Set the learned values of the odg dependencies, add the runtime dependencies again and
+    promote the ones promoted before
+
+    :param max_count: cap of the restored selection counts, lets new rewards move the values faster
+    :return: number of restored dependencies
+    """
+    graph = fuzzer.graph
+    runtime_dictionary = fuzzer.sequence_converter.runtime_dictionary
+    endpoint_to_method_map = {method.endpoint: method for method in graph.method_list}
+    odg_dependency_map = {
+        _dependency_key("odg", parameter_dependency): parameter_dependency
+        for edge in graph.edge_list
+        for parameter_dependency in edge.parameter_dependency_list
+    }
+    restored_count = 0
+    for key, entry in dependency_map.items():
+        parameter_dependency = odg_dependency_map.get(key, None)
+        if parameter_dependency is None and key.startswith("odg\t"):
+            # the edge is not in the graph of this document
+            continue
+        if parameter_dependency is None:
+            producer = endpoint_to_method_map.get(entry["producer"], None)
+            consumer = endpoint_to_method_map.get(entry["consumer"], None)
+            if producer is None or consumer is None:
+                continue
+            consumer_parameter = _find_request_attribute(consumer, entry["consumer_parameter"])
+            if consumer_parameter is None:
+                continue
+            parameter_dependency = ParameterDependency()
+            parameter_dependency.match_rule = entry["match_rule"]
+            parameter_dependency.producer = producer
+            parameter_dependency.producer_parameter = _runtime_attribute(
+                entry["producer_parameter"], entry["producer_parameter_type"]
+            )
+            parameter_dependency.consumer = consumer
+            parameter_dependency.consumer_parameter = consumer_parameter
+            parameter_tuple = (consumer, consumer_parameter)
+            runtime_dictionary.consumer_method_parameter_to_dependency_map.setdefault(
+                parameter_tuple, set()
+            ).add(parameter_dependency)
+        parameter_dependency.N = entry["N"] if max_count is None else min(entry["N"], max_count)
+        parameter_dependency.Q = entry["Q"]
+        if entry["promoted"]:
+            runtime_dictionary.promoted_dependency_set.add(parameter_dependency)
+            edge = graph.add_parameter_dependency(parameter_dependency)
+            if edge is not None:
+                fuzzer.pending_sequence_list += graph.generate_sequence_through_edge(edge)
+        restored_count += 1
+    return restored_count
+
+
+def restore_state(fuzzer: "Fuzzer", state: State):
+    """
+    Apply a captured state to a fuzzer after setup, in place of the warm up
+    """
+    endpoint_to_method_map = {method.endpoint: method for method in fuzzer.graph.method_list}
+    fuzzer_state = state.get("fuzzer", {})
+    known_endpoint_set = set(fuzzer_state.get("method_list", []))
+    never_success_endpoint_set = set(fuzzer_state.get("never_success_method_list", []))
+    # methods new in the document have not been tried yet
+    fuzzer.never_success_method_set = {
+        method
+        for endpoint, method in endpoint_to_method_map.items()
+        if endpoint in never_success_endpoint_set or endpoint not in known_endpoint_set
+    }
+    dependency_count = restore_dependencies(fuzzer, state.get("dependency", {}))
+    value_count = restore_runtime_values(fuzzer, state.get("runtime_value", {}))
+    analysis_map = state.get("analysis", {})
+    for analysis in fuzzer.analysis_list:
+        if analysis.name in analysis_map:
+            analysis.set_state(analysis_map[analysis.name])
+    logger.info(
+        f"restored {dependency_count} dependencies and {value_count} runtime attributes, "
+        f"{len(fuzzer.never_success_method_set)} methods never succeeded"
+    )
@@ -2,7 +2,6 @@ import datetime
 import os
 import random
 import string
-import uuid
 from typing import Any, Dict, List, Tuple
 
 import numpy as np
@@ -21,6 +20,9 @@ from model.parameter_dependency import (InContextAttributeDependency,
                                         ReferenceValueResult)
 from model.request_response import Response
 from model.sequence import Sequence
+from util.random_source import RandomSource
+
+SEEDED_BASE_TIME = datetime.datetime(2024, 1, 1)
 
 
 class DataGenerator:
@@ -61,28 +63,38 @@ class DataGenerator:
         }
         self.config: DataGenerationConfig = self.fuzzer.data_generation_config
         self.reference_value_result_list: List[ReferenceValueResult] = []
+        # streams of the run, drawn in the same order by seeded runs
+        self.random_source: RandomSource = self.fuzzer.random_source
+        self.np_random: np.random.RandomState = self.random_source.numpy("data_generator")
+        self.random: random.Random = self.random_source.random("data_generator")
+
+    def _now(self) -> datetime.datetime:
+        if not self.random_source.is_seeded:
+            return datetime.datetime.now()
+        # the clock would change the requests of seeded runs
+        return SEEDED_BASE_TIME + datetime.timedelta(seconds=int(self.np_random.randint(0, 365 * 24 * 3600)))
 
     def _should_skip(self, parameter_attribute: ParameterAttribute) -> bool:
         if parameter_attribute.required:
             return False
         if (
             parameter_attribute in self.valid_dependency_map
-            and np.random.random() > self.config.dependency_skip_probability
+            and self.np_random.random() > self.config.dependency_skip_probability
         ):
             return False
         if (
             parameter_attribute.parent_parameter_attribute is None
-            and np.random.random() > self.config.parent_parameter_skip_probability
+            and self.np_random.random() > self.config.parent_parameter_skip_probability
         ):
             return False
-        if np.random.random() > self.config.child_parameter_skip_probability:
+        if self.np_random.random() > self.config.child_parameter_skip_probability:
             return False
         return True
 
     def _should_use_dependency(self, parameter_attribute: ParameterAttribute) -> bool:
         if (
             parameter_attribute in self.valid_dependency_map
-            and np.random.random() > self.config.dependency_skip_probability
+            and self.np_random.random() > self.config.dependency_skip_probability
         ):
             return True
         return False
@@ -90,11 +102,18 @@ class DataGenerator:
     def _should_use_example(self, parameter_attribute: ParameterAttribute) -> bool:
         if (
             parameter_attribute.schema_info.has_example
-            and np.random.random() > self.config.example_skip_probability
+            and self.np_random.random() > self.config.example_skip_probability
         ):
             return True
         return False
 
+    def _fetch_seed_value(self, parameter_attribute: ParameterAttribute) -> Tuple[bool, Any]:
+        if self.np_random.random() >= self.config.seed_value_probability:
+            return False, None
+        return self.sequence_converter.seed_corpus.fetch_value(
+            self.method, parameter_attribute
+        )
+
     def _fetch_dependency_value(
         self, parameter_attribute: ParameterAttribute
     ) -> InContextAttributeDependency:
@@ -110,7 +129,7 @@ class DataGenerator:
             dependency.parameter_dependency.producer_parameter.attribute_path
         ]
         parameter_value_list = response_attribute.parameter_value_list
-        value = parameter_value_list[np.random.randint(0, len(parameter_value_list))]
+        value = parameter_value_list[self.np_random.randint(0, len(parameter_value_list))]
         refer_value_result = ReferenceValueResult()
         refer_value_result.value = value
         refer_value_result.dependency = dependency.parameter_dependency
@@ -132,9 +151,9 @@ class DataGenerator:
         max_len = 32
         if (
             parameter_attribute.schema_info.has_enum
-            and np.random.random() > self.config.violation_enum_probability
+            and self.np_random.random() > self.config.violation_enum_probability
         ):
-            enum = np.random.choice(parameter_attribute.schema_info.enum)
+            enum = self.np_random.choice(parameter_attribute.schema_info.enum)
             return enum
 
         # use runtime dictionary
@@ -162,24 +181,24 @@ class DataGenerator:
 
         # if (
         #     parameter_attribute.schema_info.has_min_length
-        #     and np.random.random() < self.config.violation_string_probability
+        #     and self.np_random.random() < self.config.violation_string_probability
         # ):
         #     max_len = parameter_attribute.schema_info.min_length
         if (
             parameter_attribute.schema_info.has_min_length
-            and np.random.random() < self.config.violation_string_probability
+            and self.np_random.random() < self.config.violation_string_probability
         ):
             if hasattr(parameter_attribute.schema_info, 'min_length'):
                 max_len = parameter_attribute.schema_info.min_length
 
         # elif (
         #     parameter_attribute.schema_info.has_max_length
-        #     and np.random.random() < self.config.violation_string_probability
+        #     and self.np_random.random() < self.config.violation_string_probability
         # ):
         #     min_len = parameter_attribute.schema_info.max_length
         elif (
             parameter_attribute.schema_info.has_max_length
-            and np.random.random() < self.config.violation_string_probability
+            and self.np_random.random() < self.config.violation_string_probability
         ):
             if hasattr(parameter_attribute.schema_info, 'max_length'):
                 min_len = parameter_attribute.schema_info.max_length
@@ -187,10 +206,10 @@ class DataGenerator:
         if parameter_attribute.schema_info.has_format:
             string_format = parameter_attribute.schema_info.format
             if string_format == "date-time":
-                res = datetime.datetime.now().isoformat("T")
+                res = self._now().isoformat("T")
                 return res
             elif string_format == "uuid":
-                res = uuid.uuid4().__str__()
+                res = self.random_source.uuid4("data_generator").__str__()
                 return res
             elif string_format == "password":
                 res = "testpassword"
@@ -200,7 +219,7 @@ class DataGenerator:
                     return file.read()
                 # return open("./assets/smallest.jpg", "rb").read()
             elif string_format == "date":  # Handle 'date' format
-                res = datetime.datetime.now().strftime("%Y-%m-%d")
+                res = self._now().strftime("%Y-%m-%d")
                 return res
             else:
                 raise Exception("unknown string format", string_format)
@@ -208,7 +227,7 @@ class DataGenerator:
         if parameter_attribute.schema_info.has_pattern:
             pattern = parameter_attribute.schema_info.pattern
             try:
-                res = rstr.xeger(pattern)
+                res = rstr.Rstr(self.random).xeger(pattern)
             except re.error as e:
                 # Handle the regex error
                 print(f"Regex error: {e}")
@@ -221,8 +240,8 @@ class DataGenerator:
         if max_len <= min_len:
             str_len = max_len
         else:
-            str_len = np.random.randint(min_len, max_len + 1)
-        res = "".join(random.choices(string.ascii_uppercase + string.digits, k=str_len))
+            str_len = self.np_random.randint(min_len, max_len + 1)
+        res = "".join(self.random.choices(string.ascii_uppercase + string.digits, k=str_len))
         return res
 
     # write signature for all value generators
@@ -238,9 +257,11 @@ class DataGenerator:
         # concrete implementation
         if (
             parameter_attribute.schema_info.has_enum
-            and np.random.random() > self.config.violation_enum_probability
+            and self.np_random.random() > self.config.violation_enum_probability
         ):
-            enum = np.random.choice(parameter_attribute.schema_info.enum)
+            enum = parameter_attribute.schema_info.enum[
+                self.np_random.randint(0, len(parameter_attribute.schema_info.enum))
+            ]
             return enum
 
         # use runtime dictionary
@@ -251,43 +272,44 @@ class DataGenerator:
             self.reference_value_result_list.append(runtime_value_result)
             return runtime_value_result.value
         # bypass for enum
-        if np.random.random() < self.config.enum_number_value_probability:
-            res = np.random.randint(0, 2)
+        if self.np_random.random() < self.config.enum_number_value_probability:
+            res = self.np_random.randint(0, 2)
             return res
 
         if (
             parameter_attribute.schema_info.has_minimum
             and parameter_attribute.schema_info.has_maximum
         ):
-            if np.random.random() < self.config.min_max_value_probability:
-                res = np.random.randint(
+            if self.np_random.random() < self.config.min_max_value_probability:
+                res = self.np_random.randint(
                     parameter_attribute.schema_info.minimum,
                     parameter_attribute.schema_info.maximum,
                     dtype=np.int64,
                 )
             else:
-                res = np.random.choice(
+                res = self.np_random.choice(
                     [
                         parameter_attribute.schema_info.minimum,
                         parameter_attribute.schema_info.maximum,
                     ]
                 )
-            return res
+            # numpy integers are not json serializable
+            return int(res)
 
         elif parameter_attribute.schema_info.has_minimum:
-            if np.random.random() < self.config.min_value_probability:
+            if self.np_random.random() < self.config.min_value_probability:
                 res = parameter_attribute.schema_info.minimum
             else:
-                res = np.random.randint(0, 999999)
+                res = self.np_random.randint(0, 999999)
             return res
         elif parameter_attribute.schema_info.has_maximum:
-            if np.random.random() < self.config.max_value_probability:
+            if self.np_random.random() < self.config.max_value_probability:
                 res = parameter_attribute.schema_info.maximum
             else:
-                res = np.random.randint(0, 999999)
+                res = self.np_random.randint(0, 999999)
             return res
         else:
-            res = np.random.randint(0, 999999)
+            res = self.np_random.randint(0, 999999)
             return res
 
     def generate_number_value(self, parameter_attribute: ParameterAttribute) -> float:
@@ -307,7 +329,7 @@ class DataGenerator:
                 return "false"
             else:
                 return value
-        res = np.random.choice(["true", "false"])
+        res = self.np_random.choice(["true", "false"])
         return res
 
     def generate_array_value(
@@ -331,7 +353,7 @@ class DataGenerator:
 
         result = []
 
-        item_num = np.random.randint(0, 3)
+        item_num = self.np_random.randint(0, 3)
 
         for _ in range(item_num):
             for child_parameter in parameter_attribute.child_parameter_attribute_list:
@@ -396,6 +418,11 @@ class DataGenerator:
         if self._should_use_dependency(parameter_attribute):
             return self._fetch_dependency_value(parameter_attribute)
 
+        # use a value which worked before
+        has_seed, value = self._fetch_seed_value(parameter_attribute)
+        if has_seed:
+            return value
+
         if self._should_skip(parameter_attribute):
             return self.SKIP_SYMBOL
         parameter_type: ParameterType = parameter_attribute.parameter_type
@@ -1,44 +1,63 @@
 import datetime
+import os
 import pathlib
-import sys
 import time
 from typing import Dict, List, Set, Tuple
 
 import loguru
 
-from algo.chatgpt_agent import ChatGPTAgent
+from algo.checkpoint import (CheckpointWriter, capture_state, load_checkpoint,
+                             restore_state)
 from algo.sequence_converter import SequenceConverter
+from algo.warm_start import WarmStart
 from analysis.base_analysis import Analysis
+from analysis.event_bus import (AnalysisEventBus, DropPolicy,
+                                IterationEndEvent, RequestResponseEvent,
+                                SequenceEndEvent, SpecificationChangeEvent)
+from analysis.latency_analysis import LatencyAnalysis
 from analysis.result_writer_analysis import ResultWriterAnalysis
 from analysis.statistic_analysis import StatisticAnalysis
 from constant.data_generation_config import DataGenerationConfig
 from constant.fuzzer_config import FuzzerConfig
+from model.fuzz_result import FuzzResult
 from model.method import Method
 from model.operation_dependency_graph import OperationDependencyGraph
 from model.request_response import Request, Response
 from model.sequence import Sequence
+from util.deadline import Deadline
+from util.metrics import MetricsRegistry
+from util.profiler import PhaseProfiler, SamplingProfiler
+from util.random_source import RandomSource
+from util.spec_diff import SpecificationDiff, diff_specification
+from util.specification_loader import resolve_specification
 
 logger = loguru.logger
 
-ANALYSIS = [StatisticAnalysis, ResultWriterAnalysis]
+ANALYSIS = [StatisticAnalysis, ResultWriterAnalysis, LatencyAnalysis]
 
 
 class Fuzzer:
     def __init__(self, graph: OperationDependencyGraph, config: FuzzerConfig):
         self.begin_time: float = time.time()
         self.start_time_str: str = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-        self.output_dir: pathlib.Path = (
-                pathlib.Path(config.output_dir) / self.start_time_str
+        self.output_dir: pathlib.Path = self._create_output_dir(
+            pathlib.Path(config.output_dir), self.start_time_str
         )
-        self.output_dir.mkdir(parents=True, exist_ok=True)
         self.graph: OperationDependencyGraph = graph
         self.config: FuzzerConfig = config
+        self.random_source: RandomSource = RandomSource(config.seed)
         self.time_budget: float = config.time_budget
-        self.chatgpt_agent: ChatGPTAgent = ChatGPTAgent(self)
+        self.deadline: Deadline = Deadline(config.time_budget, self.begin_time)
+        # created in setup when chatgpt is enabled, importing it loads the openai client
+        self.chatgpt_agent: "ChatGPTAgent" = None
         self.sequence_list: List[Sequence] = []
         self.sequence_converter: SequenceConverter = SequenceConverter(self)
         self.data_generation_config: DataGenerationConfig = DataGenerationConfig()
         self.analysis_list: List[Analysis] = []
+        self.event_bus: AnalysisEventBus = None
+        self.metrics: MetricsRegistry = MetricsRegistry()
+        self.profiler: PhaseProfiler = PhaseProfiler(config.enable_phase_profiler)
+        self.sampling_profiler: SamplingProfiler = None
         self.success_method_set: Set[Method] = set()
         self.failed_method_set: Set[Method] = set()
         self.never_success_method_set: Set[Method] = set()
@@ -47,15 +66,56 @@ class Fuzzer:
         self.chatgpt_operation_id_to_method_map: Dict[str, Method] = {}
         self.pending_sequence_list: List[Sequence] = []
         self.single_method_sequence_list: List[Sequence] = []
+        self.spec_mtime: float = None
+        self.spec_check_time: float = time.time()
+        self.checkpoint_writer: CheckpointWriter = None
+        self.checkpoint_time: float = time.time()
+        # methods which succeeded in the runs imported by the warm start
+        self.warm_start_method_set: Set[Method] = set()
+
+    @staticmethod
+    def _create_output_dir(parent_dir: pathlib.Path, name: str) -> pathlib.Path:
+        """
+        Runs started in the same second get a numbered suffix instead of sharing a directory
+        """
+        parent_dir.mkdir(parents=True, exist_ok=True)
+        output_dir = parent_dir / name
+        suffix = 0
+        while True:
+            try:
+                output_dir.mkdir()
+                return output_dir
+            except FileExistsError:
+                suffix += 1
+                output_dir = parent_dir / f"{name}-{suffix}"
+
+    @property
+    def checkpoint_dir(self) -> pathlib.Path:
+        if self.config.checkpoint_dir:
+            return pathlib.Path(self.config.checkpoint_dir)
+        return self.output_dir / "checkpoint"
+
+    @property
+    def metrics_snapshot_path(self) -> pathlib.Path:
+        suffix = "json" if self.config.metrics_format == "json" else "prom"
+        return self.output_dir / f"metrics.{suffix}"
 
     def setup(self):
         logger.info("Fuzzer setup")
+        if self.config.enable_sampling_profiler:
+            self.sampling_profiler = SamplingProfiler(self.config.sampling_profiler_interval)
+            self.sampling_profiler.start()
         self._init_analysis()
+        self._init_metrics()
+        if self.config.enable_chatgpt:
+            from algo.chatgpt_agent import ChatGPTAgent
+
+            self.chatgpt_agent = ChatGPTAgent(self)
+            self.chatgpt_agent.execute()
         self.single_method_sequence_list = self.graph._generate_single_method_sequence()
         self.sequence_list = (
                 self.single_method_sequence_list + self.graph.generate_sequence()
         )
-        self.pending_sequence_list = self.sequence_list.copy()
 
         for method in self.graph.method_list:
             self.operation_id_to_method_map[method.operation_id] = method
@@ -63,19 +123,74 @@ class Fuzzer:
 
         logger.info(f"generated {len(self.sequence_list)} sequences")
 
+        self.sequence_converter.seed_corpus.load(self.graph.method_list)
+
+        if self.config.checkpoint_interval > 0 or self.config.resume:
+            self.checkpoint_writer = CheckpointWriter(
+                self.checkpoint_dir, self.config.checkpoint_max_delta_count
+            )
+
+        if self.config.spec_path and os.path.exists(self.config.spec_path):
+            self.spec_mtime = os.path.getmtime(self.config.spec_path)
+
     def _init_analysis(self):
         for analysis in ANALYSIS:
             analyzer = analysis()
             analyzer.on_init(self)
             self.analysis_list.append(analyzer)
+        if self.config.enable_async_analysis:
+            drop_policy = DropPolicy(self.config.analysis_drop_policy)
+            # a dropped event changes the method sets read by the schedule, seeded runs keep every event
+            if self.random_source.is_seeded and drop_policy != DropPolicy.BLOCK:
+                logger.warning(f"seeded run, analysis_drop_policy {drop_policy.value} replaced by block")
+                drop_policy = DropPolicy.BLOCK
+            self.event_bus = AnalysisEventBus(
+                self.analysis_list,
+                queue_size=self.config.analysis_queue_size,
+                batch_size=self.config.analysis_batch_size,
+                flush_interval=self.config.analysis_flush_interval,
+                drop_policy=drop_policy,
+                profiler=self.profiler,
+            )
+            self.event_bus.start()
+
+    def _init_metrics(self):
+        if self.config.metrics_snapshot_interval > 0:
+            self.metrics.start_snapshot_writer(
+                self.metrics_snapshot_path,
+                self.config.metrics_format,
+                self.config.metrics_snapshot_interval,
+            )
+        if self.config.metrics_http_port > 0:
+            self.metrics.start_http_server(self.config.metrics_http_port)
 
     def _on_iteration_end(self):
+        with self.profiler.phase("analysis"):
+            if self.event_bus is not None:
+                self.event_bus.publish(IterationEndEvent())
+                # the schedule of the next iteration reads the method sets, they must include this one
+                self.event_bus.flush(self.config.analysis_shutdown_timeout)
+            else:
+                for analysis in self.analysis_list:
+                    analysis.on_iteration_end()
+            self._update_method_sets()
+
+    def _update_method_sets(self):
+        """
+        Take copies of the methods which succeeded or failed from the statistic analysis, on the fuzz thread.
+        never_success_method_set keeps the methods set by the warm up, a restore or a specification change
+        """
         for analysis in self.analysis_list:
-            analysis.on_iteration_end()
+            if isinstance(analysis, StatisticAnalysis) and analysis.total_request_count > 0:
+                self.success_method_set, self.failed_method_set = analysis.method_set_snapshot()
+                self.never_success_method_set = self.never_success_method_set - self.success_method_set
 
     def _on_request_response(
             self, sequence: Sequence, request: Request, response: Response
     ):
+        if self.event_bus is not None:
+            self.event_bus.publish(RequestResponseEvent(sequence=sequence, request=request, response=response))
+            return
         for analysis in self.analysis_list:
             analysis.on_request_response(sequence, request, response)
 
@@ -85,43 +200,283 @@ class Fuzzer:
             request_list: List[Request],
             response_list: List[Response],
     ):
+        if self.event_bus is not None:
+            self.event_bus.publish(
+                SequenceEndEvent(
+                    sequence=sequence,
+                    request_list=tuple(request_list),
+                    response_list=tuple(response_list),
+                )
+            )
+            return
         for analysis in self.analysis_list:
             analysis.on_sequence_end(sequence, request_list, response_list)
 
+    def _on_specification_change(self, diff: SpecificationDiff):
+        if self.event_bus is not None:
+            self.event_bus.publish(SpecificationChangeEvent(diff=diff))
+            return
+        for analysis in self.analysis_list:
+            analysis.on_specification_change(diff)
+
     def _on_end(self):
+        if self.chatgpt_agent is not None:
+            if not self.chatgpt_agent.shutdown(self.config.agent_shutdown_timeout):
+                logger.warning("chatgpt agent threads are still running, abandoning them")
+        if self.event_bus is not None:
+            if not self.event_bus.close(self.config.analysis_shutdown_timeout):
+                logger.warning("analysis events were not delivered in time")
+        # the last checkpoint, an evicted node gets SIGTERM before it is killed
+        self.checkpoint()
         for analysis in self.analysis_list:
             analysis.on_end()
+        self.metrics.stop_snapshot_writer()
+        self.metrics.stop_http_server()
+        self.metrics.write_snapshot(self.metrics_snapshot_path, self.config.metrics_format)
+        self.profiler.write(self.output_dir / "phase_profile.json")
+        if self.sampling_profiler is not None:
+            self.sampling_profiler.stop()
+            self.sampling_profiler.write(self.output_dir / "profile.folded")
+
+    def checkpoint(self):
+        """
+        Write the learned state to the checkpoint directory
+        """
+        if self.checkpoint_writer is None:
+            return
+        self.checkpoint_time = time.time()
+        if self.event_bus is not None:
+            # the analyses must not change while their counters are read
+            self.event_bus.flush(self.config.analysis_shutdown_timeout)
+        with self.profiler.phase("checkpoint"):
+            try:
+                self.checkpoint_writer.write(capture_state(self))
+            except OSError as e:
+                logger.error(f"failed to write checkpoint: {e}")
+
+    def _checkpoint_if_due(self):
+        if self.config.checkpoint_interval <= 0:
+            return
+        if self.checkpoint_time + self.config.checkpoint_interval > time.time():
+            return
+        self.checkpoint()
+
+    def resume(self) -> bool:
+        """
+        Restore the state of the checkpoint directory, after setup
+
+        :return: False if there is no checkpoint to resume from
+        """
+        checkpoint = load_checkpoint(self.checkpoint_dir)
+        if checkpoint is None:
+            return False
+        state, index = checkpoint
+        restore_state(self, state)
+        self.checkpoint_writer.resume_from(state, index)
+        # continue the budget of the interrupted run
+        elapsed = state.get("fuzzer", {}).get("elapsed", 0)
+        self.begin_time = time.time() - elapsed
+        self.deadline = Deadline(self.time_budget, self.begin_time)
+        logger.info(f"resumed from checkpoint {index} after {elapsed:.0f}s of the budget")
+        return True
+
+    def _promote_runtime_dependencies(self):
+        if not self.config.enable_runtime_dependency_promotion:
+            return
+        runtime_dictionary = self.sequence_converter.runtime_dictionary
+        for parameter_dependency in runtime_dictionary.promote_dependencies(
+                self.config.runtime_dependency_promotion_min_count,
+                self.config.runtime_dependency_promotion_min_q,
+        ):
+            edge = self.graph.add_parameter_dependency(parameter_dependency)
+            if edge is None:
+                continue
+            self.pending_sequence_list += self.graph.generate_sequence_through_edge(edge)
+
+    def _check_specification_reload(self):
+        if self.config.spec_reload_interval <= 0 or self.spec_mtime is None:
+            return
+        if self.spec_check_time + self.config.spec_reload_interval > time.time():
+            return
+        self.spec_check_time = time.time()
+        spec_mtime = os.path.getmtime(self.config.spec_path)
+        if spec_mtime == self.spec_mtime:
+            return
+        self.spec_mtime = spec_mtime
+        logger.info(f"specification changed: {self.config.spec_path}")
+        try:
+            specification = resolve_specification(self.config.spec_path)
+        except Exception as e:
+            logger.error(f"failed to reload specification: {e}")
+            return
+        self.apply_specification_diff(
+            diff_specification(self.graph.method_list, specification)
+        )
+
+    def apply_specification_diff(self, diff: SpecificationDiff):
+        """
+        Switch a running fuzzer to a new version of the api document without rebuilding it.
+        Sequences touching outdated methods are dropped, the new methods get their single method
+        sequences and the sequences through the recomputed edges.
+        """
+        if diff.is_empty:
+            return
+        outdated_method_set = set(diff.outdated_method_list)
+        new_edge_list = self.graph.apply_specification_diff(diff)
+
+        def is_valid(sequence: Sequence) -> bool:
+            return all(
+                method not in outdated_method_set for method in sequence.method_sequence
+            )
+
+        self.sequence_list = [
+            sequence for sequence in self.sequence_list if is_valid(sequence)
+        ]
+        self.pending_sequence_list = [
+            sequence for sequence in self.pending_sequence_list if is_valid(sequence)
+        ]
+        self.single_method_sequence_list = [
+            sequence for sequence in self.single_method_sequence_list if is_valid(sequence)
+        ]
+
+        new_method_set = set(diff.new_method_list)
+        for method in diff.new_method_list:
+            sequence = Sequence()
+            sequence.add_method(method)
+            self.single_method_sequence_list.append(sequence)
+            self.pending_sequence_list.append(sequence)
+        for edge in new_edge_list:
+            # sequences starting at new methods are covered by their edges as well
+            self.pending_sequence_list += self.graph.generate_sequence_through_edge(edge)
+
+        # update method maps and sets
+        for method in diff.outdated_method_list:
+            self.operation_id_to_method_map.pop(method.operation_id, None)
+            self.chatgpt_operation_id_to_method_map.pop(
+                f"{method.method_type.value.upper()}{method.method_path}", None
+            )
+        for method in diff.new_method_list:
+            self.operation_id_to_method_map[method.operation_id] = method
+            self.chatgpt_operation_id_to_method_map[f'{method.method_type.value.upper()}{method.method_path}'] = method
+        self.success_method_set -= outdated_method_set
+        self.failed_method_set -= outdated_method_set
+        self.never_success_method_set = (
+                self.never_success_method_set - outdated_method_set
+        ) | new_method_set
+        self.sequence_converter.runtime_dictionary.remove_methods(outdated_method_set)
+        self.sequence_converter.seed_corpus.set_method_list(self.graph.method_list)
+
+        self._on_specification_change(diff)
+        logger.info(
+            f"applied specification diff, {len(self.pending_sequence_list)} pending sequences"
+        )
 
     def warm_up(self):
         logger.info("warmup")
         self.never_success_method_set = set(self.operation_id_to_method_map.values())
         # convert sequence to request
-        for _ in range(self.config.warm_up_times):
+        for warm_up_index in range(self.config.warm_up_times):
             for sequence in self.single_method_sequence_list:
+                if self.deadline.is_expired:
+                    return
+                # methods known to succeed from earlier runs are warmed up once
+                if warm_up_index > 0 and sequence.method_sequence[0] in self.warm_start_method_set:
+                    continue
                 self.sequence_converter.convert(sequence)
             self._on_iteration_end()
 
-    def fuzz(self):
+    def warm_start(self):
+        """
+        Import what the runs in warm_start_path_list learned, after setup
+        """
+        summary = WarmStart(self).run(self.config.warm_start_path_list)
+        self.warm_start_method_set = {
+            method for method in self.graph.method_list if method.endpoint in summary.success_endpoint_set
+        }
+
+    def run(self) -> FuzzResult:
+        """
+        Set up, warm up and fuzz until the time budget is spent, measured from this call.
+        Every thread of the run is stopped before it returns, a fuzzer runs once.
+        """
+        self.begin_time = time.time()
+        self.deadline = Deadline(self.time_budget, self.begin_time)
+        self.setup()
+        if not self.config.resume or not self.resume():
+            if self.config.resume:
+                logger.warning(f"no checkpoint in {self.checkpoint_dir}, starting over")
+            if self.config.warm_start_path_list:
+                self.warm_start()
+            self.warm_up()
+        return self.fuzz()
+
+    def fuzz(self) -> FuzzResult:
+        try:
+            self._fuzz_until_deadline()
+        except KeyboardInterrupt:
+            logger.warning("interrupted, stopping")
+            self.deadline.cancel()
+        finally:
+            self._on_end()
+        return self._collect_result()
+
+    def _collect_result(self) -> FuzzResult:
+        result = FuzzResult(
+            output_dir=self.output_dir,
+            elapsed=time.time() - self.begin_time,
+            is_cancelled=self.deadline.is_cancelled,
+            method_count=len(self.graph.method_list),
+            sequence_count=len(self.sequence_list),
+        )
+        for analysis in self.analysis_list:
+            if isinstance(analysis, StatisticAnalysis):
+                result.request_count = analysis.total_request_count
+                result.success_count = analysis.total_success_count
+                result.status_code_count = dict(analysis.status_code_count)
+                result.success_method_list = sorted(
+                    method.signature for method in analysis.total_success_method_set
+                )
+                result.failed_method_list = sorted(
+                    method.signature for method in analysis.total_failed_method_set
+                )
+                result.never_success_method_list = sorted(
+                    method.signature for method in analysis.never_success_method_set
+                )
+        return result
+
+    def _fuzz_until_deadline(self):
         converter = self.sequence_converter
 
-        while self.begin_time + self.time_budget > time.time():
+        while not self.deadline.is_expired:
             # handle the case that all methods are never success
             if self.config.enable_chatgpt and len(self.never_success_method_set) > 0:
-                for method in self.never_success_method_set:
-                    self.chatgpt_agent.task_queue.put(method)
+                # queued methods are not added twice, their rank is refreshed
+                for method in sorted(self.never_success_method_set, key=lambda m: m.signature):
+                    self.chatgpt_agent.submit(method)
 
-            # convert sequence to request
+            # reuse the requests which worked, at no model cost
+            converter.replay_seeds(self.config.seed_replay_count)
+
+            # convert sequence to request, the budget is checked per request as well
             for sequence in self.sequence_list:
+                if self.deadline.is_expired:
+                    break
                 converter.convert(sequence)
+                self._checkpoint_if_due()
 
             # handlers for each iteration
             self._on_iteration_end()
 
+            # turn rewarded runtime dependencies into new edges
+            self._promote_runtime_dependencies()
+
+            # follow changes of the api document
+            self._check_specification_reload()
+
             # update sequence list
-            if self.pending_sequence_list == 0:
+            if len(self.pending_sequence_list) == 0:
                 continue
+            logger.info(f"add {len(self.pending_sequence_list)} pending sequences")
             self.sequence_list += self.pending_sequence_list
             self.pending_sequence_list.clear()
-
-        self._on_end()
-        sys.exit(0)
+        logger.info(f"time budget reached: {self.time_budget}s")
@@ -0,0 +1,171 @@
+import collections
+import math
+import threading
+from typing import Dict, List
+
+import yaml
+
+from model.method import Method
+from model.operation_dependency_graph import OperationDependencyGraph
+
+# characters per token of english text and json, close enough without a tokenizer
+CHARACTERS_PER_TOKEN = 4
+# property names listed per schema in a compact description
+MAX_PROPERTY_COUNT = 12
+
+
+def estimate_token_count(text: str) -> int:
+    return math.ceil(len(text) / CHARACTERS_PER_TOKEN)
+
+
+def _property_name_list(schema) -> List[str]:
+    if not isinstance(schema, dict):
+        return []
+    if schema.get("type", None) == "array":
+        return _property_name_list(schema.get("items", None))
+    property_map = schema.get("properties", None)
+    if not isinstance(property_map, dict):
+        return []
+    required_set = set(schema.get("required", []) or [])
+    return [
+        f"{name}*" if name in required_set else name
+        for name in list(property_map)[:MAX_PROPERTY_COUNT]
+    ]
+
+
+def _body_schema(body: dict):
+    """
+    The json schema of a request body or response, OpenAPI 2 or 3
+    """
+    if not isinstance(body, dict):
+        return None
+    if "schema" in body:
+        return body["schema"]
+    for content_type, media_type in (body.get("content", None) or {}).items():
+        if "json" in content_type and isinstance(media_type, dict):
+            return media_type.get("schema", None)
+    return None
+
+
+class PromptContextBuilder:
+    """
+    Describe the methods a prompt about a target method needs within a token budget.
+    Methods are taken from the ODG neighborhood of the target, the target first and then its
+    producers by distance, so the methods able to produce its inputs come before the rest.
+    Descriptions are computed once per method and shared by all prompts.
+    """
+
+    def __init__(self, graph: OperationDependencyGraph):
+        self.graph: OperationDependencyGraph = graph
+        self.summary_map: Dict[Method, str] = {}
+        self.document_map: Dict[Method, str] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def summarize(self, method: Method) -> str:
+        """
+        One line description: method, path, summary, parameters (* required) and response properties
+        """
+        summary = self.summary_map.get(method, None)
+        if summary is not None:
+            return summary
+        raw_body = method.method_raw_body
+        part_list = [f"- {method.method_type.value.upper()} {method.method_path}"]
+        description = method.summary or method.description
+        if description:
+            part_list.append(f": {description.strip().splitlines()[0][:120]}")
+        parameter_list = []
+        for parameter in raw_body.get("parameters", []) or []:
+            if not isinstance(parameter, dict) or "name" not in parameter:
+                continue
+            if parameter.get("in", None) == "body":
+                parameter_list += _property_name_list(parameter.get("schema", None))
+                continue
+            required = "*" if parameter.get("required", False) else ""
+            parameter_list.append(f"{parameter['name']}{required} ({parameter.get('in', '')})")
+        parameter_list += _property_name_list(_body_schema(raw_body.get("requestBody", None)))
+        if parameter_list:
+            part_list.append(f"; params: {', '.join(parameter_list)}")
+        response_map = raw_body.get("responses", {}) or {}
+        for status_code, response in response_map.items():
+            if str(status_code).startswith("2"):
+                property_list = _property_name_list(_body_schema(response))
+                if property_list:
+                    part_list.append(f"; returns: {', '.join(property_list)}")
+                break
+        summary = "".join(part_list)
+        with self._lock:
+            self.summary_map[method] = summary
+        return summary
+
+    def document(self, method: Method) -> str:
+        """
+        Documentation block of a method, its parameters and 200 response as yaml
+        """
+        document = self.document_map.get(method, None)
+        if document is not None:
+            return document
+        method_doc_dict = {
+            "description": method.description,
+            "parameters": method.method_raw_body.get(
+                "parameters", method.method_raw_body.get("requestBody", [])
+            ),
+            "responses": method.method_raw_body.get("responses", {}).get("200", []),
+        }
+        document = f"""
+== Docs for {method.method_type.value.upper()} {method.method_path} ==
+{yaml.dump(method_doc_dict)}
+        """
+        with self._lock:
+            self.document_map[method] = document
+        return document
+
+    def neighborhood(self, target_method: Method) -> List[Method]:
+        """
+        The target and its transitive producers, breadth first from the target
+        """
+        if target_method not in self.graph.method_index_map:
+            return [target_method]
+        method_list = [target_method]
+        visited_set = {target_method}
+        method_queue = collections.deque([target_method])
+        while method_queue:
+            for producer in self.graph.get_producers(method_queue.popleft()):
+                if producer in visited_set:
+                    continue
+                visited_set.add(producer)
+                method_list.append(producer)
+                method_queue.append(producer)
+        return method_list
+
+    def build_method_list(self, target_method: Method, token_budget: int) -> str:
+        """
+        Summaries of the target's neighborhood, one per line, as many as fit the budget
+        """
+        line_list = []
+        token_count = 0
+        for method in self.neighborhood(target_method):
+            summary = self.summarize(method)
+            summary_token_count = estimate_token_count(summary) + 1
+            if token_count + summary_token_count > token_budget and line_list:
+                break
+            line_list.append(summary)
+            token_count += summary_token_count
+        return "\n".join(line_list)
+
+    def build_documentation(self, method_list: List[Method], token_budget: int) -> str:
+        """
+        Full documentation of the methods in order while it fits the budget, summaries for the rest
+        """
+        part_list = []
+        token_count = 0
+        for method in method_list:
+            document = self.document(method)
+            document_token_count = estimate_token_count(document)
+            if token_count + document_token_count > token_budget:
+                document = self.summarize(method) + "\n"
+                document_token_count = estimate_token_count(document)
+                if token_count + document_token_count > token_budget:
+                    break
+            part_list.append(document)
+            token_count += document_token_count
+        return "".join(part_list)
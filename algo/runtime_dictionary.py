@@ -39,6 +39,8 @@ class RuntimeDictionary:
         self.consumer_method_parameter_to_dependency_map: Dict[
             Tuple[Method, ParameterAttribute], Set[ParameterDependency]
         ] = {}
+        self.promoted_dependency_set: Set[ParameterDependency] = set()
+        self.np_random: np.random.RandomState = fuzzer.random_source.numpy("runtime_dictionary")
 
     def _choose_dependency(
         self, dependency_list: List[ParameterDependency]
@@ -47,7 +49,7 @@ class RuntimeDictionary:
             index = rl_algorithm(dependency_list)
             return dependency_list[index]
         else:
-            return dependency_list[np.random.randint(0, len(dependency_list))]
+            return dependency_list[self.np_random.randint(0, len(dependency_list))]
 
     def fetch_value(
         self,
@@ -58,7 +60,7 @@ class RuntimeDictionary:
         parameter_tuple = (data_generator.method, consumer_parameter_attribute)
 
         # skip runtime dictionary
-        if data_generator.config.no_dictionary_value_probability > np.random.random():
+        if data_generator.config.no_dictionary_value_probability > self.np_random.random():
             return result
 
         # no value
@@ -75,7 +77,7 @@ class RuntimeDictionary:
 
         # use odg data
         if (
-            data_generator.config.no_odg_value_probability < np.random.random()
+            data_generator.config.no_odg_value_probability < self.np_random.random()
             and parameter_tuple
             in data_generator.fuzzer.graph.consumer_and_parameter_attribute_to_edge_map
         ):
@@ -104,7 +106,7 @@ class RuntimeDictionary:
                     parameter_dependency.producer_parameter,
                 )
                 value_list = self.method_parameter_attribute_to_value_map[runtime_tuple]
-                result.value = value_list[np.random.randint(0, len(value_list))]
+                result.value = value_list[self.np_random.randint(0, len(value_list))]
                 return result
 
         # use random value
@@ -114,10 +116,11 @@ class RuntimeDictionary:
         if (
             len(self.consumer_method_parameter_to_dependency_map[parameter_tuple]) > 0
             and data_generator.config.random_runtime_dictionary_value_probability
-            > np.random.random()
+            > self.np_random.random()
         ):
-            producer_parameter_dependency_list = list(
-                self.consumer_method_parameter_to_dependency_map[parameter_tuple]
+            producer_parameter_dependency_list = sorted(
+                self.consumer_method_parameter_to_dependency_map[parameter_tuple],
+                key=lambda dependency: dependency.sort_key,
             )
             parameter_dependency = self._choose_dependency(
                 producer_parameter_dependency_list
@@ -126,11 +129,11 @@ class RuntimeDictionary:
             value_list = self.method_parameter_attribute_to_value_map[
                 (parameter_dependency.producer, parameter_dependency.producer_parameter)
             ]
-            result.value = value_list[np.random.randint(0, len(value_list))]
+            result.value = value_list[self.np_random.randint(0, len(value_list))]
             return result
 
         # use runtime data
-        random_index = np.random.randint(
+        random_index = self.np_random.randint(
             0,
             len(
                 self.parameter_type_to_method_parameter_attribute_map[
@@ -160,10 +163,87 @@ class RuntimeDictionary:
         value_list = self.method_parameter_attribute_to_value_map[
             (producer_method, parameter_attribute)
         ]
-        result.value = value_list[np.random.randint(0, len(value_list))]
+        result.value = value_list[self.np_random.randint(0, len(value_list))]
 
         return result
 
+    def promote_dependencies(
+        self, min_count: int, min_q: float
+    ) -> List[ParameterDependency]:
+        """
+        Collect the runtime dependencies which paid off often enough to be added to the odg.
+        Each dependency is only promoted once.
+        """
+        promoted_dependency_list: List[ParameterDependency] = []
+        for dependency_set in self.consumer_method_parameter_to_dependency_map.values():
+            for parameter_dependency in sorted(dependency_set, key=lambda dependency: dependency.sort_key):
+                if parameter_dependency in self.promoted_dependency_set:
+                    continue
+                if parameter_dependency.producer == parameter_dependency.consumer:
+                    continue
+                if parameter_dependency.N < min_count or parameter_dependency.Q < min_q:
+                    continue
+                self.promoted_dependency_set.add(parameter_dependency)
+                promoted_dependency_list.append(parameter_dependency)
+        return promoted_dependency_list
+
+    def remove_methods(self, method_set: Set[Method]):
+        """
+        Forget every value and dependency involving the given methods, used when the spec changes
+        """
+        self.method_set -= method_set
+        for method in method_set:
+            self.method_to_parameter_attribute_map.pop(method, None)
+            self.method_to_response_list_map.pop(method, None)
+        for method_parameter_tuple in list(self.method_parameter_attribute_to_value_map):
+            if method_parameter_tuple[0] in method_set:
+                del self.method_parameter_attribute_to_value_map[method_parameter_tuple]
+        for parameter_type in self.parameter_type_to_method_parameter_attribute_map:
+            self.parameter_type_to_method_parameter_attribute_map[parameter_type] = [
+                method_parameter_tuple
+                for method_parameter_tuple in self.parameter_type_to_method_parameter_attribute_map[
+                    parameter_type
+                ]
+                if method_parameter_tuple[0] not in method_set
+            ]
+        for parameter_tuple in list(self.consumer_method_parameter_to_dependency_map):
+            if parameter_tuple[0] in method_set:
+                del self.consumer_method_parameter_to_dependency_map[parameter_tuple]
+                continue
+            self.consumer_method_parameter_to_dependency_map[parameter_tuple] = {
+                parameter_dependency
+                for parameter_dependency in self.consumer_method_parameter_to_dependency_map[
+                    parameter_tuple
+                ]
+                if parameter_dependency.producer not in method_set
+            }
+
+    def _register(self, method: Method, parameter_attribute: ParameterAttribute):
+        method_parameter_tuple = (method, parameter_attribute)
+        if method_parameter_tuple in self.method_parameter_attribute_to_value_map:
+            return
+        self.method_parameter_attribute_to_value_map[
+            method_parameter_tuple
+        ] = collections.deque(maxlen=self.fifo_length)
+        self.parameter_type_to_method_parameter_attribute_map[
+            parameter_attribute.parameter_type
+        ].append(method_parameter_tuple)
+        logger.info(f"Found new parameter attribute: {parameter_attribute} on {method}")
+
+    def add_request_values(
+        self, method: Method, value_list: List[Tuple[ParameterAttribute, Any]]
+    ):
+        """
+        Add the values of a request which got a 2xx response, other methods can use them like
+        values from responses
+        """
+        self.method_set.add(method)
+        for parameter_attribute, value in value_list:
+            self._register(method, parameter_attribute)
+            self.method_parameter_attribute_to_value_map[
+                (method, parameter_attribute)
+            ].append(value)
+
     def add_response(self, response: Response):
         if response.status_code >= 300:
             return
@@ -187,19 +267,7 @@ class RuntimeDictionary:
         # add parameter attribute to value map
         for parameter_attribute in response.response_body_value_map.values():
             method_parameter_tuple = (method, parameter_attribute)
-            if (
-                method_parameter_tuple
-                not in self.method_parameter_attribute_to_value_map
-            ):
-                self.method_parameter_attribute_to_value_map[
-                    method_parameter_tuple
-                ] = collections.deque(maxlen=self.fifo_length)
-                self.parameter_type_to_method_parameter_attribute_map[
-                    parameter_attribute.parameter_type
-                ].append(method_parameter_tuple)
-                logger.info(
-                    f"Found new parameter attribute: {parameter_attribute} on {method}"
-                )
+            self._register(method, parameter_attribute)
             for value in parameter_attribute.get_parameter_value():
                 self.method_parameter_attribute_to_value_map[
                     method_parameter_tuple
@@ -0,0 +1,370 @@
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import random
+import re
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import loguru
+
+from constant.parameter import ParameterLocation, ParameterType
+from model.method import Method
+from model.parameter import Parameter, ParameterAttribute
+from model.request_response import Request
+
+logger = loguru.logger
+
+# python types of the values the runtime dictionary accepts for a parameter type
+SCALAR_TYPE_MAP = {
+    ParameterType.STRING: (str,),
+    ParameterType.INTEGER: (int,),
+    ParameterType.NUMBER: (int, float),
+    ParameterType.BOOLEAN: (bool,),
+}
+URL_LOCATION_SET = {ParameterLocation.PATH, ParameterLocation.QUERY}
+
+
+@dataclasses.dataclass
+class SeedTemplate:
+    """
+    A request which got a 2xx response, replayable without the model
+    """
+
+    # "TYPE path" of the method
+    endpoint: str = None
+    # path relative to the fuzzer url, path parameters filled in
+    url: str = None
+    params: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    data: Any = dataclasses.field(default_factory=dict)
+    headers: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    form_data: Dict[str, Any] = dataclasses.field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+    @staticmethod
+    def from_dict(template_dict: Dict[str, Any]) -> "SeedTemplate":
+        field_set = {field.name for field in dataclasses.fields(SeedTemplate)}
+        return SeedTemplate(**{key: value for key, value in template_dict.items() if key in field_set})
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha256(
+            json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def to_request(self, method: Method) -> Request:
+        request = Request()
+        request.method = method
+        request.url = self.url
+        request.params = dict(self.params)
+        request.data = self.data
+        request.headers = dict(self.headers)
+        request.form_data = dict(self.form_data)
+        return request
+
+
+def corpus_path(corpus_dir: str, url: str) -> pathlib.Path:
+    """
+    One corpus per target, seeds of different services never mix
+    """
+    return pathlib.Path(corpus_dir) / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]}.jsonl"
+
+
+def _path_pattern(method_path: str) -> Tuple[re.Pattern, List[str]]:
+    """
+    Regular expression matching the urls of a path template and the names of its path parameters
+    """
+    name_list = []
+    pattern_list = []
+    for part in re.split(r"(\{[^}]+\})", method_path):
+        if part.startswith("{") and part.endswith("}"):
+            pattern_list.append(f"(?P<p{len(name_list)}>[^/]+)")
+            name_list.append(part[1:-1])
+        else:
+            pattern_list.append(re.escape(part))
+    return re.compile("".join(pattern_list) + "/?$"), name_list
+
+
+def _walk_value(
+        parameter_attribute: ParameterAttribute, value: Any
+) -> Iterator[Tuple[ParameterAttribute, Any]]:
+    """
+    The attributes of a parameter and their values in a request value, following the schema
+    """
+    yield parameter_attribute, value
+    if parameter_attribute.recursive_reference is not None:
+        return
+    if parameter_attribute.parameter_type == ParameterType.OBJECT and isinstance(value, dict):
+        for child_attribute in parameter_attribute.child_parameter_attribute_list:
+            if child_attribute.attribute_name in value:
+                yield from _walk_value(child_attribute, value[child_attribute.attribute_name])
+    elif parameter_attribute.parameter_type == ParameterType.ARRAY and isinstance(value, list):
+        for child_attribute in parameter_attribute.child_parameter_attribute_list:
+            for item in value:
+                yield from _walk_value(child_attribute, item)
+
+
+class SeedCorpus:
+    """
+    Requests which worked, turned into seeds reused at no model cost: replayable templates per
+    method and the values of every request attribute. The templates are appended to a jsonl file
+    shared by the runs against the same url, the values are derived from them on load.
+    Seeds are added from the agent threads and read by the fuzz loop.
+    """
+
+    def __init__(
+            self,
+            path: Optional[pathlib.Path],
+            max_template_count: int = 20,
+            max_value_count: int = 20,
+            random_stream: random.Random = None,
+    ):
+        # None keeps the corpus in memory
+        self.path: Optional[pathlib.Path] = path
+        self.random: random.Random = random_stream if random_stream is not None else random.Random()
+        self.max_template_count: int = max_template_count
+        self.max_value_count: int = max_value_count
+        self.endpoint_to_method_map: Dict[str, Method] = {}
+        self.method_to_template_list_map: Dict[Method, List[SeedTemplate]] = {}
+        self.template_key_set: Set[str] = set()
+        # templates of methods missing from this version of the document, kept on rewrite
+        self.foreign_template_list: List[SeedTemplate] = []
+        self.method_attribute_to_value_map: Dict[
+            Tuple[Method, Parameter, ParameterAttribute], List[Any]
+        ] = {}
+        # seeds not yet added to the runtime dictionary
+        self.pending_seed_list: List[Tuple[Method, List[Tuple[ParameterAttribute, Any]]]] = []
+        self.path_pattern_map: Dict[Method, Tuple[re.Pattern, List[str]]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.template_key_set)
+
+    def load(self, method_list: List[Method]) -> int:
+        """
+        Read the corpus of earlier runs, the file is compacted when most of its lines are stale
+
+        :return: number of loaded templates
+        """
+        self.set_method_list(method_list)
+        if self.path is None or not self.path.exists():
+            return 0
+        loaded_count = 0
+        line_count = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line_count += 1
+                try:
+                    template = SeedTemplate.from_dict(json.loads(line))
+                except (ValueError, TypeError):
+                    # a partial line written by a killed run
+                    continue
+                if template.endpoint not in self.endpoint_to_method_map:
+                    self.foreign_template_list.append(template)
+                elif self._add_template(template) is not None:
+                    loaded_count += 1
+        if line_count > 2 * max(loaded_count + len(self.foreign_template_list), 1):
+            self._rewrite()
+        logger.info(f"loaded {loaded_count} seed templates from {self.path}")
+        return loaded_count
+
+    def set_method_list(self, method_list: List[Method]):
+        with self._lock:
+            self.endpoint_to_method_map = {method.endpoint: method for method in method_list}
+            method_set = set(method_list)
+            for method in list(self.method_to_template_list_map):
+                if method not in method_set:
+                    del self.method_to_template_list_map[method]
+            for key in list(self.method_attribute_to_value_map):
+                if key[0] not in method_set:
+                    del self.method_attribute_to_value_map[key]
+            for method in list(self.path_pattern_map):
+                if method not in method_set:
+                    del self.path_pattern_map[method]
+
+    def _rewrite(self):
+        """
+        Drop duplicated and evicted templates from the file
+        """
+        with self._lock:
+            template_list = self.foreign_template_list + [
+                template
+                for template_list in self.method_to_template_list_map.values()
+                for template in template_list
+            ]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                "w", dir=self.path.parent, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as f:
+            for template in template_list:
+                f.write(json.dumps(template.to_dict(), ensure_ascii=False) + "\n")
+        os.replace(f.name, self.path)
+
+    def _extract_value_list(
+            self, method: Method, template: SeedTemplate
+    ) -> Optional[List[Tuple[Parameter, ParameterAttribute, Any]]]:
+        """
+        :return: the value of every request attribute, None if the url does not match the method
+        """
+        if method not in self.path_pattern_map:
+            self.path_pattern_map[method] = _path_pattern(method.method_path)
+        path_pattern, path_name_list = self.path_pattern_map[method]
+        path_match = path_pattern.search(template.url)
+        if path_match is None:
+            return None
+        path_value_map = {
+            name: path_match.group(f"p{index}") for index, name in enumerate(path_name_list)
+        }
+
+        value_list = []
+        for parameter in method.request_parameter.values():
+            parameter: Parameter
+            if parameter.location == ParameterLocation.PATH:
+                source = path_value_map
+            elif parameter.location == ParameterLocation.QUERY:
+                source = template.params
+            elif parameter.location == ParameterLocation.HEADER:
+                source = template.headers
+            elif parameter.location == ParameterLocation.FORM_DATA:
+                source = template.form_data
+            elif parameter.location == ParameterLocation.BODY:
+                if template.data:
+                    value_list += [
+                        (parameter, attribute, value)
+                        for attribute, value in _walk_value(parameter.parameter, template.data)
+                    ]
+                continue
+            else:
+                continue
+            if parameter.name in source:
+                value = source[parameter.name]
+                if isinstance(value, str) and parameter.location in URL_LOCATION_SET:
+                    value = _parse_url_value(parameter.parameter, value)
+                value_list.append((parameter, parameter.parameter, value))
+        return value_list
+
+    def _add_template(self, template: SeedTemplate) -> Optional[List[Tuple[ParameterAttribute, Any]]]:
+        """
+        :return: the scalar attribute values of a new template, None if it is known or invalid
+        """
+        with self._lock:
+            method = self.endpoint_to_method_map.get(template.endpoint, None)
+            if method is None:
+                return None
+            key = template.key
+            if key in self.template_key_set:
+                return None
+            value_list = self._extract_value_list(method, template)
+            if value_list is None:
+                return None
+            self.template_key_set.add(key)
+            template_list = self.method_to_template_list_map.setdefault(method, [])
+            template_list.append(template)
+            if len(template_list) > self.max_template_count:
+                self.template_key_set.discard(template_list.pop(0).key)
+            for parameter, parameter_attribute, value in value_list:
+                attribute_value_list = self.method_attribute_to_value_map.setdefault(
+                    (method, parameter, parameter_attribute), []
+                )
+                attribute_value_list.append(value)
+                if len(attribute_value_list) > self.max_value_count:
+                    attribute_value_list.pop(0)
+            # the value generators expect values of the schema type from the dictionary
+            scalar_value_list = [
+                (parameter_attribute, value)
+                for _, parameter_attribute, value in value_list
+                if isinstance(value, SCALAR_TYPE_MAP.get(parameter_attribute.parameter_type, ()))
+                   and (parameter_attribute.parameter_type == ParameterType.BOOLEAN) == isinstance(value, bool)
+            ]
+            self.pending_seed_list.append((method, scalar_value_list))
+            return scalar_value_list
+
+    def add_request(self, base_url: str, request: Request, persist: bool = True) -> bool:
+        """
+        Add a request which got a 2xx response, its url may be absolute
+
+        :param persist: append it to the corpus file, imported requests are only kept in memory
+        :return: True if it is a new seed
+        """
+        url = request.url or ""
+        if url.startswith(base_url):
+            url = url[len(base_url):]
+        split_url = urlsplit(url)
+        params = dict(parse_qsl(split_url.query))
+        params.update(request.params or {})
+        template = SeedTemplate(
+            endpoint=request.method.endpoint,
+            url=split_url.path if split_url.scheme else url.split("?")[0],
+            params=params,
+            data=request.data if request.data is not None else {},
+            headers=dict(request.headers or {}),
+            form_data=dict(request.form_data or {}),
+        )
+        try:
+            line = json.dumps(template.to_dict(), ensure_ascii=False)
+        except (TypeError, ValueError):
+            # binary bodies are not replayable from a text file
+            return False
+        if self._add_template(template) is None:
+            return False
+        if persist and self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # one write per line, appends of other runs are not interleaved within a line
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        if persist:
+            logger.info(f"new seed for {template.endpoint}: {template.url}")
+        return True
+
+    def pop_pending_seed_list(self) -> List[Tuple[Method, List[Tuple[ParameterAttribute, Any]]]]:
+        with self._lock:
+            pending_seed_list = self.pending_seed_list
+            self.pending_seed_list = []
+        return pending_seed_list
+
+    def fetch_value(self, method: Method, parameter_attribute: ParameterAttribute) -> Tuple[bool, Any]:
+        """
+        :return: whether the attribute has a seed value and a random one of them
+        """
+        with self._lock:
+            value_list = self.method_attribute_to_value_map.get(
+                (method, parameter_attribute.parameter, parameter_attribute), None
+            )
+            if not value_list:
+                return False, None
+            return True, self.random.choice(value_list)
+
+    def sample_template_list(
+            self, count: int, preferred_method_set: Set[Method]
+    ) -> List[Tuple[Method, SeedTemplate]]:
+        """
+        Templates to replay, one per method, methods in the preferred set first
+        """
+        with self._lock:
+            method_list = sorted(self.method_to_template_list_map, key=lambda m: m.signature)
+            self.random.shuffle(method_list)
+            method_list.sort(key=lambda method: method not in preferred_method_set)
+            return [
+                (method, self.random.choice(self.method_to_template_list_map[method]))
+                for method in method_list[:count]
+            ]
+
+
+def _parse_url_value(parameter_attribute: ParameterAttribute, value: str) -> Any:
+    """
+    Path and query values are strings in the url, convert them back to the parameter type
+    """
+    try:
+        if parameter_attribute.parameter_type == ParameterType.INTEGER:
+            return int(value)
+        if parameter_attribute.parameter_type == ParameterType.NUMBER:
+            return float(value)
+    except ValueError:
+        pass
+    return value
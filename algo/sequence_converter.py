@@ -1,4 +1,5 @@
 import os.path
+import time
 from typing import Any, Dict, List, Tuple
 from urllib.parse import urljoin
 
@@ -7,6 +8,7 @@ import requests
 
 from algo.data_generator import DataGenerator
 from algo.runtime_dictionary import ReferenceValueResult, RuntimeDictionary
+from algo.seed_corpus import SeedCorpus, corpus_path
 from constant.api import ResponseCustomizedStatusCode
 from model.method import Method
 from model.parameter import Parameter, ParameterAttribute
@@ -15,7 +17,9 @@ from model.parameter_dependency import (InContextAttributeDependency,
                                         ParameterDependency)
 from model.request_response import Request, Response
 from model.sequence import Sequence
+from util.deadline import DeadlineExceeded
 from util.request_builder import build_request
+from util.token_bucket import TokenBucket
 
 logger = loguru.logger
 
@@ -24,6 +28,19 @@ class SequenceConverter:
     def __init__(self, fuzzer: "Fuzzer"):
         self.fuzzer: "Fuzzer" = fuzzer
         self.runtime_dictionary: RuntimeDictionary = RuntimeDictionary(fuzzer)
+        config = fuzzer.config
+        self.seed_corpus: SeedCorpus = SeedCorpus(
+            corpus_path(config.seed_corpus_dir, config.url) if config.seed_corpus_dir else None,
+            config.seed_max_template_count,
+            config.seed_max_value_count,
+            fuzzer.random_source.random("seed_corpus"),
+        )
+
+        # requests per second to the target, shared with the campaigns running next to it
+        self.rate_limiter: TokenBucket = (
+            TokenBucket(config.request_rate_burst, config.request_rate_limit)
+            if config.request_rate_limit > 0 else None
+        )
 
         # initialize session
         self.request_session: requests.Session = None
@@ -31,6 +48,12 @@ class SequenceConverter:
 
     def _new_session(self):
         self.request_session = requests.Session()
+        # at most max_connection_count connections of the session to the target, more requests wait for one
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=self.fuzzer.config.max_connection_count, pool_block=True
+        )
+        self.request_session.mount("http://", adapter)
+        self.request_session.mount("https://", adapter)
 
     def _generate_random_data(
             self,
@@ -95,71 +118,128 @@ class SequenceConverter:
 
         return generated_value_tuple_list, reference_result_list
 
+    def _request_timeout(self, method: Method) -> float:
+        """
+        :return: the request timeout clipped to the time left in the budget
+        """
+        timeout = self.fuzzer.deadline.timeout(self.fuzzer.config.request_timeout)
+        if timeout < self.fuzzer.config.min_request_timeout:
+            # no request fits in the rest of the budget, the loops checking is_expired stop too
+            self.fuzzer.deadline.expire()
+            raise DeadlineExceeded(f"no time left for {method.signature}")
+        return timeout
+
+    def _wait_rate_limit(self, method: Method):
+        if self.rate_limiter is None:
+            return
+        if not self.rate_limiter.acquire(stop_event=self.fuzzer.deadline):
+            raise DeadlineExceeded(f"no time left for {method.signature}")
+
     def _do_request(self, method: Method, request: Request) -> Response:
         request_actor = getattr(self.request_session, method.method_type.value)
         url = self.fuzzer.config.url + request.url
+        profiler = self.fuzzer.profiler
+        with profiler.phase("rate_limit"):
+            self._wait_rate_limit(method)
+        timeout = self._request_timeout(method)
         response: Response = Response()
         response.request = request
         response.method = method
 
         # do request
+        start_time = time.perf_counter()
         try:
-            if isinstance(request.data, bytes):
-                request.headers["Content-Type"] = "application/octet-stream"
-                raw_response: requests.Response = request_actor(
-                    url,
-                    params=request.params,
-                    data=request.data,
-                    headers=request.headers,
-                    files=request.files,
-                    allow_redirects=False,
-                    timeout=30,
-                )
-            else:
-                raw_response: requests.Response = request_actor(
-                    url,
-                    params=request.params,
-                    data=request.form_data,
-                    json=request.data,
-                    headers=request.headers,
-                    files=request.files,
-                    allow_redirects=False,
-                    timeout=30,
-                )
-        except requests.exceptions.ReadTimeout as err:
+            with profiler.phase("send"):
+                if isinstance(request.data, bytes):
+                    request.headers["Content-Type"] = "application/octet-stream"
+                    raw_response: requests.Response = request_actor(
+                        url,
+                        params=request.params,
+                        data=request.data,
+                        headers=request.headers,
+                        files=request.files,
+                        allow_redirects=False,
+                        timeout=timeout,
+                    )
+                else:
+                    raw_response: requests.Response = request_actor(
+                        url,
+                        params=request.params,
+                        data=request.form_data,
+                        json=request.data,
+                        headers=request.headers,
+                        files=request.files,
+                        allow_redirects=False,
+                        timeout=timeout,
+                    )
+        except requests.exceptions.Timeout as err:
+            if self.fuzzer.deadline.is_expired:
+                # cut off by the deadline, not a slow response
+                raise DeadlineExceeded(f"deadline reached during {method.signature}") from err
+            if not isinstance(err, requests.exceptions.ReadTimeout):
+                raise err
             logger.error(err)
+            response.elapsed = time.perf_counter() - start_time
             response.status_code = ResponseCustomizedStatusCode.TIMEOUT.value
         except Exception as e:  # probably an encoding error
             raise e
         else:
-            response.text = raw_response.text
-            response.headers = raw_response.headers
-            if method in self.fuzzer.never_success_method_set:
-                a = 1
-            try:
-                response.parse_response(raw_response)
-            except Exception as e:  # returned value format not correct
-                # logger.error(f"Error when parsing response: {e}, {raw_response.text}")
-                pass
+            response.elapsed = time.perf_counter() - start_time
+            with profiler.phase("parse"):
+                response.text = raw_response.text
+                response.headers = raw_response.headers
+                if method in self.fuzzer.never_success_method_set:
+                    a = 1
+                try:
+                    response.parse_response(raw_response)
+                except Exception as e:  # returned value format not correct
+                    # logger.error(f"Error when parsing response: {e}, {raw_response.text}")
+                    pass
         return response
 
     def convert(self, sequence: Sequence) -> Sequence:
         # renew session
         self._new_session()
 
-        last_response: Response = None
         request_list: List[Request] = []
         response_list: List[Response] = []
 
+        profiler = self.fuzzer.profiler
+
+        try:
+            self._convert_methods(sequence, request_list, response_list)
+        except DeadlineExceeded as e:
+            # the rest of the sequence is abandoned, the executed part is still analysed
+            logger.debug(f"sequence aborted: {e}")
+        if len(request_list) == 0:
+            return sequence
+        with profiler.phase("analysis"):
+            self.fuzzer._on_sequence_end(sequence, request_list, response_list)
+        return sequence
+
+    def _convert_methods(
+            self,
+            sequence: Sequence,
+            request_list: List[Request],
+            response_list: List[Response],
+    ):
+        last_response: Response = None
+        profiler = self.fuzzer.profiler
+
         # generate value for each parameter in the sequence methods' parameters
         for method_index, method in enumerate(sequence.method_sequence):
+            if self.fuzzer.deadline.is_expired:
+                raise DeadlineExceeded(f"deadline reached before {method.signature}")
+
             # generate random data
-            generated_value, reference_result_list = self._generate_random_data(
-                method_index, method, sequence, response_list, last_response
-            )
+            with profiler.phase("generate"):
+                generated_value, reference_result_list = self._generate_random_data(
+                    method_index, method, sequence, response_list, last_response
+                )
 
             # assemble data
-            request: Request = build_request(method, generated_value)
+            with profiler.phase("build"):
+                request: Request = build_request(method, generated_value)
 
             # do response
             response = self._do_request(method, request)
@@ -167,8 +247,16 @@ class SequenceConverter:
             if method.operation_id == "getUserByName":
                 a = 1
 
-            # add to runtime dictionary
-            self.runtime_dictionary.add_response(response)
+            with profiler.phase("dictionary_update"):
+                # add to runtime dictionary
+                self.runtime_dictionary.add_response(response)
+
+                # update dependency success count
+                for reference_result in reference_result_list:
+                    if 200 <= response.status_code < 300:
+                        reference_result.dependency.update(5)
+                    else:
+                        reference_result.dependency.update(-1)
 
             # add to response list
             response_list.append(response)
@@ -176,17 +264,9 @@ class SequenceConverter:
             # add to request list
             request_list.append(request)
 
-            # update dependency success count
-            for reference_result in reference_result_list:
-                if 200 <= response.status_code < 300:
-                    reference_result.dependency.update(5)
-                else:
-                    reference_result.dependency.update(-1)
-
             # call analysis function
-            self.fuzzer._on_request_response(sequence, request, response)
-        self.fuzzer._on_sequence_end(sequence, request_list, response_list)
-        return sequence
+            with profiler.phase("analysis"):
+                self.fuzzer._on_request_response(sequence, request, response)
 
     def _generate_value_for_method_by_chatgpt(self, method: Method):
         generated_value_dict: Dict[str, Any] = {}
@@ -200,11 +280,13 @@ class SequenceConverter:
     def _do_chatgpt_request(self, method: Method, request: Request, session: requests.Session) -> Response:
         request_actor = getattr(session, method.method_type.value)
         url = request.url
+        timeout = self._request_timeout(method)
         response: Response = Response()
         response.request = request
         response.method = method
 
         # do request
+        start_time = time.perf_counter()
         try:
             if isinstance(request.data, bytes):
                 request.headers["Content-Type"] = "application/octet-stream"
@@ -215,7 +297,7 @@ class SequenceConverter:
                     headers=request.headers,
                     files=request.files,
                     allow_redirects=False,
-                    timeout=30,
+                    timeout=timeout,
                 )
             else:
                 raw_response: requests.Response = request_actor(
@@ -226,14 +308,21 @@ class SequenceConverter:
                     headers=request.headers,
                     files=request.files,
                     allow_redirects=False,
-                    timeout=30,
+                    timeout=timeout,
                 )
-        except requests.exceptions.ReadTimeout as err:
+        except requests.exceptions.Timeout as err:
+            if self.fuzzer.deadline.is_expired:
+                # cut off by the deadline, not a slow response
+                raise DeadlineExceeded(f"deadline reached during {method.signature}") from err
+            if not isinstance(err, requests.exceptions.ReadTimeout):
+                raise err
             logger.error(err)
+            response.elapsed = time.perf_counter() - start_time
             response.status_code = ResponseCustomizedStatusCode.TIMEOUT.value
         except Exception as e:  # probably an encoding error
             raise e
         else:
+            response.elapsed = time.perf_counter() - start_time
             response.text = raw_response.text
             response.headers = raw_response.headers
             if method in self.fuzzer.never_success_method_set:
@@ -253,13 +342,42 @@ class SequenceConverter:
         request.data = request_data
         try:
             response = self._do_chatgpt_request(request.method, request, session)
+        except DeadlineExceeded:
+            return
         except Exception as e:
             logger.error(f"Error when requesting ChatGPT instance: {e}, {request}")
             return
 
         if 200 <= response.status_code < 300:
             logger.info(f"ChatGPT instance request success: {request.method.signature}")
+            # the fuzz loop reuses it without asking the model again
+            self.seed_corpus.add_request(self.fuzzer.config.url, request)
 
         self.fuzzer._on_request_response(None, request, response)
         self.fuzzer._on_sequence_end(None, [request], [response])
         return response
+
+    def replay_seeds(self, count: int):
+        """
+        Add new seeds to the runtime dictionary and send stored templates again, the
+        templates of methods without a success in this run first
+        """
+        for method, value_list in self.seed_corpus.pop_pending_seed_list():
+            self.runtime_dictionary.add_request_values(method, value_list)
+
+        for method, template in self.seed_corpus.sample_template_list(
+                count, self.fuzzer.never_success_method_set
+        ):
+            if self.fuzzer.deadline.is_expired:
+                return
+            request: Request = template.to_request(method)
+            try:
+                response = self._do_request(method, request)
+            except DeadlineExceeded:
+                return
+            except Exception as e:
+                logger.error(f"Error when replaying seed: {e}, {request}")
+                continue
+            self.runtime_dictionary.add_response(response)
+            self.fuzzer._on_request_response(None, request, response)
+            self.fuzzer._on_sequence_end(None, [request], [response])
@@ -0,0 +1,157 @@
+import dataclasses
+import json
+import pathlib
+from typing import Dict, List, Set
+
+import loguru
+
+from algo.checkpoint import (BASE_FILE_NAME, load_checkpoint,
+                             restore_dependencies, restore_runtime_values)
+from model.method import Method
+from model.request_response import Request, Response
+
+logger = loguru.logger
+
+
+@dataclasses.dataclass
+class WarmStartSummary:
+    """
+    What a new run imported from earlier runs
+    """
+
+    checkpoint_count: int = 0
+    result_file_count: int = 0
+    # successful requests added as seeds
+    request_count: int = 0
+    dependency_count: int = 0
+    runtime_attribute_count: int = 0
+    # methods with a 2xx response in an earlier run, by endpoint
+    success_endpoint_set: Set[str] = dataclasses.field(default_factory=set)
+
+
+def _is_result_file(path: pathlib.Path) -> bool:
+    return path.suffix == ".json" and path.stem[:4].isdigit()
+
+
+def _resolve_source_list(path: pathlib.Path):
+    """
+    Checkpoint directories and result files of a path: a checkpoint directory, a result file of
+    ResultWriterAnalysis or the output directory of a run holding both
+    """
+    if path.is_file():
+        return [], [path]
+    if (path / BASE_FILE_NAME).exists():
+        return [path], []
+    checkpoint_dir_list = [path / "checkpoint"] if (path / "checkpoint" / BASE_FILE_NAME).exists() else []
+    return checkpoint_dir_list, sorted(child for child in path.glob("*.json") if _is_result_file(child))
+
+
+class WarmStart:
+    """
+    Import what earlier runs learned into a new run, after setup and before the warm up.
+    Methods are matched by "TYPE path", so imports survive edits of the document: values of
+    successful requests become seeds, responses fill the runtime dictionary, dependency rewards
+    and promoted edges are restored, and methods known to succeed need a single warm up pass.
+    """
+
+    def __init__(self, fuzzer: "Fuzzer"):
+        self.fuzzer: "Fuzzer" = fuzzer
+        self.endpoint_to_method_map: Dict[str, Method] = {
+            method.endpoint: method for method in fuzzer.graph.method_list
+        }
+        self.path_to_method_list_map: Dict[str, List[Method]] = {}
+        for method in fuzzer.graph.method_list:
+            self.path_to_method_list_map.setdefault(method.method_path, []).append(method)
+        self.summary: WarmStartSummary = WarmStartSummary()
+
+    def _import_checkpoint(self, checkpoint_dir: pathlib.Path):
+        checkpoint = load_checkpoint(checkpoint_dir)
+        if checkpoint is None:
+            return
+        state, _ = checkpoint
+        self.summary.dependency_count += restore_dependencies(
+            self.fuzzer,
+            state.get("dependency", {}),
+            self.fuzzer.config.warm_start_max_dependency_count,
+        )
+        self.summary.runtime_attribute_count += restore_runtime_values(
+            self.fuzzer, state.get("runtime_value", {})
+        )
+        fuzzer_state = state.get("fuzzer", {})
+        self.summary.success_endpoint_set |= set(fuzzer_state.get("method_list", [])) - set(
+            fuzzer_state.get("never_success_method_list", [])
+        )
+        self.summary.checkpoint_count += 1
+
+    def _find_method(self, request_dict: dict) -> Method:
+        if "endpoint" in request_dict:
+            return self.endpoint_to_method_map.get(request_dict["endpoint"], None)
+        # result files written before the endpoint was saved only have the path
+        method_list = self.path_to_method_list_map.get(request_dict.get("method", None), [])
+        return method_list[0] if len(method_list) == 1 else None
+
+    def _import_result_file(self, result_path: pathlib.Path):
+        with open(result_path, "r") as f:
+            result = json.load(f)
+        seed_corpus = self.fuzzer.sequence_converter.seed_corpus
+        runtime_dictionary = self.fuzzer.sequence_converter.runtime_dictionary
+        for sequence_dict_list in result.get("sequence_list", []):
+            for item in sequence_dict_list:
+                response_dict = item["response"]
+                status_code = response_dict.get("status_code", None)
+                if status_code is None or not 200 <= status_code < 300:
+                    continue
+                request_dict = item["request"]
+                method = self._find_method(request_dict)
+                if method is None:
+                    continue
+                self.summary.success_endpoint_set.add(method.endpoint)
+
+                request = Request()
+                request.method = method
+                request.url = request_dict.get("url", None) or method.method_path
+                request.params = request_dict.get("params", {}) or {}
+                request.data = request_dict.get("data", {})
+                request.headers = request_dict.get("headers", {}) or {}
+                request.form_data = request_dict.get("form_data", {}) or {}
+                if seed_corpus.add_request(self.fuzzer.config.url, request, persist=False):
+                    self.summary.request_count += 1
+
+                response = Response()
+                response.method = method
+                response.request = request
+                response.status_code = status_code
+                response.text = response_dict.get("text", None)
+                try:
+                    response.parse_text()
+                except Exception:
+                    # not a json body
+                    continue
+                runtime_dictionary.add_response(response)
+        self.summary.result_file_count += 1
+
+    def run(self, path_list: List[str]) -> WarmStartSummary:
+        for path in path_list:
+            path = pathlib.Path(path)
+            if not path.exists():
+                logger.warning(f"warm start source {path} does not exist")
+                continue
+            checkpoint_dir_list, result_path_list = _resolve_source_list(path)
+            for checkpoint_dir in checkpoint_dir_list:
+                try:
+                    self._import_checkpoint(checkpoint_dir)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f"failed to import checkpoint {checkpoint_dir}: {e}")
+            for result_path in result_path_list:
+                try:
+                    self._import_result_file(result_path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f"failed to import result file {result_path}: {e}")
+        self.summary.success_endpoint_set &= set(self.endpoint_to_method_map)
+        logger.info(
+            f"warm start: {self.summary.checkpoint_count} checkpoints, "
+            f"{self.summary.result_file_count} result files, {self.summary.request_count} seed requests, "
+            f"{self.summary.dependency_count} dependencies, {self.summary.runtime_attribute_count} "
+            f"runtime attributes, {len(self.summary.success_endpoint_set)} methods known to succeed"
+        )
+        return self.summary
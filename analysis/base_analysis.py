@@ -1,5 +1,6 @@
-from typing import List
+from typing import Dict, List, Optional, Set
 
+from model.method import Method
 from model.operation_dependency_graph import OperationDependencyGraph
 from model.request_response import Request, Response
 from model.sequence import Sequence
@@ -28,5 +29,75 @@ class Analysis:
     def on_iteration_end(self):
         pass
 
+    def on_batch(self, event_list: List["AnalysisEvent"]):
+        """
+        Called on the event bus thread with a batch of events in publishing order.
+        Override it to process a batch at once, by default each event is dispatched
+        to its callback.
+        """
+        for event in event_list:
+            event.dispatch(self)
+
+    def on_specification_change(self, diff: "SpecificationDiff"):
+        pass
+
     def on_end(self):
         pass
+
+    def get_state(self) -> Optional[dict]:
+        """
+        Json serializable counters to checkpoint, methods given by their endpoint.
+        None if the analysis keeps nothing worth restoring.
+        """
+        return None
+
+    def set_state(self, state: dict):
+        """
+        Restore the counters returned by get_state, called after on_init
+        """
+        pass
+
+    def _init_method_sets(self, method_list: List[Method]):
+        """
+        Methods of the document and the ones which got a 2xx or a 5xx response, for the analyses counting them
+        """
+        self.method_list: List[Method] = list(method_list)
+        self.method_request_count: Dict[Method, int] = {
+            method: 0 for method in self.method_list
+        }
+        self.total_success_method_set: Set[Method] = set()
+        self.total_failed_method_set: Set[Method] = set()
+        self.total_method_count: int = len(self.method_list)
+
+    def _apply_method_diff(self, diff: "SpecificationDiff"):
+        outdated_method_set = set(diff.outdated_method_list)
+        self.method_list = [
+            method for method in self.method_list if method not in outdated_method_set
+        ] + diff.new_method_list
+        for method in diff.new_method_list:
+            self.method_request_count[method] = 0
+        self.total_success_method_set -= outdated_method_set
+        self.total_failed_method_set -= outdated_method_set
+        self.total_method_count = len(self.method_list)
+
+    def _get_method_set_state(self) -> dict:
+        return {
+            "success_method_list": sorted(method.endpoint for method in self.total_success_method_set),
+            "failed_method_list": sorted(method.endpoint for method in self.total_failed_method_set),
+        }
+
+    def _set_method_set_state(self, state: dict):
+        """
+        Methods are matched by endpoint, the ones no longer in the document are dropped
+        """
+        endpoint_to_method_map = {method.endpoint: method for method in self.method_list}
+        self.total_success_method_set = {
+            endpoint_to_method_map[endpoint]
+            for endpoint in state["success_method_list"]
+            if endpoint in endpoint_to_method_map
+        }
+        self.total_failed_method_set = {
+            endpoint_to_method_map[endpoint]
+            for endpoint in state["failed_method_list"]
+            if endpoint in endpoint_to_method_map
+        }
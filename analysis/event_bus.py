@@ -0,0 +1,204 @@
+import dataclasses
+import enum
+import queue
+import threading
+import time
+from typing import List, Tuple
+
+import loguru
+
+from model.request_response import Request, Response
+from model.sequence import Sequence
+
+logger = loguru.logger
+
+
+@dataclasses.dataclass(frozen=True)
+class AnalysisEvent:
+    timestamp: float = dataclasses.field(default_factory=time.time)
+
+    # control events are never dropped
+    is_control = False
+
+    def dispatch(self, analysis: "Analysis"):
+        pass
+
+
+@dataclasses.dataclass(frozen=True)
+class RequestResponseEvent(AnalysisEvent):
+    sequence: Sequence = None
+    request: Request = None
+    response: Response = None
+
+    def dispatch(self, analysis: "Analysis"):
+        analysis.on_request_response(self.sequence, self.request, self.response)
+
+
+@dataclasses.dataclass(frozen=True)
+class SequenceEndEvent(AnalysisEvent):
+    sequence: Sequence = None
+    request_list: Tuple[Request, ...] = ()
+    response_list: Tuple[Response, ...] = ()
+
+    def dispatch(self, analysis: "Analysis"):
+        analysis.on_sequence_end(self.sequence, self.request_list, self.response_list)
+
+
+@dataclasses.dataclass(frozen=True)
+class IterationEndEvent(AnalysisEvent):
+    is_control = True
+
+    def dispatch(self, analysis: "Analysis"):
+        analysis.on_iteration_end()
+
+
+@dataclasses.dataclass(frozen=True)
+class SpecificationChangeEvent(AnalysisEvent):
+    diff: "SpecificationDiff" = None
+    is_control = True
+
+    def dispatch(self, analysis: "Analysis"):
+        analysis.on_specification_change(self.diff)
+
+
+class DropPolicy(enum.Enum):
+    # wait for space in the queue, slows the fuzzer down to the analyses
+    BLOCK = "block"
+    # discard the event being published
+    DROP_NEWEST = "drop_newest"
+    # discard the oldest queued event to make room
+    DROP_OLDEST = "drop_oldest"
+
+
+class AnalysisEventBus:
+    """
+    Bounded queue between the fuzzing thread and the analyses.
+    Events are delivered in batches on a separate thread through Analysis.on_batch.
+    """
+
+    def __init__(
+        self,
+        analysis_list: List["Analysis"],
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        drop_policy: DropPolicy = DropPolicy.BLOCK,
+        profiler: "PhaseProfiler" = None,
+    ):
+        self.analysis_list: List["Analysis"] = analysis_list
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.drop_policy: DropPolicy = drop_policy
+        self.profiler: "PhaseProfiler" = profiler
+        self.event_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.published_count: int = 0
+        self.delivered_count: int = 0
+        self.dropped_count: int = 0
+        self._condition: threading.Condition = threading.Condition()
+        self._stop_event: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(
+            target=self._consume, name="analysis-event-bus", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def publish(self, event: AnalysisEvent) -> bool:
+        with self._condition:
+            self.published_count += 1
+        if event.is_control or self.drop_policy == DropPolicy.BLOCK:
+            self.event_queue.put(event)
+            return True
+        try:
+            self.event_queue.put_nowait(event)
+            return True
+        except queue.Full:
+            pass
+        if self.drop_policy == DropPolicy.DROP_OLDEST and self._replace_oldest(event):
+            self._mark_done(0, 1)
+            return True
+        self._mark_done(0, 1)
+        return False
+
+    def _replace_oldest(self, event: AnalysisEvent) -> bool:
+        """
+        Drop the oldest queued event which is not a control event and queue event instead,
+        control events keep their position. Never blocks.
+
+        :return: False if only control events are queued
+        """
+        event_queue = self.event_queue
+        with event_queue.mutex:
+            for index, queued_event in enumerate(event_queue.queue):
+                if not queued_event.is_control:
+                    del event_queue.queue[index]
+                    event_queue.queue.append(event)
+                    event_queue.not_empty.notify()
+                    return True
+        return False
+
+    def _mark_done(self, delivered_count: int, dropped_count: int):
+        with self._condition:
+            self.delivered_count += delivered_count
+            self.dropped_count += dropped_count
+            self._condition.notify_all()
+
+    def _consume(self):
+        while not (self._stop_event.is_set() and self.event_queue.empty()):
+            try:
+                event_list = [self.event_queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(event_list) < self.batch_size:
+                try:
+                    event_list.append(self.event_queue.get_nowait())
+                except queue.Empty:
+                    break
+            for analysis in self.analysis_list:
+                try:
+                    if self.profiler is None:
+                        analysis.on_batch(event_list)
+                    else:
+                        with self.profiler.phase(f"analysis_thread.{analysis.name}"):
+                            analysis.on_batch(event_list)
+                except Exception as e:
+                    logger.error(f"analysis {analysis.name} failed on batch: {e}")
+            self._mark_done(len(event_list), 0)
+
+    def _discard_pending(self):
+        discarded_count = 0
+        while True:
+            try:
+                self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+            discarded_count += 1
+        self._mark_done(0, discarded_count)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every published event is delivered or dropped
+
+        :return: False if the timeout expired first
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.delivered_count + self.dropped_count >= self.published_count,
+                timeout=timeout,
+            )
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Deliver the remaining events and stop the consumer thread
+
+        :return: False if the events could not be delivered within the timeout
+        """
+        is_flushed = self.flush(timeout)
+        if not is_flushed:
+            # stop after the batch being delivered instead of waiting for the whole queue
+            self._discard_pending()
+        self._stop_event.set()
+        self._thread.join(timeout=self.flush_interval * 2)
+        if self.dropped_count > 0:
+            logger.warning(f"analysis event bus dropped {self.dropped_count} events")
+        return is_flushed
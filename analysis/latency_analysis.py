@@ -0,0 +1,189 @@
+import json
+from typing import Dict, List
+
+import loguru
+
+from analysis.base_analysis import Analysis
+from analysis.result_writer_analysis import BytesEncoder
+from constant.api import ResponseCustomizedStatusCode
+from model.method import Method
+from model.request_response import Request, Response
+from util.hdr_histogram import HdrHistogram
+
+logger = loguru.logger
+
+# refresh the cached median of a method every n samples, percentiles are not O(1)
+MEDIAN_REFRESH_INTERVAL = 32
+
+
+def status_class(status_code: int) -> str:
+    if status_code == ResponseCustomizedStatusCode.TIMEOUT.value:
+        return "timeout"
+    if status_code == ResponseCustomizedStatusCode.EXCEPTION.value:
+        return "exception"
+    return f"{status_code // 100}xx"
+
+
+class MethodLatency:
+    def __init__(self):
+        self.histogram: HdrHistogram = HdrHistogram()
+        self.status_class_histogram_map: Dict[str, HdrHistogram] = {}
+        self.window_histogram: HdrHistogram = HdrHistogram()
+        # slowest request of the current window
+        self.window_slowest_response: Response = None
+        self.window_p99_list: List[float] = []
+        self.baseline_p99: float = None
+        self.median: float = None
+        self.is_degraded: bool = False
+        self.spike_count: int = 0
+        self.saved_request_count: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            **self.histogram.to_dict(),
+            "status_class": {
+                name: histogram.to_dict()
+                for name, histogram in self.status_class_histogram_map.items()
+            },
+            "window_p99": self.window_p99_list,
+            "is_degraded": self.is_degraded,
+            "spike_count": self.spike_count,
+        }
+
+
+class LatencyAnalysis(Analysis):
+    """
+    Per method and per status class latency histograms.
+    Flags methods whose p99 degrades over the run and requests far slower than the
+    median of their method, the offending requests are saved to slow_requests.jsonl.
+    """
+
+    name = "latency_analysis"
+
+    def on_init(self, fuzzer: "Fuzzer"):
+        self.fuzzer: "Fuzzer" = fuzzer
+        self.config = fuzzer.config
+        self.method_latency_map: Dict[Method, MethodLatency] = {}
+        self.degraded_method_list: List[Method] = []
+        self.slow_request_path = fuzzer.output_dir / "slow_requests.jsonl"
+        self.report_path = fuzzer.output_dir / "latency_report.json"
+        self.latency_histogram = fuzzer.metrics.histogram(
+            "morest_request_latency_seconds", "Request latency, by status class"
+        )
+        self.slow_request_counter = fuzzer.metrics.counter(
+            "morest_slow_requests_total", "Requests flagged as slow, by reason"
+        )
+
+    def on_request_response(self, sequence, request: Request, response: Response):
+        if response.elapsed is None:
+            return
+        method = request.method
+        elapsed = response.elapsed
+        latency = self.method_latency_map.get(method, None)
+        if latency is None:
+            latency = MethodLatency()
+            self.method_latency_map[method] = latency
+
+        response_status_class = status_class(response.status_code)
+        self.latency_histogram.observe(elapsed, status_class=response_status_class)
+        latency.histogram.record(elapsed)
+        if response_status_class not in latency.status_class_histogram_map:
+            latency.status_class_histogram_map[response_status_class] = HdrHistogram()
+        latency.status_class_histogram_map[response_status_class].record(elapsed)
+
+        self._check_spike(method, latency, response)
+        self._update_window(method, latency, response)
+
+    def _check_spike(self, method: Method, latency: MethodLatency, response: Response):
+        if (
+            latency.median is None
+            or latency.histogram.total_count % MEDIAN_REFRESH_INTERVAL == 0
+        ):
+            latency.median = latency.histogram.percentile(50)
+        if latency.histogram.total_count < self.config.latency_min_samples:
+            return
+        if (
+            response.elapsed >= self.config.latency_spike_min_seconds
+            and response.elapsed > self.config.latency_spike_ratio * latency.median
+        ):
+            latency.spike_count += 1
+            self._save_request(method, latency, response, "spike", latency.median)
+
+    def _update_window(self, method: Method, latency: MethodLatency, response: Response):
+        latency.window_histogram.record(response.elapsed)
+        if (
+            latency.window_slowest_response is None
+            or response.elapsed > latency.window_slowest_response.elapsed
+        ):
+            latency.window_slowest_response = response
+        if latency.window_histogram.total_count < self.config.latency_window_size:
+            return
+
+        window_p99 = latency.window_histogram.percentile(99)
+        latency.window_p99_list.append(window_p99)
+        if latency.baseline_p99 is None:
+            latency.baseline_p99 = window_p99
+        elif (
+            window_p99 > self.config.latency_degradation_ratio * latency.baseline_p99
+            and window_p99 - latency.baseline_p99 >= self.config.latency_spike_min_seconds
+        ):
+            if not latency.is_degraded:
+                latency.is_degraded = True
+                self.degraded_method_list.append(method)
+                logger.warning(
+                    f"p99 latency of {method} degraded from {latency.baseline_p99:.3f}s to {window_p99:.3f}s"
+                )
+            self._save_request(
+                method,
+                latency,
+                latency.window_slowest_response,
+                "degradation",
+                latency.baseline_p99,
+            )
+        latency.window_histogram = HdrHistogram()
+        latency.window_slowest_response = None
+
+    def _save_request(
+        self,
+        method: Method,
+        latency: MethodLatency,
+        response: Response,
+        reason: str,
+        reference_latency: float,
+    ):
+        self.slow_request_counter.inc(reason=reason)
+        if latency.saved_request_count >= self.config.latency_max_saved_requests_per_method:
+            return
+        latency.saved_request_count += 1
+        record = {
+            "method": method.signature,
+            "reason": reason,
+            "elapsed": response.elapsed,
+            "reference_latency": reference_latency,
+            "request": response.request.to_dict(),
+            "response": {"status_code": response.status_code},
+        }
+        with open(self.slow_request_path, "a") as f:
+            f.write(json.dumps(record, cls=BytesEncoder) + "\n")
+
+    def on_end(self):
+        report = {
+            "methods": {
+                method.signature: latency.to_dict()
+                for method, latency in self.method_latency_map.items()
+            },
+            "degraded_methods": [method.signature for method in self.degraded_method_list],
+        }
+        with open(self.report_path, "w") as f:
+            json.dump(report, f, indent=4)
+
+        slowest_list = sorted(
+            self.method_latency_map.items(),
+            key=lambda item: item[1].histogram.percentile(99),
+            reverse=True,
+        )[:5]
+        for method, latency in slowest_list:
+            logger.info(
+                f"Latency of {method}: p50 {latency.histogram.percentile(50):.3f}s, "
+                f"p99 {latency.histogram.percentile(99):.3f}s, max {latency.histogram.max_value:.3f}s"
+            )
@@ -7,7 +7,6 @@ from typing import Dict, List, Tuple
 import loguru
 
 from analysis.base_analysis import Analysis
-from model.method import Method
 from model.operation_dependency_graph import OperationDependencyGraph
 from model.request_response import Request, Response
 from model.sequence import Sequence
@@ -28,18 +27,15 @@ class ResultWriterAnalysis(Analysis):
     def on_init(self, fuzzer: "Fuzzer"):
         self.begin_time: float = time.time()
         self.fuzzer: "Fuzzer" = fuzzer
-        self.method_list: List[Method] = list(fuzzer.graph.method_list)
-        self.method_request_count: Dict[Method, int] = {
-            method: 0 for method in self.method_list
-        }
+        self._init_method_sets(fuzzer.graph.method_list)
         self.status_code_count: Dict[int, int] = {}
-        self.total_success_method_set: set = set()
-        self.total_failed_method_set: set = set()
         self.total_success_count: int = 0
         self.total_request_count: int = 0
-        self.total_method_count: int = len(self.method_list)
         self.sequence_list: List[List[Dict]] = []
 
+    def on_specification_change(self, diff):
+        self._apply_method_diff(diff)
+
     def on_request_response(self, sequence, request, response):
         status_code = response.status_code
         if status_code not in self.status_code_count:
@@ -71,6 +67,19 @@ class ResultWriterAnalysis(Analysis):
             )
         self.sequence_list.append(sequence_dict_list)
 
+    def get_state(self) -> dict:
+        # the sequences are in the result files of the earlier runs
+        return {
+            "total_success_count": self.total_success_count,
+            "total_request_count": self.total_request_count,
+            **self._get_method_set_state(),
+        }
+
+    def set_state(self, state: dict):
+        self.total_success_count = state["total_success_count"]
+        self.total_request_count = state["total_request_count"]
+        self._set_method_set_state(state)
+
     def on_end(self):
         # write result
         result_folder = self.fuzzer.output_dir
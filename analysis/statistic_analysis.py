@@ -1,5 +1,7 @@
+import json
+import threading
 import time
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Set, Tuple
 
 import loguru
 
@@ -8,6 +10,7 @@ from model.method import Method
 from model.operation_dependency_graph import OperationDependencyGraph
 from model.request_response import Request, Response
 from model.sequence import Sequence
+from util.metrics import MetricsRegistry
 
 logger = loguru.logger
 
@@ -18,35 +21,103 @@ class StatisticAnalysis(Analysis):
     def on_init(self, fuzzer: "Fuzzer"):
         self.begin_time: float = time.time()
         self.fuzzer: "Fuzzer" = fuzzer
-        self.method_list: List[Method] = list(fuzzer.graph.method_list)
-        self.method_request_count: Dict[Method, int] = {
-            method: 0 for method in self.method_list
-        }
+        self._init_method_sets(fuzzer.graph.method_list)
         self.status_code_count: Dict[int, int] = {}
-        self.total_success_method_set: set = set()
-        self.total_failed_method_set: set = set()
         self.total_success_count: int = 0
         self.total_request_count: int = 0
-        self.total_method_count: int = len(self.method_list)
+
+        # maintained per response instead of recomputed from method_list each iteration
+        self.never_success_method_set: Set[Method] = set(self.method_list)
+        self.invalid_method_set: Set[Method] = set(self.method_list)
+        # the sets are updated by the thread delivering the events and read by the fuzz thread
+        self.method_set_lock: threading.Lock = threading.Lock()
+
+        metrics: MetricsRegistry = fuzzer.metrics
+        self.request_counter = metrics.counter(
+            "morest_requests_total", "Requests sent, by status code"
+        )
+        self.success_method_gauge = metrics.gauge(
+            "morest_success_methods", "Methods with at least one 2xx response"
+        )
+        self.failed_method_gauge = metrics.gauge(
+            "morest_failed_methods", "Methods with at least one 5xx response"
+        )
+        self.never_success_method_gauge = metrics.gauge(
+            "morest_never_success_methods", "Methods without any 2xx response"
+        )
+        self.qps_gauge = metrics.gauge("morest_qps", "Requests per second since start")
+        self.never_success_method_gauge.set(len(self.never_success_method_set))
+
+        # coverage over time, written to progress.json
+        self.progress_list: List[Dict[str, Any]] = []
+        self.progress_time: float = 0
+
+    def _record_progress(self):
+        self.progress_time = time.time()
+        self.progress_list.append(
+            {
+                "elapsed": self.progress_time - self.fuzzer.begin_time,
+                "request_count": self.total_request_count,
+                "success_count": self.total_success_count,
+                "success_method_count": len(self.total_success_method_set),
+                "failed_method_count": len(self.total_failed_method_set),
+            }
+        )
+
+    def on_specification_change(self, diff):
+        outdated_method_set = set(diff.outdated_method_list)
+        with self.method_set_lock:
+            self._apply_method_diff(diff)
+            self.never_success_method_set -= outdated_method_set
+            self.never_success_method_set |= set(diff.new_method_list)
+            self.invalid_method_set -= outdated_method_set
+            self.invalid_method_set |= set(diff.new_method_list)
+        self._update_method_gauges()
+
+    def method_set_snapshot(self) -> Tuple[Set[Method], Set[Method]]:
+        """
+        :return: copies of the methods which succeeded and of the methods which failed
+        """
+        with self.method_set_lock:
+            return set(self.total_success_method_set), set(self.total_failed_method_set)
+
+    def _update_method_gauges(self):
+        self.success_method_gauge.set(len(self.total_success_method_set))
+        self.failed_method_gauge.set(len(self.total_failed_method_set))
+        self.never_success_method_gauge.set(len(self.never_success_method_set))
 
     def on_request_response(self, sequence, request, response):
         status_code = response.status_code
         if status_code not in self.status_code_count:
             self.status_code_count[status_code] = 0
         self.status_code_count[status_code] += 1
+        self.request_counter.inc(status_code=status_code)
 
         if 200 <= response.status_code < 300:
             self.total_success_count += 1
-            self.total_success_method_set.add(request.method)
-            if request.method in self.fuzzer.never_success_method_set:
-                self.fuzzer.never_success_method_set.remove(request.method)
+            if request.method not in self.total_success_method_set:
+                with self.method_set_lock:
+                    self.total_success_method_set.add(request.method)
+                    self.never_success_method_set.discard(request.method)
+                    self.invalid_method_set.discard(request.method)
+                self._update_method_gauges()
 
         if 600 > response.status_code >= 500:
-            self.total_failed_method_set.add(request.method)
+            if request.method not in self.total_failed_method_set:
+                with self.method_set_lock:
+                    self.total_failed_method_set.add(request.method)
+                    self.invalid_method_set.discard(request.method)
+                self._update_method_gauges()
 
         self.total_request_count += 1
 
+        progress_interval = self.fuzzer.config.progress_interval
+        if progress_interval > 0 and self.progress_time + progress_interval <= time.time():
+            self._record_progress()
+
     def on_iteration_end(self):
+        if self.total_request_count == 0:
+            return
         total_method_success_rate: float = (
                 len(self.total_success_method_set) / self.total_method_count
         )
@@ -64,36 +135,51 @@ class StatisticAnalysis(Analysis):
         logger.info(
             f"Total validate rate: {total_validate_rate} ({self.total_success_count} / {self.total_request_count})"
         )
-
-        for status_code in self.status_code_count:
-            logger.info(
-                f"Status code {status_code} count: {self.status_code_count[status_code]}, rate: {self.status_code_count[status_code] / self.total_request_count}"
-            )
-
-        # list methods which are neither success nor failed
-        invalid_method_set = (
-                set(self.method_list)
-                - self.total_success_method_set
-                - self.total_failed_method_set
-        )
-        logger.info(f"Total invalid method count: {len(invalid_method_set)}")
-        for method in invalid_method_set:
-            logger.info(f"Method {method} is neither success nor failed")
-
-        # list never success methods
-        never_success_method_set = set(self.method_list) - self.total_success_method_set
+        logger.info(f"Status code count: {self.status_code_count}")
+        logger.info(f"Total invalid method count: {len(self.invalid_method_set)}")
         logger.info(
-            f"Total never success method count: {len(never_success_method_set)}"
+            f"Total never success method count: {len(self.never_success_method_set)}"
         )
-        for method in never_success_method_set:
-            logger.info(f"Method {method} is never success")
-        self.fuzzer.never_success_method_set = never_success_method_set
-        self.fuzzer.success_method_set = self.total_success_method_set
-        self.fuzzer.failed_method_set = self.total_failed_method_set
+
         # calculate qps
         end_time = time.time()
         qps = self.total_request_count / (end_time - self.begin_time)
+        self.qps_gauge.set(qps)
         logger.info(f"QPS: {qps}")
 
+    def get_state(self) -> dict:
+        return {
+            "status_code_count": {
+                str(status_code): count for status_code, count in self.status_code_count.items()
+            },
+            "total_success_count": self.total_success_count,
+            "total_request_count": self.total_request_count,
+            **self._get_method_set_state(),
+        }
+
+    def set_state(self, state: dict):
+        self.status_code_count = {
+            int(status_code): count for status_code, count in state["status_code_count"].items()
+        }
+        self.total_success_count = state["total_success_count"]
+        self.total_request_count = state["total_request_count"]
+        with self.method_set_lock:
+            self._set_method_set_state(state)
+            self.never_success_method_set = set(self.method_list) - self.total_success_method_set
+            self.invalid_method_set = (
+                    self.never_success_method_set - self.total_failed_method_set
+            )
+        for status_code, count in self.status_code_count.items():
+            self.request_counter.inc(count, status_code=status_code)
+        self._update_method_gauges()
+
     def on_end(self):
-        pass
+        if self.fuzzer.config.progress_interval > 0:
+            self._record_progress()
+            with open(self.fuzzer.output_dir / "progress.json", "w") as f:
+                json.dump(self.progress_list, f)
+        # list the methods once, listing them every iteration floods the log on large specs
+        for method in self.invalid_method_set:
+            logger.info(f"Method {method} is neither success nor failed")
+        for method in self.never_success_method_set:
+            logger.info(f"Method {method} is never success")
@@ -0,0 +1,339 @@
+import argparse
+import dataclasses
+import json
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import loguru
+import requests
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from algo.data_generator import DataGenerator
+from benchmark.spec_generator import PRESET_MAP, write_preset_specification
+from algo.fuzzer import Fuzzer
+from constant.fuzzer_config import FuzzerConfig
+from constant.parameter import ParameterLocation
+from model.method import Method
+from model.operation_dependency_graph import OperationDependencyGraph
+from model.parameter import ParameterAttribute
+from model.request_response import Response
+from model.sequence import Sequence
+from util.random_source import default_random_source, seed_default_random_source
+from util.request_builder import build_request
+from util.specification_loader import load_apis
+
+logger = loguru.logger
+
+SPEC_NAME_LIST = list(PRESET_MAP)
+# number of objects in the response bodies of the parse_response benchmark
+RESPONSE_SIZE_MAP = {"small": 10, "medium": 1000, "large": 10000}
+# seconds spent on one benchmark before it stops repeating
+MAX_BENCHMARK_TIME = 10
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    name: str
+    case: str
+    # operations timed per repeat, e.g. values generated or requests built
+    operation_count: int
+    repeat: int
+    # seconds per operation
+    best: float
+    median: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.case}]"
+
+    @property
+    def operations_per_second(self) -> float:
+        return 1 / self.best if self.best > 0 else 0
+
+    def to_dict(self) -> dict:
+        return {
+            **dataclasses.asdict(self),
+            "operations_per_second": self.operations_per_second,
+        }
+
+
+def measure(
+    name: str,
+    case: str,
+    function: Callable[[], Any],
+    operation_count: int,
+    repeat: int,
+) -> BenchmarkResult:
+    """
+    Run function up to repeat times, each run performing operation_count operations.
+    Repeats stop early once MAX_BENCHMARK_TIME is spent, large cases take seconds per run.
+    """
+    elapsed_list = []
+    total_time = 0
+    for _ in range(repeat):
+        begin_time = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - begin_time
+        total_time += elapsed
+        elapsed_list.append(elapsed / max(operation_count, 1))
+        if total_time > MAX_BENCHMARK_TIME:
+            break
+    result = BenchmarkResult(
+        name,
+        case,
+        operation_count,
+        len(elapsed_list),
+        min(elapsed_list),
+        statistics.median(elapsed_list),
+    )
+    logger.info(
+        f"{result.key}: {result.best * 1e6:.1f}us/op best, {result.median * 1e6:.1f}us/op median"
+    )
+    return result
+
+
+def parse_all(spec_path: pathlib.Path) -> List[Method]:
+    method_list = []
+    for api in load_apis(str(spec_path)):
+        for method in api.method_dict.values():
+            # parameters are parsed lazily
+            method.parse_parameters()
+            method_list.append(method)
+    return method_list
+
+
+def create_fuzzer(odg: OperationDependencyGraph, output_dir: pathlib.Path) -> Fuzzer:
+    config = FuzzerConfig()
+    config.enable_chatgpt = False
+    config.enable_async_analysis = False
+    config.metrics_snapshot_interval = 0
+    config.enable_phase_profiler = False
+    config.output_dir = str(output_dir)
+    # the generated values follow the seed of the benchmark
+    config.seed = default_random_source().seed
+    return Fuzzer(odg, config)
+
+
+def request_attribute_list(method: Method) -> List[ParameterAttribute]:
+    return [
+        parameter.parameter
+        for parameter in method.request_parameter.values()
+        if parameter.parameter is not None
+    ]
+
+
+def sample_json_body(item_count: int) -> Any:
+    return [
+        {
+            "id": index,
+            "name": f"name-{index}",
+            "status": ["active", "inactive", "pending"][index % 3],
+            "price": index * 0.5,
+            "enabled": index % 2 == 0,
+            "address": {"street": f"{index} main st", "city": "city", "zip": "12345"},
+            "tags": [f"tag-{index % 7}", f"tag-{index % 11}"],
+        }
+        for index in range(item_count)
+    ]
+
+
+def create_raw_response(body: Any) -> requests.Response:
+    raw_response = requests.Response()
+    raw_response.status_code = 200
+    raw_response.encoding = "utf-8"
+    raw_response._content = json.dumps(body).encode("utf-8")
+    raw_response.headers = CaseInsensitiveDict(
+        {"Content-Type": "application/json", "X-Request-Id": "benchmark"}
+    )
+    return raw_response
+
+
+def create_response(method: Method, body: Any) -> Response:
+    response = Response()
+    response.method = method
+    response.status_code = 200
+    response._parse_json_value("", body, ParameterLocation.BODY)
+    return response
+
+
+def benchmark_specification(
+        spec_name: str, spec_dir: pathlib.Path, output_dir: pathlib.Path, repeat: int
+) -> List[BenchmarkResult]:
+    spec_path = write_preset_specification(spec_name, spec_dir)
+    result_list = []
+
+    result_list.append(
+        measure("parsing", spec_name, lambda: parse_all(spec_path), 1, repeat)
+    )
+    apis = load_apis(str(spec_path))
+
+    def build_odg() -> OperationDependencyGraph:
+        odg = OperationDependencyGraph(apis)
+        odg.build()
+        return odg
+
+    result_list.append(measure("odg_build", spec_name, build_odg, 1, repeat))
+    odg = build_odg()
+    result_list.append(
+        measure("odg_generate_sequence", spec_name, odg.generate_sequence, 1, repeat)
+    )
+
+    fuzzer = create_fuzzer(odg, output_dir)
+    fuzzer.setup()
+    converter = fuzzer.sequence_converter
+    method_list = odg.method_list
+    sequence_map: Dict[Method, Sequence] = {}
+    for method in method_list:
+        sequence = Sequence()
+        sequence.add_method(method)
+        sequence_map[method] = sequence
+    attribute_tuple_list: List[Tuple[Method, ParameterAttribute]] = [
+        (method, attribute)
+        for method in method_list
+        for attribute in request_attribute_list(method)
+    ]
+
+    def generate_values():
+        for method, attribute in attribute_tuple_list:
+            data_generator = DataGenerator(
+                converter, 0, method, sequence_map[method], None, []
+            )
+            data_generator.generate_value(attribute)
+
+    result_list.append(
+        measure(
+            "generate_value", spec_name, generate_values, len(attribute_tuple_list), repeat
+        )
+    )
+
+    # responses of every method carrying values of every parameter type
+    response_list = [
+        create_response(method, sample_json_body(5)[index % 5])
+        for index, method in enumerate(method_list)
+    ]
+    runtime_dictionary = converter.runtime_dictionary
+
+    def add_responses():
+        for response in response_list:
+            runtime_dictionary.add_response(response)
+
+    result_list.append(
+        measure("runtime_dictionary_add_response", spec_name, add_responses, len(response_list), repeat)
+    )
+
+    def fetch_values():
+        for method, attribute in attribute_tuple_list:
+            data_generator = DataGenerator(
+                converter, 0, method, sequence_map[method], None, []
+            )
+            runtime_dictionary.fetch_value(data_generator, attribute)
+
+    result_list.append(
+        measure(
+            "runtime_dictionary_fetch_value",
+            spec_name,
+            fetch_values,
+            len(attribute_tuple_list),
+            repeat,
+        )
+    )
+
+    generated_value_list = [
+        (method, converter._generate_random_data(0, method, sequence_map[method], [], None)[0])
+        for method in method_list
+    ]
+
+    def build_requests():
+        for method, generated_value in generated_value_list:
+            build_request(method, generated_value)
+
+    result_list.append(
+        measure("build_request", spec_name, build_requests, len(generated_value_list), repeat)
+    )
+    return result_list
+
+
+def benchmark_parse_response(size_name: str, repeat: int) -> BenchmarkResult:
+    raw_response = create_raw_response(sample_json_body(RESPONSE_SIZE_MAP[size_name]))
+
+    def parse_response():
+        Response().parse_response(raw_response)
+
+    return measure("parse_response", size_name, parse_response, 1, repeat)
+
+
+def compare_with_baseline(
+    result_list: List[BenchmarkResult], baseline: dict, threshold: float
+) -> List[str]:
+    """
+    :param threshold: allowed slowdown, 0.2 flags results more than 20% slower
+    :return: descriptions of the regressions
+    """
+    baseline_map = {
+        f"{item['name']}[{item['case']}]": item for item in baseline["results"]
+    }
+    regression_list = []
+    for result in result_list:
+        baseline_result = baseline_map.get(result.key, None)
+        if baseline_result is None:
+            continue
+        ratio = result.best / baseline_result["best"] if baseline_result["best"] > 0 else 1
+        if ratio > 1 + threshold:
+            regression_list.append(
+                f"{result.key}: {baseline_result['best'] * 1e6:.1f}us/op -> {result.best * 1e6:.1f}us/op ({ratio:.2f}x)"
+            )
+    return regression_list
+
+
+def run(spec_name_list: List[str], repeat: int, seed: int) -> List[BenchmarkResult]:
+    seed_default_random_source(seed)
+    result_list = []
+    # the fuzzers write their output directories next to each other, removed with the specifications
+    with tempfile.TemporaryDirectory(prefix="morest-specs-") as spec_dir, \
+            tempfile.TemporaryDirectory(prefix="morest-benchmark-") as output_dir:
+        for spec_name in spec_name_list:
+            result_list += benchmark_specification(
+                spec_name, pathlib.Path(spec_dir), pathlib.Path(output_dir), repeat
+            )
+            result_list.append(benchmark_parse_response(spec_name, repeat))
+    return result_list
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spec", type=str, nargs="+", default=SPEC_NAME_LIST, choices=SPEC_NAME_LIST)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default="")
+    parser.add_argument("--baseline", type=str, default="")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, filter=lambda record: record["name"].startswith("__main__")
+               or record["level"].no >= logger.level("WARNING").no)
+    result_list = run(args.spec, args.repeat, args.seed)
+    output = {
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "results": [result.to_dict() for result in result_list],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=4)
+    else:
+        print(json.dumps(output, indent=4))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regression_list = compare_with_baseline(result_list, json.load(f), args.threshold)
+        for regression in regression_list:
+            logger.error(f"regression: {regression}")
+        if len(regression_list) > 0:
+            sys.exit(1)
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+import loguru
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+logger = loguru.logger
+
+# modules imported by main.py before the document is loaded
+CLI_MODULE_LIST = [
+    "algo.fuzzer",
+    "constant.fuzzer_config",
+    "constant.task_config",
+    "model.operation_dependency_graph",
+    "util.specification_loader",
+]
+# optional subsystems, only imported when they are enabled
+OPTIONAL_MODULE_LIST = ["openai", "prance", "graphviz", "openapi_spec_validator", "http.server"]
+
+
+def measure_import(module_list: List[str], cwd: pathlib.Path = ROOT_DIR) -> Dict:
+    """
+    Import the modules in a fresh interpreter with -X importtime
+
+    :param cwd: working directory of the interpreter, e.g. for modules writing files there on import
+    :return: seconds spent importing, per module and in total, and the optional modules loaded
+    """
+    code = (
+        "import json, sys\n"
+        + "".join(f"import {module}\n" for module in module_list)
+        + f"print(json.dumps([m for m in {OPTIONAL_MODULE_LIST!r} if m in sys.modules]))\n"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": str(ROOT_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # import time: self [us] | cumulative | imported package
+    module_time_map: Dict[str, float] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # top level imports are not indented, the rest is interpreter startup
+        if not name.startswith("  ") and name.strip() in module_list:
+            module_time_map[name.strip()] = int(cumulative) / 1e6
+    return {
+        "total": sum(module_time_map.values()),
+        "module_time": module_time_map,
+        "loaded_optional_modules": json.loads(process.stdout.strip().splitlines()[-1]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    # seconds, the median import time of the cli modules must stay below it
+    parser.add_argument("--budget", type=float, default=0.35)
+    parser.add_argument("--output", type=str, default="")
+    args = parser.parse_args()
+
+    measurement_list = [measure_import(CLI_MODULE_LIST) for _ in range(args.repeat)]
+    median_total = statistics.median(measurement["total"] for measurement in measurement_list)
+    loaded_optional_module_set = {
+        module
+        for measurement in measurement_list
+        for module in measurement["loaded_optional_modules"]
+    }
+    output = {
+        "python": sys.version.split()[0],
+        "budget": args.budget,
+        "median_total": median_total,
+        "module_time": min(
+            measurement_list, key=lambda measurement: measurement["total"]
+        )["module_time"],
+        "loaded_optional_modules": sorted(loaded_optional_module_set),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=4)
+    print(json.dumps(output, indent=4))
+
+    is_failed = False
+    if median_total > args.budget:
+        logger.error(f"importing the cli takes {median_total:.3f}s, budget {args.budget:.3f}s")
+        is_failed = True
+    for module in sorted(loaded_optional_module_set):
+        logger.error(f"optional module {module} is imported at startup")
+        is_failed = True
+    if is_failed:
+        sys.exit(1)
@@ -0,0 +1,180 @@
+import argparse
+import dataclasses
+import gc
+import json
+import math
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+import loguru
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from benchmark.component_benchmark import parse_all
+from benchmark.spec_generator import SpecShape, generate_specification, write_specification
+from model.operation_dependency_graph import OperationDependencyGraph
+from util.specification_loader import load_apis
+
+logger = loguru.logger
+
+RESOURCE_COUNT_LIST = [5, 10, 20, 40, 80]
+PHASE_LIST = ["parsing", "odg_build"]
+
+
+@dataclasses.dataclass
+class ScalingPoint:
+    resource_count: int
+    operation_count: int
+    edge_count: int
+    # phase name to seconds and to peak bytes allocated
+    time_map: Dict[str, float]
+    memory_map: Dict[str, int]
+
+
+def measure_phase(function: Callable[[], Any]) -> Tuple[Any, float, int]:
+    """
+    Run function once for the time and once more under tracemalloc for the peak memory,
+    tracing slows the allocations down and would distort the time
+    """
+    gc.collect()
+    start_time = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start_time
+
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def measure_point(shape: SpecShape, spec_dir: pathlib.Path) -> ScalingPoint:
+    spec_path = spec_dir / f"generated_{shape.resource_count}.yaml"
+    write_specification(generate_specification(shape), spec_path)
+
+    time_map, memory_map = {}, {}
+    method_list, time_map["parsing"], memory_map["parsing"] = measure_phase(
+        lambda: parse_all(spec_path)
+    )
+    apis = load_apis(str(spec_path))
+
+    def build_odg() -> OperationDependencyGraph:
+        odg = OperationDependencyGraph(apis)
+        odg.build()
+        return odg
+
+    odg, time_map["odg_build"], memory_map["odg_build"] = measure_phase(build_odg)
+    return ScalingPoint(
+        resource_count=shape.resource_count,
+        operation_count=len(method_list),
+        edge_count=len(odg.edge_list),
+        time_map=time_map,
+        memory_map=memory_map,
+    )
+
+
+def growth_exponent(size_list: List[float], value_list: List[float]) -> float:
+    """
+    Slope of the least squares fit of log(value) over log(size), 1 for linear growth
+    and 2 for quadratic growth
+    """
+    pair_list = [
+        (math.log(size), math.log(value))
+        for size, value in zip(size_list, value_list)
+        if size > 0 and value > 0
+    ]
+    if len(pair_list) < 2:
+        return 0
+    mean_x = sum(x for x, _ in pair_list) / len(pair_list)
+    mean_y = sum(y for _, y in pair_list) / len(pair_list)
+    variance = sum((x - mean_x) ** 2 for x, _ in pair_list)
+    if variance == 0:
+        return 0
+    return sum((x - mean_x) * (y - mean_y) for x, y in pair_list) / variance
+
+
+def run(
+    resource_count_list: List[int], base_shape: SpecShape
+) -> Tuple[List[ScalingPoint], Dict[str, Dict[str, float]]]:
+    """
+    :return: the measured points and the growth exponent of time and memory per phase,
+    relative to the operation count
+    """
+    point_list = []
+    with tempfile.TemporaryDirectory(prefix="morest-scaling-") as spec_dir:
+        for resource_count in resource_count_list:
+            shape = dataclasses.replace(base_shape, resource_count=resource_count)
+            point = measure_point(shape, pathlib.Path(spec_dir))
+            logger.info(
+                f"{point.operation_count} operations, {point.edge_count} edges: "
+                + ", ".join(
+                    f"{phase} {point.time_map[phase]:.3f}s {point.memory_map[phase] / 1e6:.1f}MB"
+                    for phase in PHASE_LIST
+                )
+            )
+            point_list.append(point)
+
+    size_list = [point.operation_count for point in point_list]
+    exponent_map = {
+        phase: {
+            "time": growth_exponent(size_list, [point.time_map[phase] for point in point_list]),
+            "memory": growth_exponent(size_list, [point.memory_map[phase] for point in point_list]),
+        }
+        for phase in PHASE_LIST
+    }
+    return point_list, exponent_map
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resource_count", type=int, nargs="+", default=RESOURCE_COUNT_LIST)
+    parser.add_argument("--dependency_density", type=float, default=0.1)
+    parser.add_argument("--schema_depth", type=int, default=1)
+    parser.add_argument("--property_count", type=int, default=5)
+    parser.add_argument("--openapi_version", type=str, default="3.0", choices=["2.0", "3.0"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default="")
+    # exponents above this are reported as superlinear
+    parser.add_argument("--max_exponent", type=float, default=1.3)
+    parser.add_argument("--fail_on_superlinear", action="store_true")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, filter=lambda record: record["name"].startswith("__main__")
+               or record["level"].no >= logger.level("WARNING").no)
+    base_shape = SpecShape(
+        dependency_density=args.dependency_density,
+        schema_depth=args.schema_depth,
+        property_count=args.property_count,
+        openapi_version=args.openapi_version,
+        seed=args.seed,
+    )
+    point_list, exponent_map = run(sorted(args.resource_count), base_shape)
+    output = {
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "shape": dataclasses.asdict(base_shape),
+        "points": [dataclasses.asdict(point) for point in point_list],
+        "exponents": exponent_map,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=4)
+    else:
+        print(json.dumps(output, indent=4))
+
+    superlinear_list = [
+        f"{phase} {metric} grows with exponent {exponent:.2f}"
+        for phase, metric_map in exponent_map.items()
+        for metric, exponent in metric_map.items()
+        if exponent > args.max_exponent
+    ]
+    for superlinear in superlinear_list:
+        logger.warning(f"superlinear: {superlinear}")
+    if args.fail_on_superlinear and len(superlinear_list) > 0:
+        sys.exit(1)
@@ -0,0 +1,277 @@
+import argparse
+import dataclasses
+import json
+import pathlib
+import random
+from typing import Dict, List
+
+import yaml
+
+NOUN_LIST = [
+    "pet", "owner", "store", "order", "user", "category", "tag", "invoice",
+    "payment", "shipment", "product", "review", "cart", "coupon", "location",
+    "vendor", "warehouse", "employee", "team", "project", "task", "comment",
+    "attachment", "label", "milestone", "release", "build", "artifact",
+    "deployment", "environment", "secret", "token", "session", "device",
+    "sensor", "reading", "alert", "incident", "report", "dashboard",
+]
+OPERATION_LIST = ["create", "get", "list", "update", "delete"]
+SCALAR_TYPE_LIST = ["string", "integer", "number", "boolean", "enum"]
+
+
+@dataclasses.dataclass
+class SpecShape:
+    """
+    Size and dependency structure of a generated api document.
+
+    Every resource has up to five operations (create, get, list, update, delete) on
+    /<resource>s and /<resource>s/{<resource>Id}. Property names are prefixed with their
+    resource, so only the following create dependency edges in the ODG:
+    - a consumer property named after the id of an earlier resource, added with
+      probability dependency_density for every earlier resource
+    - the properties of a shared component referenced by both resources
+    """
+
+    resource_count: int = 10
+    operations_per_resource: int = 5
+    # scalar properties on every level of a resource schema
+    property_count: int = 5
+    # levels of nested objects below the resource schema
+    schema_depth: int = 1
+    shared_component_count: int = 3
+    # shared components referenced by every resource schema
+    shared_reference_count: int = 1
+    dependency_density: float = 0.1
+    # "2.0" (swagger) or "3.0"
+    openapi_version: str = "3.0"
+    seed: int = 0
+
+
+PRESET_MAP: Dict[str, SpecShape] = {
+    "small": SpecShape(resource_count=4, dependency_density=0.5),
+    "medium": SpecShape(resource_count=20, dependency_density=0.2),
+    "large": SpecShape(resource_count=80, dependency_density=0.05),
+}
+
+
+def _capitalize(name: str) -> str:
+    return name[0].upper() + name[1:]
+
+
+class SpecGenerator:
+    def __init__(self, shape: SpecShape):
+        self.shape: SpecShape = shape
+        self.random: random.Random = random.Random(shape.seed)
+        self.is_swagger: bool = shape.openapi_version.startswith("2")
+        self.schema_map: Dict[str, dict] = {}
+        self.resource_list: List[str] = [
+            f"{NOUN_LIST[index % len(NOUN_LIST)]}{index}"
+            for index in range(shape.resource_count)
+        ]
+
+    def _ref(self, schema_name: str) -> dict:
+        if self.is_swagger:
+            return {"$ref": f"#/definitions/{schema_name}"}
+        return {"$ref": f"#/components/schemas/{schema_name}"}
+
+    def _scalar_schema(self, index: int) -> dict:
+        scalar_type = SCALAR_TYPE_LIST[index % len(SCALAR_TYPE_LIST)]
+        if scalar_type == "string":
+            return {"type": "string", "maxLength": 64, "example": "example"}
+        if scalar_type == "integer":
+            return {"type": "integer", "format": "int32", "minimum": 0, "maximum": 1000}
+        if scalar_type == "number":
+            return {"type": "number"}
+        if scalar_type == "boolean":
+            return {"type": "boolean"}
+        return {"type": "string", "enum": ["active", "inactive", "pending"]}
+
+    def _object_schema(self, prefix: str, depth: int) -> dict:
+        property_map = {
+            f"{prefix}Field{index}": self._scalar_schema(index)
+            for index in range(self.shape.property_count)
+        }
+        if depth < self.shape.schema_depth:
+            property_map[f"{prefix}Detail"] = self._object_schema(
+                f"{prefix}Detail{depth + 1}", depth + 1
+            )
+        return {
+            "type": "object",
+            "required": [f"{prefix}Field0"] if self.shape.property_count > 0 else [],
+            "properties": property_map,
+        }
+
+    def _generate_schemas(self):
+        for index in range(self.shape.shared_component_count):
+            name = f"Common{index}"
+            self.schema_map[name] = self._object_schema(f"common{index}", self.shape.schema_depth)
+
+        for index, resource in enumerate(self.resource_list):
+            schema = self._object_schema(resource, 0)
+            schema["properties"] = {
+                f"{resource}Id": {"type": "integer", "format": "int64"},
+                **schema["properties"],
+            }
+            for producer in self.resource_list[:index]:
+                if self.random.random() < self.shape.dependency_density:
+                    schema["properties"][f"{producer}Id"] = {
+                        "type": "integer",
+                        "format": "int64",
+                    }
+            shared_count = min(self.shape.shared_reference_count, self.shape.shared_component_count)
+            for shared_index in self.random.sample(range(self.shape.shared_component_count), shared_count):
+                schema["properties"][f"common{shared_index}"] = self._ref(f"Common{shared_index}")
+            self.schema_map[_capitalize(resource)] = schema
+
+        self.schema_map["Error"] = {
+            "type": "object",
+            "required": ["code", "message"],
+            "properties": {
+                "code": {"type": "integer", "format": "int32"},
+                "message": {"type": "string"},
+            },
+        }
+
+    def _response(self, description: str, schema: dict = None) -> dict:
+        if schema is None:
+            return {"description": description}
+        if self.is_swagger:
+            return {"description": description, "schema": schema}
+        return {"description": description, "content": {"application/json": {"schema": schema}}}
+
+    def _body_parameter_map(self, schema: dict) -> dict:
+        if self.is_swagger:
+            return {
+                "parameters": [{"name": "body", "in": "body", "required": True, "schema": schema}]
+            }
+        return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+    def _parameter(self, name: str, location: str, schema: dict, required: bool) -> dict:
+        if self.is_swagger:
+            return {"name": name, "in": location, "required": required, **schema}
+        return {"name": name, "in": location, "required": required, "schema": schema}
+
+    def _generate_operations(self, resource: str) -> Dict[str, dict]:
+        schema_name = _capitalize(resource)
+        ref = self._ref(schema_name)
+        error_response = self._response("error", self._ref("Error"))
+        id_parameter = self._parameter(
+            f"{resource}Id", "path", {"type": "integer", "format": "int64"}, True
+        )
+        collection_path = f"/{resource}s"
+        item_path = f"/{resource}s/{{{resource}Id}}"
+        operation_map = {
+            "create": (collection_path, "post", {
+                "operationId": f"create{schema_name}",
+                **self._body_parameter_map(ref),
+                "responses": {"200": self._response("created", ref), "default": error_response},
+            }),
+            "get": (item_path, "get", {
+                "operationId": f"get{schema_name}",
+                "parameters": [id_parameter],
+                "responses": {"200": self._response("found", ref), "default": error_response},
+            }),
+            "list": (collection_path, "get", {
+                "operationId": f"list{schema_name}s",
+                "parameters": [
+                    self._parameter("limit", "query", {"type": "integer", "minimum": 1, "maximum": 100}, False)
+                ],
+                "responses": {
+                    "200": self._response("list", {"type": "array", "items": ref}),
+                    "default": error_response,
+                },
+            }),
+            "update": (item_path, "put", {
+                "operationId": f"update{schema_name}",
+                "parameters": [id_parameter] + self._body_parameter_map(ref).get("parameters", []),
+                **{key: value for key, value in self._body_parameter_map(ref).items() if key != "parameters"},
+                "responses": {"200": self._response("updated", ref), "default": error_response},
+            }),
+            "delete": (item_path, "delete", {
+                "operationId": f"delete{schema_name}",
+                "parameters": [id_parameter],
+                "responses": {"200": self._response("deleted"), "default": error_response},
+            }),
+        }
+        path_map: Dict[str, dict] = {}
+        for operation in OPERATION_LIST[: self.shape.operations_per_resource]:
+            path, method_type, operation_body = operation_map[operation]
+            path_map.setdefault(path, {})[method_type] = operation_body
+        return path_map
+
+    def generate(self) -> dict:
+        self._generate_schemas()
+        path_map: Dict[str, dict] = {}
+        for resource in self.resource_list:
+            for path, operation_map in self._generate_operations(resource).items():
+                path_map.setdefault(path, {}).update(operation_map)
+
+        info = {
+            "title": f"Generated API ({self.shape.resource_count} resources)",
+            "version": "1.0.0",
+        }
+        if self.is_swagger:
+            return {
+                "swagger": "2.0",
+                "info": info,
+                "host": "localhost:8080",
+                "basePath": "/",
+                "schemes": ["http"],
+                "consumes": ["application/json"],
+                "produces": ["application/json"],
+                "paths": path_map,
+                "definitions": self.schema_map,
+            }
+        return {
+            "openapi": "3.0.2",
+            "info": info,
+            "servers": [{"url": "http://localhost:8080"}],
+            "paths": path_map,
+            "components": {"schemas": self.schema_map},
+        }
+
+
+def generate_specification(shape: SpecShape) -> dict:
+    return SpecGenerator(shape).generate()
+
+
+class _NoAliasDumper(yaml.SafeDumper):
+    def ignore_aliases(self, data):
+        return True
+
+
+def write_specification(specification: dict, file_path: pathlib.Path):
+    file_path = pathlib.Path(file_path)
+    with open(file_path, "w") as f:
+        if file_path.suffix == ".json":
+            json.dump(specification, f, indent=2)
+        else:
+            yaml.dump(specification, f, Dumper=_NoAliasDumper, sort_keys=False)
+
+
+def write_preset_specification(preset: str, spec_dir: pathlib.Path) -> pathlib.Path:
+    """
+    Generate the document of a preset, the documents are generated where they are used instead of committed
+
+    :return: path of <spec_dir>/<preset>.yaml
+    """
+    spec_path = pathlib.Path(spec_dir) / f"{preset}.yaml"
+    spec_path.parent.mkdir(parents=True, exist_ok=True)
+    write_specification(generate_specification(PRESET_MAP[preset]), spec_path)
+    return spec_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--preset", type=str, default="", choices=[""] + list(PRESET_MAP))
+    for field in dataclasses.fields(SpecShape):
+        parser.add_argument(f"--{field.name}", type=field.type, default=None)
+    args = parser.parse_args()
+
+    shape = dataclasses.replace(PRESET_MAP[args.preset]) if args.preset else SpecShape()
+    for field in dataclasses.fields(SpecShape):
+        value = getattr(args, field.name)
+        if value is not None:
+            setattr(shape, field.name, value)
+    write_specification(generate_specification(shape), args.output)
@@ -0,0 +1,87 @@
+import argparse
+import json
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import loguru
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+logger = loguru.logger
+
+
+def measure_startup(yaml_path: str) -> Dict[str, float]:
+    """
+    Time every startup phase until the first request of the first sequence is built.
+    Nothing is sent, so the result does not depend on the target service.
+
+    :param yaml_path: str
+    :return: Dict[str, float] phase name to seconds, "time_to_first_request" is the sum
+    """
+    timing: Dict[str, float] = {}
+    begin_time = time.perf_counter()
+
+    phase_time = time.perf_counter()
+    from algo.fuzzer import Fuzzer
+    from constant.fuzzer_config import FuzzerConfig
+    from model.operation_dependency_graph import OperationDependencyGraph
+    from util.api_document_warpper import wrap_methods_from_open_api_document
+    from util.request_builder import build_request
+    from util.specification_loader import load_specification, resolve_specification
+
+    timing["import"] = time.perf_counter() - phase_time
+
+    phase_time = time.perf_counter()
+    load_specification(yaml_path)
+    timing["load"] = time.perf_counter() - phase_time
+
+    phase_time = time.perf_counter()
+    specification = resolve_specification(yaml_path)
+    timing["load_and_resolve"] = time.perf_counter() - phase_time
+
+    phase_time = time.perf_counter()
+    apis = wrap_methods_from_open_api_document(specification)
+    timing["wrap"] = time.perf_counter() - phase_time
+
+    phase_time = time.perf_counter()
+    odg = OperationDependencyGraph(apis)
+    odg.build()
+    timing["odg_build"] = time.perf_counter() - phase_time
+
+    phase_time = time.perf_counter()
+    config = FuzzerConfig()
+    config.enable_chatgpt = False
+    config.output_dir = tempfile.mkdtemp(prefix="morest-benchmark-")
+    fuzzer = Fuzzer(odg, config)
+    fuzzer.setup()
+    timing["fuzzer_setup"] = time.perf_counter() - phase_time
+
+    phase_time = time.perf_counter()
+    sequence = fuzzer.sequence_list[0]
+    method = sequence.method_sequence[0]
+    generated_value, _ = fuzzer.sequence_converter._generate_random_data(
+        0, method, sequence, [], None
+    )
+    build_request(method, generated_value)
+    timing["first_request"] = time.perf_counter() - phase_time
+
+    timing["time_to_first_request"] = time.perf_counter() - begin_time
+    return timing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--yaml_path", type=str, required=True)
+    parser.add_argument("--output", type=str, default="")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    result = {"yaml_path": args.yaml_path, "timing": measure_startup(args.yaml_path)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+    print(json.dumps(result, indent=4))
@@ -0,0 +1,54 @@
+import dataclasses
+from typing import Any, Dict, List
+
+
+@dataclasses.dataclass
+class CampaignTarget:
+    """
+    A service fuzzed by a campaign, run by main.py in its own process
+    """
+
+    name: str = ""
+    yaml_path: str = ""
+    url: str = ""
+    time_budget: float = 3600
+    # cpus the run is pinned to, 0 leaves it unpinned
+    cpu_count: int = 1
+    # connections and requests per second to the service, 0 is unlimited
+    max_connections: int = 10
+    rate_limit: float = 0
+    # further main.py arguments, e.g. ["--chatgpt", "True"]
+    argument_list: List[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class CampaignConfig:
+    output_dir: str = "output/campaign"
+    # runs at the same time, 0 is the cpu count of the machine
+    max_parallel_count: int = 0
+    # a failed run is resumed from its checkpoint at most this many times
+    max_restart_count: int = 3
+    restart_delay: float = 10
+    # a failed run is not restarted with less budget left than this
+    min_restart_budget: float = 30
+    # seconds past the budget before a run is terminated, and then killed
+    shutdown_grace: float = 120
+    poll_interval: float = 1
+    target_list: List[CampaignTarget] = dataclasses.field(default_factory=list)
+
+    @staticmethod
+    def from_dict(campaign_dict: Dict[str, Any]) -> "CampaignConfig":
+        """
+        :param campaign_dict: fields of the campaign, "default" holds the fields shared by the targets
+        """
+        campaign_dict = dict(campaign_dict)
+        default_dict = campaign_dict.pop("default", {})
+        target_dict_list = campaign_dict.pop("target_list", [])
+        config = CampaignConfig(**campaign_dict)
+        config.target_list = [
+            CampaignTarget(**{**default_dict, **target_dict}) for target_dict in target_dict_list
+        ]
+        name_list = [target.name for target in config.target_list]
+        if len(set(name_list)) != len(name_list) or "" in name_list:
+            raise ValueError("every target needs a unique name")
+        return config
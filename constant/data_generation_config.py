@@ -50,3 +50,6 @@ class DataGenerationConfig:
 
     # probability to skip example
     example_skip_probability: float = 0.5
+
+    # probability to use a value of a request which got a 2xx response, see SeedCorpus
+    seed_value_probability: float = 0.2
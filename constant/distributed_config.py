@@ -0,0 +1,23 @@
+import dataclasses
+
+
+@dataclasses.dataclass
+class DistributedConfig:
+    # address the coordinator listens on and the workers connect to
+    host: str = "127.0.0.1"
+    port: int = 8900
+    # methods are split into partitions by the first tag of the operation or by path prefix,
+    # a worker executes the sequences of its partitions and only gets the values they consume
+    partition_strategy: str = "tag"
+    # path segments forming the prefix with the path strategy, /store/order/{id} -> /store
+    partition_path_depth: int = 1
+
+    # sequences handed out per lease
+    lease_batch_size: int = 20
+    # a worker silent for this many seconds, plus the time its longest sequence may take, is dropped and its
+    # partitions given to the others. Workers report at least every half of it, also in the middle of a batch
+    worker_timeout: float = 30
+    # seconds a worker waits between polls when the coordinator has nothing for it
+    poll_interval: float = 1
+    # seconds to wait for the coordinator before a request fails
+    request_timeout: float = 30
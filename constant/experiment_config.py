@@ -0,0 +1,41 @@
+import dataclasses
+from typing import Any, Dict, List
+
+
+@dataclasses.dataclass
+class ExperimentTarget:
+    name: str = ""
+    yaml_path: str = ""
+    # a preset of benchmark/spec_generator.py, generated into the output directory in place of yaml_path
+    preset: str = ""
+    # "" starts a fresh mock server of the document for every run
+    url: str = ""
+    mock_argument_list: List[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class ExperimentConfig:
+    output_dir: str = "output/experiment"
+    time_budget: float = 300
+    seed_list: List[int] = dataclasses.field(default_factory=lambda: [0, 1, 2, 3, 4])
+    # setting to the values compared, every combination is a variant, the first one is the baseline.
+    # sequence_length is the graph setting, other keys are passed as main.py --override
+    factor_map: Dict[str, List[Any]] = dataclasses.field(default_factory=dict)
+    # main.py arguments of every run
+    argument_list: List[str] = dataclasses.field(default_factory=list)
+    # runs at the same time, 0 is half the cpu count, a run and its mock server use a cpu each
+    max_parallel_count: int = 0
+    # points of the averaged curves
+    curve_point_count: int = 50
+    target_list: List[ExperimentTarget] = dataclasses.field(default_factory=list)
+
+    @staticmethod
+    def from_dict(experiment_dict: Dict[str, Any]) -> "ExperimentConfig":
+        experiment_dict = dict(experiment_dict)
+        target_dict_list = experiment_dict.pop("target_list", [])
+        config = ExperimentConfig(**experiment_dict)
+        config.target_list = [ExperimentTarget(**target_dict) for target_dict in target_dict_list]
+        name_list = [target.name for target in config.target_list]
+        if len(set(name_list)) != len(name_list) or "" in name_list:
+            raise ValueError("every target needs a unique name")
+        return config
@@ -1,4 +1,5 @@
 import dataclasses
+from typing import List, Optional
 
 
 @dataclasses.dataclass
@@ -11,3 +12,99 @@ class FuzzerConfig:
     enable_reinforcement_learning: bool = True
     enable_sequence: bool = True
     enable_instance: bool = True
+    # seeds every random stream of the run, the same seed sends the same requests to a deterministic target
+    seed: Optional[int] = None
+
+    # seconds to wait for a response, clipped to the time left in the budget
+    request_timeout: float = 30
+    # no request is sent with less time left than this
+    min_request_timeout: float = 0.1
+    # requests per second to the target, 0 is unlimited
+    request_rate_limit: float = 0
+    request_rate_burst: int = 10
+    # connections to the target, requests wait for a free one
+    max_connection_count: int = 10
+    # max seconds to wait for the chatgpt agent threads at the end of the run
+    agent_shutdown_timeout: float = 5
+    # completions cached on disk by model and messages, shared by runs and processes, "" disables it
+    llm_cache_dir: str = ".llm_cache"
+    llm_cache_ttl: float = 7 * 24 * 3600
+    llm_cache_max_size: int = 256 * 1024 * 1024
+    # live calls the model on a cache miss, replay answers misses with a stub and works offline
+    llm_mode: str = "live"
+    # threads running api requesters, methods waiting for them are ranked by expected gain
+    chatgpt_worker_count: int = 2
+    chatgpt_task_queue_size: int = 1000
+    # calls per second to the model provider, 0 is unlimited.
+    # Shared by the runs of the process with the same limit.
+    llm_rate_limit: float = 1.0
+    llm_rate_burst: int = 5
+    # estimated tokens of the method list in the planner prompt, filled from the odg neighborhood
+    prompt_token_budget: int = 1500
+    # estimated tokens of the method documentation in the parameter value prompt
+    prompt_document_token_budget: int = 3000
+
+    # requests of the model which got a 2xx response, stored per url and shared by runs, "" keeps them in memory
+    seed_corpus_dir: str = ".seed_corpus"
+    seed_max_template_count: int = 20
+    seed_max_value_count: int = 20
+    # stored requests sent again per iteration of the fuzz loop
+    seed_replay_count: int = 10
+
+    # learned state written atomically every interval seconds, base plus incremental deltas, 0 disables it
+    checkpoint_interval: float = 300
+    # "" writes to <output_dir>/checkpoint
+    checkpoint_dir: str = ""
+    checkpoint_max_delta_count: int = 50
+    # restore the state in checkpoint_dir instead of warming up, the budget continues where it stopped
+    resume: bool = False
+
+    # output directories, checkpoint directories or result files of earlier runs to learn from
+    warm_start_path_list: List[str] = dataclasses.field(default_factory=list)
+    # imported dependency rewards count as at most this many selections
+    warm_start_max_dependency_count: float = 10
+
+    # promote runtime dependencies with enough positive reward to odg edges
+    enable_runtime_dependency_promotion: bool = True
+    runtime_dependency_promotion_min_count: int = 3
+    runtime_dependency_promotion_min_q: float = 2.0
+
+    # reload the api document and apply the diff when it changes, 0 disables it
+    spec_path: str = ""
+    spec_reload_interval: float = 0
+
+    # deliver analysis events in batches on a separate thread
+    enable_async_analysis: bool = True
+    analysis_queue_size: int = 10000
+    analysis_batch_size: int = 256
+    analysis_flush_interval: float = 0.5
+    # block, drop_newest or drop_oldest when the queue is full
+    analysis_drop_policy: str = "block"
+    # max seconds to wait for the analyses at the end of the run
+    analysis_shutdown_timeout: float = 30
+
+    # metrics snapshots written to the output directory, 0 disables them
+    metrics_snapshot_interval: float = 10
+    # prometheus or json
+    metrics_format: str = "prometheus"
+    # serve metrics on localhost, 0 disables the endpoint
+    metrics_http_port: int = 0
+
+    # per method latency histograms, slow requests are saved to the output directory
+    latency_window_size: int = 200
+    # flag a method when the p99 of a window exceeds ratio * p99 of its first window
+    latency_degradation_ratio: float = 2.0
+    # flag a request slower than ratio * median latency of its method
+    latency_spike_ratio: float = 5.0
+    latency_spike_min_seconds: float = 0.1
+    latency_min_samples: int = 30
+    latency_max_saved_requests_per_method: int = 20
+
+    # seconds between the coverage over time points of progress.json, 0 disables it
+    progress_interval: float = 1
+
+    # time the phases of every request, written to phase_profile.json
+    enable_phase_profiler: bool = True
+    # sample the stacks of all threads, written to profile.folded for flamegraphs
+    enable_sampling_profiler: bool = False
+    sampling_profiler_interval: float = 0.005
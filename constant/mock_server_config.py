@@ -0,0 +1,27 @@
+import dataclasses
+
+
+@dataclasses.dataclass
+class MockServerConfig:
+    host: str = "127.0.0.1"
+    port: int = 8080
+    # prefix of every operation path, e.g. /api/v3
+    base_path: str = ""
+    # processes sharing the port through SO_REUSEPORT
+    worker_count: int = 1
+
+    # seconds added to every response, plus a uniform random jitter
+    latency: float = 0
+    latency_jitter: float = 0
+
+    # probability to answer with error_status_code instead of the operation
+    error_rate: float = 0
+    error_status_code: int = 500
+
+    # reject requests whose path, query, header or body do not match the operation
+    enable_validation: bool = True
+    # keep created resources in memory so that POST then GET returns them
+    enable_state: bool = True
+
+    # depth of generated objects, recursive schemas stop here
+    max_response_depth: int = 5
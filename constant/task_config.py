@@ -1,4 +1,5 @@
 import dataclasses
+from typing import List
 
 
 @dataclasses.dataclass
@@ -13,3 +14,19 @@ class TaskConfig:
     rl: bool = True
     sequence: bool = True
     instance: bool = True
+    spec_reload_interval: float = 0
+    metrics_format: str = "prometheus"
+    metrics_port: int = 0
+    sampling_profiler: bool = False
+    sampling_interval: float = 0.005
+    llm_mode: str = "live"
+    llm_cache_dir: str = ".llm_cache"
+    seed_corpus_dir: str = ".seed_corpus"
+    checkpoint_interval: float = 300
+    resume: str = ""
+    warm_start: List[str] = dataclasses.field(default_factory=list)
+    rate_limit: float = 0
+    max_connections: int = 10
+    seed: int = -1
+    sequence_length: int = 2
+    override: List[str] = dataclasses.field(default_factory=list)
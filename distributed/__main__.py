@@ -0,0 +1,59 @@
+import argparse
+
+import loguru
+
+from constant.distributed_config import DistributedConfig
+from constant.fuzzer_config import FuzzerConfig
+from util.specification_cache import SpecificationCache
+
+logger = loguru.logger
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m distributed")
+    parser.add_argument("role", choices=["coordinator", "worker"])
+    parser.add_argument("--yaml_path", type=str, required=True)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--output_dir", type=str, default="output")
+    # coordinator
+    parser.add_argument("--time_budget", type=float, default=600)
+    parser.add_argument("--partition", type=str, default="tag", choices=["tag", "path"])
+    parser.add_argument("--partition_path_depth", type=int, default=1)
+    parser.add_argument("--worker_timeout", type=float, default=30)
+    # worker
+    parser.add_argument("--coordinator", type=str, default="http://127.0.0.1:8900")
+    parser.add_argument("--url", type=str, default="")
+    parser.add_argument("--worker_id", type=str, default="")
+    parser.add_argument("--batch_size", type=int, default=20)
+    parser.add_argument("--chatgpt", action="store_true")
+    args = parser.parse_args()
+
+    config = DistributedConfig()
+    config.host = args.host
+    config.port = args.port
+    config.partition_strategy = args.partition
+    config.partition_path_depth = args.partition_path_depth
+    config.lease_batch_size = args.batch_size
+    config.worker_timeout = args.worker_timeout
+
+    fuzzer_config = FuzzerConfig()
+    fuzzer_config.output_dir = args.output_dir
+    fuzzer_config.time_budget = args.time_budget
+    fuzzer_config.url = args.url
+    # a worker asks the model for the methods of its partitions only
+    fuzzer_config.enable_chatgpt = args.role == "worker" and args.chatgpt
+
+    graph = SpecificationCache().get_graph(args.yaml_path)
+    if args.role == "coordinator":
+        from distributed.coordinator import Coordinator
+
+        result = Coordinator(graph, fuzzer_config, config).run()
+    else:
+        from distributed.worker import Worker
+
+        result = Worker(graph, fuzzer_config, config, args.coordinator, args.worker_id or None).run()
+    logger.info(
+        f"{args.role} finished in {result.elapsed:.1f}s: {result.request_count} requests, "
+        f"{len(result.success_method_list)} / {result.method_count} methods succeeded, "
+        f"results in {result.output_dir}"
+    )
@@ -0,0 +1,353 @@
+import dataclasses
+import json
+import pathlib
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Set
+
+import loguru
+
+from algo.fuzzer import Fuzzer
+from analysis.result_writer_analysis import BytesEncoder
+from constant.distributed_config import DistributedConfig
+from constant.fuzzer_config import FuzzerConfig
+from distributed.protocol import (LEASE_PATH, REGISTER_PATH, REPORT_PATH,
+                                  partition_key, sequence_to_dict)
+from model.fuzz_result import FuzzResult
+from model.method import Method
+from model.operation_dependency_graph import OperationDependencyGraph
+from model.sequence import Sequence
+from util.deadline import Deadline
+
+logger = loguru.logger
+
+
+@dataclasses.dataclass
+class WorkerState:
+    worker_id: str = None
+    last_seen_time: float = 0
+    # seconds the longest sequence of the worker may take, requests wait up to their timeout
+    max_sequence_time: float = 0
+    partition_list: List[str] = dataclasses.field(default_factory=list)
+    # runtime values up to this version were sent to the worker
+    runtime_version: int = 0
+    request_count: int = 0
+    is_done: bool = False
+
+
+class Coordinator:
+    """
+    Owns the ODG, the schedule and the merged results of a distributed run.
+    Methods are split into partitions and every partition is given to one worker, a sequence
+    belongs to the partition of its last method. Workers lease batches of their sequences,
+    report the requests and responses and the runtime values produced by their partitions, and
+    get back the values of other workers which their partitions consume.
+    """
+
+    def __init__(
+            self,
+            graph: OperationDependencyGraph,
+            fuzzer_config: FuzzerConfig,
+            config: DistributedConfig,
+    ):
+        self.graph: OperationDependencyGraph = graph
+        self.fuzzer_config: FuzzerConfig = fuzzer_config
+        self.config: DistributedConfig = config
+        self.output_dir: pathlib.Path = Fuzzer._create_output_dir(
+            pathlib.Path(fuzzer_config.output_dir), time.strftime("%Y-%m-%d-%H-%M-%S")
+        )
+        self.begin_time: float = time.time()
+        self.deadline: Deadline = Deadline(fuzzer_config.time_budget, self.begin_time)
+        self._lock: threading.Lock = threading.Lock()
+        self._http_server: ThreadingHTTPServer = None
+
+        # schedule
+        self.sequence_list: List[Sequence] = (
+                graph._generate_single_method_sequence() + graph.generate_sequence()
+        )
+        self.method_partition_map: Dict[Method, str] = {
+            method: partition_key(method, config.partition_strategy, config.partition_path_depth)
+            for method in graph.method_list
+        }
+        self.partition_to_sequence_list_map: Dict[str, List[Sequence]] = {}
+        for sequence in self.sequence_list:
+            partition = self.method_partition_map[sequence.method_sequence[-1]]
+            self.partition_to_sequence_list_map.setdefault(partition, []).append(sequence)
+        self.partition_cursor_map: Dict[str, int] = {
+            partition: 0 for partition in self.partition_to_sequence_list_map
+        }
+        # endpoints whose values the methods of a partition consume, its own included
+        self.partition_to_consumed_endpoint_set_map: Dict[str, Set[str]] = {}
+        for method, partition in self.method_partition_map.items():
+            endpoint_set = self.partition_to_consumed_endpoint_set_map.setdefault(partition, set())
+            endpoint_set.add(method.endpoint)
+            endpoint_set.update(producer.endpoint for producer in graph.get_producers(method))
+        self.worker_map: Dict[str, WorkerState] = {}
+
+        # merged state, runtime values keyed like the checkpoints
+        self.runtime_value_map: Dict[str, Dict[str, Any]] = {}
+        # key to (version, worker id)
+        self.runtime_version_map: Dict[str, tuple] = {}
+        self.runtime_version: int = 0
+        self.request_count: int = 0
+        self.success_count: int = 0
+        self.status_code_count: Dict[int, int] = {}
+        self.success_endpoint_set: Set[str] = set()
+        self.failed_endpoint_set: Set[str] = set()
+        self.result_path: pathlib.Path = self.output_dir / "results.jsonl"
+        self._result_file = None
+
+        logger.info(
+            f"coordinator: {len(self.sequence_list)} sequences in "
+            f"{len(self.partition_to_sequence_list_map)} partitions"
+        )
+
+    def _rebalance(self):
+        """
+        Give every partition to a live worker, the largest partitions first to the least loaded worker
+        """
+        worker_list = sorted(self.worker_map.values(), key=lambda worker: worker.worker_id)
+        if not worker_list:
+            return
+        load_map = {worker.worker_id: 0 for worker in worker_list}
+        assignment_map: Dict[str, List[str]] = {worker.worker_id: [] for worker in worker_list}
+        for partition, sequence_list in sorted(
+                self.partition_to_sequence_list_map.items(),
+                key=lambda item: (-len(item[1]), item[0]),
+        ):
+            worker_id = min(load_map, key=lambda key: (load_map[key], key))
+            assignment_map[worker_id].append(partition)
+            load_map[worker_id] += len(sequence_list)
+        for worker in worker_list:
+            partition_list = sorted(assignment_map[worker.worker_id])
+            if partition_list != worker.partition_list:
+                worker.partition_list = partition_list
+                # the new partitions need the values the worker has not seen
+                worker.runtime_version = 0
+
+    def _expire_workers(self):
+        now = time.time()
+        expired_id_list = [
+            worker.worker_id
+            for worker in self.worker_map.values()
+            if worker.last_seen_time + self.config.worker_timeout + worker.max_sequence_time < now
+               and not worker.is_done
+        ]
+        for worker_id in expired_id_list:
+            logger.warning(f"worker {worker_id} timed out, reassigning its partitions")
+            del self.worker_map[worker_id]
+        if expired_id_list:
+            self._rebalance()
+
+    def _get_worker(self, body: Dict[str, Any]) -> WorkerState:
+        worker_id = body.get("worker_id", None) or str(uuid.uuid4())
+        worker = self.worker_map.get(worker_id, None)
+        if worker is None:
+            # a worker dropped after a timeout comes back
+            worker = WorkerState(worker_id=worker_id)
+            self.worker_map[worker_id] = worker
+            self._rebalance()
+        worker.last_seen_time = time.time()
+        worker.max_sequence_time = body.get("max_sequence_time", worker.max_sequence_time)
+        return worker
+
+    def _partition_endpoint_list(self, worker: WorkerState) -> List[str]:
+        return sorted(
+            method.endpoint
+            for method, partition in self.method_partition_map.items()
+            if partition in worker.partition_list
+        )
+
+    def handle_register(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            worker = self._get_worker(body)
+            logger.info(f"worker {worker.worker_id} registered, partitions {worker.partition_list}")
+            return {
+                "worker_id": worker.worker_id,
+                "remaining_time": self.deadline.remaining(),
+                "report_interval": self.config.worker_timeout / 2,
+                "partition_list": worker.partition_list,
+                "endpoint_list": self._partition_endpoint_list(worker),
+            }
+
+    def handle_lease(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            worker = self._get_worker(body)
+            if self.deadline.is_expired:
+                return {"done": True, "sequence_list": []}
+            max_count = min(body.get("max_count", self.config.lease_batch_size), self.config.lease_batch_size)
+            sequence_list = []
+            # round robin over the partitions of the worker, each cycles through its sequences
+            while len(sequence_list) < max_count and worker.partition_list:
+                for partition in worker.partition_list:
+                    partition_sequence_list = self.partition_to_sequence_list_map[partition]
+                    cursor = self.partition_cursor_map[partition]
+                    sequence_list.append(partition_sequence_list[cursor])
+                    self.partition_cursor_map[partition] = (cursor + 1) % len(partition_sequence_list)
+                    if len(sequence_list) >= max_count:
+                        break
+            return {
+                "done": False,
+                "remaining_time": self.deadline.remaining(),
+                "partition_list": worker.partition_list,
+                "endpoint_list": self._partition_endpoint_list(worker),
+                "sequence_list": [sequence_to_dict(sequence) for sequence in sequence_list],
+            }
+
+    def _merge_result(self, worker: WorkerState, result_list: List[List[Dict[str, Any]]]):
+        for result in result_list:
+            for item in result:
+                status_code = item["response"].get("status_code", None)
+                endpoint = item["request"].get("endpoint", None)
+                self.request_count += 1
+                worker.request_count += 1
+                self.status_code_count[status_code] = self.status_code_count.get(status_code, 0) + 1
+                if status_code is not None and 200 <= status_code < 300:
+                    self.success_count += 1
+                    self.success_endpoint_set.add(endpoint)
+                if status_code is not None and 500 <= status_code < 600:
+                    self.failed_endpoint_set.add(endpoint)
+            self._result_file.write(
+                json.dumps({"worker_id": worker.worker_id, "sequence": result}, cls=BytesEncoder) + "\n"
+            )
+
+    def handle_report(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            worker = self._get_worker(body)
+            self._merge_result(worker, body.get("result_list", []))
+            for key, entry in body.get("runtime_value", {}).items():
+                if self.runtime_value_map.get(key, None) == entry:
+                    continue
+                self.runtime_version += 1
+                self.runtime_value_map[key] = entry
+                self.runtime_version_map[key] = (self.runtime_version, worker.worker_id)
+            if body.get("is_done", False):
+                worker.is_done = True
+
+            consumed_endpoint_set = set()
+            for partition in worker.partition_list:
+                consumed_endpoint_set |= self.partition_to_consumed_endpoint_set_map.get(partition, set())
+            runtime_value_map = {
+                key: self.runtime_value_map[key]
+                for key, (version, source_worker_id) in self.runtime_version_map.items()
+                if version > worker.runtime_version
+                   and source_worker_id != worker.worker_id
+                   and self.runtime_value_map[key]["method"] in consumed_endpoint_set
+            }
+            worker.runtime_version = self.runtime_version
+            return {"runtime_value": runtime_value_map}
+
+    def _create_handler(self) -> Callable:
+        route_map = {
+            REGISTER_PATH: self.handle_register,
+            LEASE_PATH: self.handle_lease,
+            REPORT_PATH: self.handle_report,
+        }
+
+        class CoordinatorHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                handler = route_map.get(self.path, None)
+                if handler is None:
+                    self.send_error(404)
+                    return
+                content_length = int(self.headers.get("Content-Length", 0) or 0)
+                try:
+                    response = handler(json.loads(self.rfile.read(content_length) or b"{}"))
+                    status_code = 200
+                except (ValueError, KeyError) as e:
+                    response = {"error": str(e)}
+                    status_code = 400
+                body = json.dumps(response, cls=BytesEncoder).encode("utf-8")
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return CoordinatorHandler
+
+    def start(self):
+        self._result_file = open(self.result_path, "a")
+        self._http_server = ThreadingHTTPServer((self.config.host, self.config.port), self._create_handler())
+        self._http_server.daemon_threads = True
+        threading.Thread(
+            target=self._http_server.serve_forever, name="coordinator-http", daemon=True
+        ).start()
+        logger.info(f"coordinator listening on http://{self.config.host}:{self.config.port}")
+
+    def stop(self):
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
+        if self._result_file is not None:
+            self._result_file.close()
+            self._result_file = None
+
+    def run(self) -> FuzzResult:
+        """
+        Serve the workers until the time budget is spent and they sent their last report
+        """
+        self.start()
+        try:
+            while not self.deadline.wait(self.config.poll_interval):
+                with self._lock:
+                    self._expire_workers()
+            # workers learn about the end on their next lease, wait for their last report
+            end_time = time.time() + self.config.worker_timeout
+            while time.time() < end_time:
+                with self._lock:
+                    if all(worker.is_done for worker in self.worker_map.values()):
+                        break
+                time.sleep(self.config.poll_interval / 10)
+        except KeyboardInterrupt:
+            logger.warning("interrupted, stopping")
+            self.deadline.cancel()
+        finally:
+            self.stop()
+        result = self._collect_result()
+        with open(self.output_dir / "summary.json", "w") as f:
+            json.dump(
+                {
+                    **result.to_dict(),
+                    "worker_request_count": {
+                        worker.worker_id: worker.request_count for worker in self.worker_map.values()
+                    },
+                },
+                f,
+                indent=4,
+            )
+        return result
+
+    def _collect_result(self) -> FuzzResult:
+        endpoint_to_method_map = {method.endpoint: method for method in self.graph.method_list}
+
+        def signature_list(endpoint_set: Set[str]) -> List[str]:
+            return sorted(
+                endpoint_to_method_map[endpoint].signature
+                for endpoint in endpoint_set
+                if endpoint in endpoint_to_method_map
+            )
+
+        return FuzzResult(
+            output_dir=self.output_dir,
+            elapsed=time.time() - self.begin_time,
+            is_cancelled=self.deadline.is_cancelled,
+            request_count=self.request_count,
+            success_count=self.success_count,
+            method_count=len(self.graph.method_list),
+            sequence_count=len(self.sequence_list),
+            success_method_list=signature_list(self.success_endpoint_set),
+            failed_method_list=signature_list(self.failed_endpoint_set),
+            never_success_method_list=signature_list(
+                set(endpoint_to_method_map) - self.success_endpoint_set
+            ),
+            status_code_count=dict(self.status_code_count),
+        )
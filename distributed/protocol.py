@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from model.method import Method
+from model.operation_dependency_graph import OperationDependencyGraph
+from model.parameter_dependency import InContextParameterDependency
+from model.sequence import Sequence
+
+# json over http, every call is a POST to one of these paths
+REGISTER_PATH = "/register"
+LEASE_PATH = "/lease"
+REPORT_PATH = "/report"
+
+DEFAULT_PARTITION = "default"
+
+
+def partition_key(method: Method, strategy: str, path_depth: int = 1) -> str:
+    """
+    Partition of a method, methods of a partition mostly depend on each other
+    """
+    if strategy == "tag":
+        tag_list = method.method_raw_body.get("tags", None) or []
+        return str(tag_list[0]) if tag_list else DEFAULT_PARTITION
+    if strategy == "path":
+        segment_list = [
+            segment
+            for segment in method.method_path.split("/")
+            if segment and not segment.startswith("{")
+        ]
+        return "/" + "/".join(segment_list[:path_depth]) if segment_list else DEFAULT_PARTITION
+    raise ValueError(f"unknown partition strategy {strategy}")
+
+
+def sequence_to_dict(sequence: Sequence) -> Dict[str, Any]:
+    """
+    A sequence by the endpoints of its methods and the attribute paths of its dependencies
+    """
+    index_pair_to_attribute_list_map: Dict[Tuple[int, int], List[List[str]]] = {}
+    for attribute_dependency_list in sequence.consumer_index_to_dependency_map.values():
+        for attribute_dependency in attribute_dependency_list:
+            parameter_dependency = attribute_dependency.parameter_dependency
+            index_pair_to_attribute_list_map.setdefault(
+                (attribute_dependency.producer_index, attribute_dependency.consumer_index), []
+            ).append(
+                [
+                    parameter_dependency.producer_parameter.attribute_path,
+                    parameter_dependency.consumer_parameter.attribute_path,
+                ]
+            )
+    return {
+        "method_list": [method.endpoint for method in sequence.method_sequence],
+        "dependency_list": [
+            {
+                "producer_index": producer_index,
+                "consumer_index": consumer_index,
+                "attribute_list": attribute_list,
+            }
+            for (producer_index, consumer_index), attribute_list in index_pair_to_attribute_list_map.items()
+        ],
+    }
+
+
+def sequence_from_dict(
+        graph: OperationDependencyGraph,
+        endpoint_to_method_map: Dict[str, Method],
+        sequence_dict: Dict[str, Any],
+) -> Optional[Sequence]:
+    """
+    Rebuild a sequence on the graph of a worker, dependencies missing from it are left out
+
+    :return: None if a method is unknown to the worker
+    """
+    sequence = Sequence()
+    for endpoint in sequence_dict["method_list"]:
+        method = endpoint_to_method_map.get(endpoint, None)
+        if method is None:
+            return None
+        sequence.add_method(method)
+    for dependency_dict in sequence_dict["dependency_list"]:
+        producer = sequence.method_sequence[dependency_dict["producer_index"]]
+        consumer = sequence.method_sequence[dependency_dict["consumer_index"]]
+        edge = graph.producer_consumer_to_edge_map.get((producer, consumer), None)
+        if edge is None:
+            continue
+        attribute_set = {tuple(attribute_pair) for attribute_pair in dependency_dict["attribute_list"]}
+        dependency = InContextParameterDependency(producer=producer, consumer=consumer)
+        dependency.producer_index = dependency_dict["producer_index"]
+        dependency.consumer_index = dependency_dict["consumer_index"]
+        for parameter_dependency in edge.parameter_dependency_list:
+            if (
+                    parameter_dependency.producer_parameter.attribute_path,
+                    parameter_dependency.consumer_parameter.attribute_path,
+            ) in attribute_set:
+                dependency.add_parameter_dependency(parameter_dependency)
+        if dependency.parameter_dependency_list:
+            sequence.add_parameter_dependency(dependency)
+    return sequence
+
+
+def result_to_dict(request_list: List["Request"], response_list: List["Response"]) -> List[Dict[str, Any]]:
+    return [
+        {"request": request.to_dict(), "response": response.to_dict()}
+        for request, response in zip(request_list, response_list)
+    ]
@@ -0,0 +1,222 @@
+import json
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Set
+
+import loguru
+import requests
+
+from algo.checkpoint import capture_runtime_values, restore_runtime_values
+from algo.fuzzer import Fuzzer
+from analysis.result_writer_analysis import BytesEncoder
+from constant.distributed_config import DistributedConfig
+from constant.fuzzer_config import FuzzerConfig
+from distributed.protocol import (LEASE_PATH, REGISTER_PATH, REPORT_PATH,
+                                  result_to_dict, sequence_from_dict)
+from model.fuzz_result import FuzzResult
+from model.method import Method
+from model.operation_dependency_graph import OperationDependencyGraph
+from model.request_response import Request, Response
+from model.sequence import Sequence
+from util.deadline import Deadline
+
+logger = loguru.logger
+
+
+class CoordinatorError(Exception):
+    """
+    The coordinator could not be reached or refused a call, unlike errors of the target
+    """
+
+
+class WorkerFuzzer(Fuzzer):
+    """
+    A fuzzer executing the sequences leased from the coordinator, the requests and responses
+    of every sequence are kept for the next report
+    """
+
+    def __init__(self, graph: OperationDependencyGraph, config: FuzzerConfig):
+        super().__init__(graph, config)
+        self.result_list: List[List[Dict[str, Any]]] = []
+        self._result_lock: threading.Lock = threading.Lock()
+
+    def _on_sequence_end(
+            self,
+            sequence: Sequence,
+            request_list: List[Request],
+            response_list: List[Response],
+    ):
+        with self._result_lock:
+            self.result_list.append(result_to_dict(request_list, response_list))
+        super()._on_sequence_end(sequence, request_list, response_list)
+
+    def pop_result_list(self) -> List[List[Dict[str, Any]]]:
+        with self._result_lock:
+            result_list = self.result_list
+            self.result_list = []
+        return result_list
+
+
+class Worker:
+    """
+    Pulls sequence batches from a coordinator, executes them against the target and reports
+    the results and the runtime values produced by its partitions. The worker builds its own
+    graph from the same document, sequences are exchanged by endpoints and attribute paths.
+    """
+
+    def __init__(
+            self,
+            graph: OperationDependencyGraph,
+            fuzzer_config: FuzzerConfig,
+            config: DistributedConfig,
+            coordinator_url: str,
+            worker_id: str = None,
+    ):
+        self.fuzzer: WorkerFuzzer = WorkerFuzzer(graph, fuzzer_config)
+        self.config: DistributedConfig = config
+        self.coordinator_url: str = coordinator_url.rstrip("/")
+        self.worker_id: str = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.session: requests.Session = requests.Session()
+        self.endpoint_to_method_map: Dict[str, Method] = {
+            method.endpoint: method for method in graph.method_list
+        }
+        # endpoints of the methods in the partitions of the worker
+        self.partition_endpoint_set: Set[str] = set()
+        # runtime values sent in the previous report
+        self.reported_runtime_value_map: Dict[str, Dict[str, Any]] = {}
+        # seconds between reports, given by the coordinator, a batch can take longer
+        self.report_interval: float = config.worker_timeout / 2
+        self.last_contact_time: float = 0
+        # every request of a sequence may wait up to the request timeout
+        self.max_sequence_time: float = graph.sequence_length * fuzzer_config.request_timeout
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = self.session.post(
+                self.coordinator_url + path,
+                data=json.dumps(payload, cls=BytesEncoder),
+                headers={"Content-Type": "application/json"},
+                timeout=self.config.request_timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise CoordinatorError(f"{path}: {e}") from e
+        self.last_contact_time = time.time()
+        return response.json()
+
+    def _update_partition(self, response: Dict[str, Any]):
+        endpoint_set = set(response.get("endpoint_list", []))
+        if endpoint_set != self.partition_endpoint_set:
+            logger.info(f"worker {self.worker_id} partitions: {response.get('partition_list', [])}")
+            self.partition_endpoint_set = endpoint_set
+
+    def _runtime_value_delta(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Values produced by the methods of the partitions changed since the previous report.
+        Values of other methods come from their owners through the coordinator.
+        """
+        runtime_value_map = {
+            key: entry
+            for key, entry in capture_runtime_values(self.fuzzer.sequence_converter.runtime_dictionary).items()
+            if entry["method"] in self.partition_endpoint_set
+        }
+        delta_map = {
+            key: entry
+            for key, entry in runtime_value_map.items()
+            if self.reported_runtime_value_map.get(key, None) != entry
+        }
+        self.reported_runtime_value_map = runtime_value_map
+        return delta_map
+
+    def _report(self, is_done: bool = False):
+        response = self._post(
+            REPORT_PATH,
+            {
+                "worker_id": self.worker_id,
+                "max_sequence_time": self.max_sequence_time,
+                "result_list": self.fuzzer.pop_result_list(),
+                "runtime_value": self._runtime_value_delta(),
+                "is_done": is_done,
+            },
+        )
+        restore_runtime_values(self.fuzzer, response.get("runtime_value", {}))
+
+    def _report_if_due(self):
+        """
+        Report in the middle of a batch before the coordinator takes the worker for dead
+        """
+        if time.time() - self.last_contact_time >= self.report_interval:
+            self._report()
+
+    def _submit_to_chatgpt(self):
+        """
+        Methods of the partitions without a success go to the model, if the worker has it
+        """
+        if self.fuzzer.chatgpt_agent is None:
+            return
+        for method in sorted(self.fuzzer.never_success_method_set, key=lambda m: m.signature):
+            if method.endpoint in self.partition_endpoint_set:
+                self.fuzzer.chatgpt_agent.submit(method)
+
+    def run(self) -> FuzzResult:
+        response = self._post(
+            REGISTER_PATH, {"worker_id": self.worker_id, "max_sequence_time": self.max_sequence_time}
+        )
+        self.worker_id = response["worker_id"]
+        self.report_interval = response.get("report_interval", self.report_interval)
+        self._update_partition(response)
+        fuzzer = self.fuzzer
+        # the budget is the one of the coordinator
+        fuzzer.begin_time = time.time()
+        fuzzer.time_budget = response["remaining_time"]
+        fuzzer.deadline = Deadline(fuzzer.time_budget, fuzzer.begin_time)
+        fuzzer.setup()
+        fuzzer.never_success_method_set = set(fuzzer.graph.method_list)
+        try:
+            while not fuzzer.deadline.is_expired:
+                response = self._post(
+                    LEASE_PATH,
+                    {
+                        "worker_id": self.worker_id,
+                        "max_sequence_time": self.max_sequence_time,
+                        "max_count": self.config.lease_batch_size,
+                    },
+                )
+                if response["done"]:
+                    break
+                self._update_partition(response)
+                if not response["sequence_list"]:
+                    fuzzer.deadline.wait(self.config.poll_interval)
+                    continue
+                for sequence_dict in response["sequence_list"]:
+                    if fuzzer.deadline.is_expired:
+                        break
+                    sequence = sequence_from_dict(fuzzer.graph, self.endpoint_to_method_map, sequence_dict)
+                    if sequence is None:
+                        logger.warning(f"unknown method in sequence {sequence_dict['method_list']}")
+                        continue
+                    try:
+                        fuzzer.sequence_converter.convert(sequence)
+                    except requests.RequestException as e:
+                        # the target failed, the sequence is lost but the worker goes on
+                        logger.error(f"sequence {sequence_dict['method_list']} failed: {e}")
+                    fuzzer._checkpoint_if_due()
+                    self._report_if_due()
+                fuzzer._on_iteration_end()
+                self._submit_to_chatgpt()
+                self._report()
+        except KeyboardInterrupt:
+            logger.warning("interrupted, stopping")
+            fuzzer.deadline.cancel()
+        except CoordinatorError as e:
+            logger.error(f"lost the coordinator: {e}")
+            fuzzer.deadline.cancel()
+        finally:
+            fuzzer._on_end()
+            try:
+                self._report(is_done=True)
+            except CoordinatorError as e:
+                logger.error(f"failed to send the last report: {e}")
+        return fuzzer._collect_result()
@@ -0,0 +1,369 @@
+import argparse
+import concurrent.futures
+import dataclasses
+import itertools
+import json
+import math
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import loguru
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from benchmark.spec_generator import write_preset_specification
+from constant.experiment_config import ExperimentConfig, ExperimentTarget
+from experiment.campaign import MAIN_PATH, REPOSITORY_DIR, latest_run_dir
+
+logger = loguru.logger
+
+METRIC_LIST = ["success_method_count", "valid_rate", "failed_method_count", "request_count", "coverage_auc"]
+CURVE_LIST = ["success_method_count", "valid_rate", "failed_method_count"]
+# two sided 95% critical values of the t distribution by degrees of freedom
+T_CRITICAL_MAP = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+    10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042,
+}
+
+
+@dataclasses.dataclass
+class Variant:
+    name: str
+    factor_map: Dict[str, Any]
+
+    def argument_list(self) -> List[str]:
+        argument_list, override_list = [], []
+        for key, value in self.factor_map.items():
+            if key == "sequence_length":
+                argument_list += ["--sequence_length", str(value)]
+            else:
+                override_list.append(f"{key}={json.dumps(value)}")
+        if override_list:
+            argument_list += ["--override"] + override_list
+        return argument_list
+
+
+@dataclasses.dataclass
+class ExperimentRun:
+    target: ExperimentTarget
+    variant: Variant
+    seed: int
+    output_dir: pathlib.Path
+    exit_code: Optional[int] = None
+    summary: Optional[Dict[str, Any]] = None
+    progress_list: List[Dict[str, Any]] = dataclasses.field(default_factory=list)
+
+
+def variant_list_of(factor_map: Dict[str, List[Any]]) -> List[Variant]:
+    if not factor_map:
+        return [Variant(name="default", factor_map={})]
+    key_list = list(factor_map)
+    return [
+        Variant(
+            name=",".join(f"{key}={json.dumps(value)}" for key, value in zip(key_list, value_tuple)),
+            factor_map=dict(zip(key_list, value_tuple)),
+        )
+        for value_tuple in itertools.product(*(factor_map[key] for key in key_list))
+    ]
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float) -> bool:
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def value_at(progress_list: List[Dict[str, Any]], elapsed: float, curve: str) -> float:
+    """
+    Value of a curve at elapsed seconds, the last point recorded before it
+    """
+    point = None
+    for candidate in progress_list:
+        if candidate["elapsed"] > elapsed:
+            break
+        point = candidate
+    if point is None:
+        return 0
+    if curve == "valid_rate":
+        return point["success_count"] / point["request_count"] if point["request_count"] > 0 else 0
+    return point[curve]
+
+
+def run_metrics(run: ExperimentRun, time_grid: List[float]) -> Dict[str, float]:
+    summary = run.summary
+    coverage_curve = [value_at(run.progress_list, elapsed, "success_method_count") for elapsed in time_grid]
+    return {
+        "success_method_count": len(summary["success_method_list"]),
+        "valid_rate": summary["success_count"] / summary["request_count"] if summary["request_count"] > 0 else 0,
+        "failed_method_count": len(summary["failed_method_list"]),
+        "request_count": summary["request_count"],
+        # mean covered methods over the budget, rewards reaching the coverage early
+        "coverage_auc": sum(coverage_curve) / len(coverage_curve),
+    }
+
+
+def describe(value_list: List[float]) -> Dict[str, float]:
+    count = len(value_list)
+    mean = sum(value_list) / count
+    std = math.sqrt(sum((value - mean) ** 2 for value in value_list) / (count - 1)) if count > 1 else 0
+    degree = max([key for key in T_CRITICAL_MAP if key <= count - 1], default=None)
+    t_critical = 1.96 if count > 31 else T_CRITICAL_MAP.get(degree, 0)
+    sorted_list = sorted(value_list)
+    middle = count // 2
+    median = sorted_list[middle] if count % 2 == 1 else (sorted_list[middle - 1] + sorted_list[middle]) / 2
+    return {
+        "count": count,
+        "mean": mean,
+        "std": std,
+        "ci95": t_critical * std / math.sqrt(count) if count > 1 else 0,
+        "median": median,
+        "min": sorted_list[0],
+        "max": sorted_list[-1],
+    }
+
+
+def mann_whitney_u(value_list: List[float], baseline_list: List[float]) -> Tuple[float, float]:
+    """
+    :return: the p value of the two sided Mann-Whitney U test, normal approximation with tie correction,
+    and the Vargha-Delaney A12 effect size, the probability that a value beats a baseline value
+    """
+    n1, n2 = len(value_list), len(baseline_list)
+    ranked_list = sorted([(value, 0) for value in value_list] + [(value, 1) for value in baseline_list])
+    rank_list = [0.0] * len(ranked_list)
+    tie_sum = 0
+    index = 0
+    while index < len(ranked_list):
+        end = index
+        while end + 1 < len(ranked_list) and ranked_list[end + 1][0] == ranked_list[index][0]:
+            end += 1
+        for tied_index in range(index, end + 1):
+            rank_list[tied_index] = (index + end) / 2 + 1
+        tie_count = end - index + 1
+        tie_sum += tie_count ** 3 - tie_count
+        index = end + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(rank_list, ranked_list) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    a12 = u / (n1 * n2)
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_sum / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0, a12
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return min(1.0, math.erfc(max(z, 0) / math.sqrt(2))), a12
+
+
+class Experiment:
+    """
+    Run every variant of the factors with every seed against every target in parallel, each run with its
+    own mock server, and compare the variants on final coverage, valid rate and failures, their curves
+    over time and the statistics of the seeds
+    """
+
+    def __init__(self, config: ExperimentConfig):
+        self.config: ExperimentConfig = config
+        self.output_dir: pathlib.Path = pathlib.Path(config.output_dir)
+        self.variant_list: List[Variant] = variant_list_of(config.factor_map)
+        self.max_parallel_count: int = config.max_parallel_count or max(1, (os.cpu_count() or 1) // 2)
+        self.time_grid: List[float] = [
+            config.time_budget * index / config.curve_point_count for index in range(config.curve_point_count + 1)
+        ]
+        self.run_list: List[ExperimentRun] = [
+            ExperimentRun(
+                target=target,
+                variant=variant,
+                seed=seed,
+                output_dir=self.output_dir / target.name / f"variant-{variant_index}" / f"seed-{seed}",
+            )
+            for target in config.target_list
+            for variant_index, variant in enumerate(self.variant_list)
+            for seed in config.seed_list
+        ]
+
+    def _run_state_dir(self, run: ExperimentRun, name: str) -> pathlib.Path:
+        """
+        Directory of state main.py keeps between runs, one per run so the variants do not learn from
+        each other. It is outside the run directory, which only holds the directories of main.py.
+        """
+        return self.output_dir / name / run.output_dir.relative_to(self.output_dir)
+
+    def _execute(self, run: ExperimentRun) -> ExperimentRun:
+        run.output_dir.mkdir(parents=True, exist_ok=True)
+        mock_process = None
+        url = run.target.url
+        with open(run.output_dir / "run.log", "w") as log_file:
+            try:
+                if not url:
+                    port = free_port()
+                    mock_process = subprocess.Popen(
+                        [sys.executable, "-m", "mock_server", "--yaml_path", run.target.yaml_path,
+                         "--port", str(port)] + list(run.target.mock_argument_list),
+                        cwd=str(REPOSITORY_DIR),
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+                    if not wait_for_port(port, 30):
+                        raise RuntimeError(f"mock server of {run.target.yaml_path} did not start")
+                    url = f"http://127.0.0.1:{port}"
+                command = [
+                    sys.executable, str(MAIN_PATH),
+                    "--yaml_path", run.target.yaml_path,
+                    "--url", url,
+                    "--time_budget", str(self.config.time_budget),
+                    "--output_dir", str(run.output_dir),
+                    "--seed", str(run.seed),
+                    "--llm_cache_dir", str(self._run_state_dir(run, "llm_cache")),
+                    "--seed_corpus_dir", str(self._run_state_dir(run, "seed_corpus")),
+                ] + list(self.config.argument_list) + run.variant.argument_list()
+                process = subprocess.Popen(
+                    command, cwd=str(REPOSITORY_DIR), stdout=log_file, stderr=subprocess.STDOUT
+                )
+                try:
+                    run.exit_code = process.wait(timeout=self.config.time_budget * 2 + 60)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    run.exit_code = process.wait()
+            finally:
+                if mock_process is not None:
+                    mock_process.terminate()
+                    mock_process.wait()
+        run_dir = latest_run_dir(run.output_dir)
+        if run.exit_code == 0 and run_dir is not None and (run_dir / "summary.json").exists():
+            with open(run_dir / "summary.json", "r") as f:
+                run.summary = json.load(f)
+            if (run_dir / "progress.json").exists():
+                with open(run_dir / "progress.json", "r") as f:
+                    run.progress_list = json.load(f)
+        return run
+
+    def run(self) -> Dict[str, Any]:
+        logger.info(
+            f"{len(self.variant_list)} variants x {len(self.config.seed_list)} seeds x "
+            f"{len(self.config.target_list)} targets = {len(self.run_list)} runs of {self.config.time_budget}s, "
+            f"{self.max_parallel_count} at a time"
+        )
+        for target in self.config.target_list:
+            if target.preset:
+                target.yaml_path = str(
+                    write_preset_specification(target.preset, self.output_dir.resolve() / "specs")
+                )
+        with concurrent.futures.ThreadPoolExecutor(self.max_parallel_count) as executor:
+            future_list = [executor.submit(self._execute, run) for run in self.run_list]
+            for finished_count, future in enumerate(concurrent.futures.as_completed(future_list), 1):
+                try:
+                    run = future.result()
+                except Exception as e:
+                    logger.error(f"run failed: {e}")
+                    continue
+                logger.info(
+                    f"{finished_count} / {len(self.run_list)}: {run.target.name} {run.variant.name} "
+                    f"seed {run.seed} exited with {run.exit_code}"
+                )
+        report = self.report()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.output_dir / "ab_report.json", "w") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def _compare_target(self, target: ExperimentTarget) -> Dict[str, Any]:
+        variant_report_list = []
+        baseline_metric_map = None
+        for variant in self.variant_list:
+            run_list = [
+                run for run in self.run_list
+                if run.target is target and run.variant is variant and run.summary is not None
+            ]
+            metric_map = {metric: [] for metric in METRIC_LIST}
+            for run in run_list:
+                for metric, value in run_metrics(run, self.time_grid).items():
+                    metric_map[metric].append(value)
+            variant_report = {
+                "name": variant.name,
+                "factor_map": variant.factor_map,
+                "run_count": len(run_list),
+                "failed_seed_list": sorted(
+                    run.seed for run in self.run_list
+                    if run.target is target and run.variant is variant and run.summary is None
+                ),
+                "metric_map": {
+                    metric: describe(value_list) for metric, value_list in metric_map.items() if value_list
+                },
+                # mean of the seeds at every point of the time grid
+                "curve_map": {
+                    curve: [
+                        sum(value_at(run.progress_list, elapsed, curve) for run in run_list) / len(run_list)
+                        for elapsed in self.time_grid
+                    ] if run_list else []
+                    for curve in CURVE_LIST
+                },
+            }
+            if baseline_metric_map is None:
+                baseline_metric_map = metric_map
+            elif run_list:
+                variant_report["comparison_map"] = {}
+                for metric in METRIC_LIST:
+                    if not baseline_metric_map[metric]:
+                        continue
+                    p_value, a12 = mann_whitney_u(metric_map[metric], baseline_metric_map[metric])
+                    variant_report["comparison_map"][metric] = {"p_value": p_value, "a12": a12}
+            variant_report_list.append(variant_report)
+        return {"name": target.name, "variant_list": variant_report_list}
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "timestamp": time.time(),
+            "time_budget": self.config.time_budget,
+            "seed_list": self.config.seed_list,
+            "factor_map": self.config.factor_map,
+            "baseline": self.variant_list[0].name,
+            "time_grid": self.time_grid,
+            "target_list": [self._compare_target(target) for target in self.config.target_list],
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("experiment_path", type=str)
+    parser.add_argument("--output_dir", type=str, default="")
+    parser.add_argument("--max_parallel_count", type=int, default=-1)
+    args = parser.parse_args()
+
+    with open(args.experiment_path, "r") as f:
+        experiment_config = ExperimentConfig.from_dict(json.load(f))
+    if args.output_dir:
+        experiment_config.output_dir = args.output_dir
+    if args.max_parallel_count >= 0:
+        experiment_config.max_parallel_count = args.max_parallel_count
+
+    ab_report = Experiment(experiment_config).run()
+    for target_report in ab_report["target_list"]:
+        logger.info(f"{target_report['name']}, baseline {ab_report['baseline']}:")
+        for variant_report in target_report["variant_list"]:
+            metric_map = variant_report["metric_map"]
+            comparison_map = variant_report.get("comparison_map", {})
+            logger.info(
+                f"  {variant_report['name']} ({variant_report['run_count']} runs): "
+                + ", ".join(
+                    f"{metric} {metric_map[metric]['mean']:.3f} ± {metric_map[metric]['ci95']:.3f}"
+                    + (
+                        f" (p {comparison_map[metric]['p_value']:.3f}, A12 {comparison_map[metric]['a12']:.2f})"
+                        if metric in comparison_map else ""
+                    )
+                    for metric in METRIC_LIST if metric in metric_map
+                )
+            )
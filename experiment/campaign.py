@@ -0,0 +1,277 @@
+import argparse
+import dataclasses
+import json
+import os
+import pathlib
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import loguru
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from constant.campaign_config import CampaignConfig, CampaignTarget
+
+logger = loguru.logger
+
+REPOSITORY_DIR = pathlib.Path(__file__).resolve().parent.parent
+MAIN_PATH = REPOSITORY_DIR / "main.py"
+
+PENDING = "pending"
+RUNNING = "running"
+WAITING_RESTART = "waiting_restart"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+def available_cpu_set() -> Set[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return set(os.sched_getaffinity(0))
+    return set(range(os.cpu_count() or 1))
+
+
+def latest_run_dir(output_dir: pathlib.Path) -> Optional[pathlib.Path]:
+    """
+    :return: the newest run directory main.py created in output_dir, they are named by start time
+    """
+    if not output_dir.exists():
+        return None
+    run_dir_list = sorted(child for child in output_dir.iterdir() if child.is_dir())
+    return run_dir_list[-1] if run_dir_list else None
+
+
+@dataclasses.dataclass
+class TargetRun:
+    """
+    The attempts of a campaign target, a failed attempt is resumed from the checkpoint of the first one
+    """
+
+    target: CampaignTarget
+    output_dir: pathlib.Path
+    status: str = PENDING
+    attempt_count: int = 0
+    exit_code_list: List[int] = dataclasses.field(default_factory=list)
+    # budget spent by the finished attempts
+    used_budget: float = 0
+    process: subprocess.Popen = None
+    cpu_list: List[int] = dataclasses.field(default_factory=list)
+    start_time: float = 0
+    restart_time: float = 0
+    is_terminated: bool = False
+    checkpoint_dir: Optional[pathlib.Path] = None
+    summary: Optional[Dict[str, Any]] = None
+
+    @property
+    def remaining_budget(self) -> float:
+        return self.target.time_budget - self.used_budget
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.target.name,
+            "status": self.status,
+            "attempt_count": self.attempt_count,
+            "exit_code_list": self.exit_code_list,
+            "output_dir": str(self.output_dir),
+            "summary": self.summary,
+        }
+
+
+class Campaign:
+    """
+    Fuzz the targets of a campaign file concurrently, one main.py process per target. Runs are pinned
+    to their own cpus and start while cpus are free, failed runs are resumed from their checkpoint,
+    and the summaries of all runs are merged into campaign_report.json.
+    """
+
+    def __init__(self, config: CampaignConfig):
+        self.config: CampaignConfig = config
+        self.output_dir: pathlib.Path = pathlib.Path(config.output_dir)
+        self.cpu_set: Set[int] = available_cpu_set()
+        self.free_cpu_set: Set[int] = set(self.cpu_set)
+        self.max_parallel_count: int = config.max_parallel_count or len(self.cpu_set)
+        self.run_list: List[TargetRun] = [
+            TargetRun(target=target, output_dir=self.output_dir / target.name)
+            for target in config.target_list
+        ]
+        self.is_stopping: bool = False
+
+    def _command(self, run: TargetRun) -> List[str]:
+        target = run.target
+        command = [
+            sys.executable, str(MAIN_PATH),
+            "--yaml_path", target.yaml_path,
+            "--url", target.url,
+            "--output_dir", str(run.output_dir),
+            "--max_connections", str(target.max_connections),
+            "--rate_limit", str(target.rate_limit),
+            # shared by the targets and the restarts, outside the repository main.py runs in
+            "--llm_cache_dir", str(self.output_dir / "llm_cache"),
+            "--seed_corpus_dir", str(self.output_dir / "seed_corpus"),
+        ]
+        if run.checkpoint_dir is not None and run.checkpoint_dir.exists():
+            # the budget continues from the checkpoint
+            command += ["--time_budget", str(target.time_budget), "--resume", str(run.checkpoint_dir)]
+        else:
+            command += ["--time_budget", str(run.remaining_budget)]
+        return command + list(target.argument_list)
+
+    def _cpu_count(self, run: TargetRun) -> int:
+        return min(run.target.cpu_count, len(self.cpu_set))
+
+    def _can_start(self, run: TargetRun) -> bool:
+        running_count = sum(1 for other in self.run_list if other.status == RUNNING)
+        return running_count < self.max_parallel_count and self._cpu_count(run) <= len(self.free_cpu_set)
+
+    def _start(self, run: TargetRun):
+        run.cpu_list = sorted(self.free_cpu_set)[:self._cpu_count(run)]
+        self.free_cpu_set -= set(run.cpu_list)
+        run.attempt_count += 1
+        run.output_dir.mkdir(parents=True, exist_ok=True)
+        preexec_fn = None
+        if run.cpu_list and hasattr(os, "sched_setaffinity"):
+            cpu_list = run.cpu_list
+            preexec_fn = lambda: os.sched_setaffinity(0, cpu_list)
+        with open(run.output_dir / f"attempt-{run.attempt_count}.log", "w") as log_file:
+            run.process = subprocess.Popen(
+                self._command(run),
+                cwd=str(REPOSITORY_DIR),
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                preexec_fn=preexec_fn,
+            )
+        run.start_time = time.time()
+        run.is_terminated = False
+        run.status = RUNNING
+        logger.info(f"{run.target.name}: attempt {run.attempt_count} started on cpus {run.cpu_list}")
+
+    def _on_exit(self, run: TargetRun, exit_code: int):
+        self.free_cpu_set |= set(run.cpu_list)
+        run.cpu_list = []
+        run.process = None
+        run.exit_code_list.append(exit_code)
+        run.used_budget += time.time() - run.start_time
+        run_dir = latest_run_dir(run.output_dir)
+        if run.checkpoint_dir is None and run_dir is not None:
+            # later attempts write to the checkpoint directory they resume from
+            run.checkpoint_dir = run_dir / "checkpoint"
+        if exit_code == 0:
+            run.status = FINISHED
+            if run_dir is not None and (run_dir / "summary.json").exists():
+                with open(run_dir / "summary.json", "r") as f:
+                    run.summary = json.load(f)
+            logger.info(f"{run.target.name}: finished")
+            return
+        if (
+                self.is_stopping
+                or run.attempt_count > self.config.max_restart_count
+                or run.remaining_budget < self.config.min_restart_budget
+        ):
+            run.status = FAILED
+            logger.error(f"{run.target.name}: attempt {run.attempt_count} failed with {exit_code}, giving up")
+            return
+        run.status = WAITING_RESTART
+        run.restart_time = time.time() + self.config.restart_delay
+        logger.warning(f"{run.target.name}: attempt {run.attempt_count} failed with {exit_code}, restarting")
+
+    def _poll(self, run: TargetRun):
+        exit_code = run.process.poll()
+        if exit_code is not None:
+            self._on_exit(run, exit_code)
+            return
+        # a run ignoring its budget is stopped like an interrupted one, then killed
+        overtime = time.time() - run.start_time - run.target.time_budget - self.config.shutdown_grace
+        if overtime > self.config.shutdown_grace:
+            run.process.kill()
+        elif overtime > 0 and not run.is_terminated:
+            logger.warning(f"{run.target.name}: over its budget, terminating")
+            run.process.terminate()
+            run.is_terminated = True
+
+    def stop(self):
+        """
+        End every run like an expired budget, their results are still written
+        """
+        self.is_stopping = True
+        for run in self.run_list:
+            if run.status == RUNNING and not run.is_terminated:
+                run.process.terminate()
+                run.is_terminated = True
+            elif run.status in (PENDING, WAITING_RESTART):
+                run.status = FAILED
+
+    def run(self) -> Dict[str, Any]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(
+            f"campaign of {len(self.run_list)} targets on {len(self.cpu_set)} cpus, "
+            f"at most {self.max_parallel_count} at a time"
+        )
+        while any(run.status in (PENDING, RUNNING, WAITING_RESTART) for run in self.run_list):
+            for run in self.run_list:
+                if run.status == RUNNING:
+                    self._poll(run)
+            if not self.is_stopping:
+                for run in self.run_list:
+                    if run.status == WAITING_RESTART and run.restart_time > time.time():
+                        continue
+                    if run.status in (PENDING, WAITING_RESTART) and self._can_start(run):
+                        self._start(run)
+            time.sleep(self.config.poll_interval)
+        report = self.report()
+        with open(self.output_dir / "campaign_report.json", "w") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def report(self) -> Dict[str, Any]:
+        summary_list = [run.summary for run in self.run_list if run.summary is not None]
+        request_count = sum(summary["request_count"] for summary in summary_list)
+        success_count = sum(summary["success_count"] for summary in summary_list)
+        method_count = sum(summary["method_count"] for summary in summary_list)
+        success_method_count = sum(len(summary["success_method_list"]) for summary in summary_list)
+        return {
+            "timestamp": time.time(),
+            "target_count": len(self.run_list),
+            "finished_count": sum(1 for run in self.run_list if run.status == FINISHED),
+            "failed_list": [run.target.name for run in self.run_list if run.status == FAILED],
+            "request_count": request_count,
+            "success_count": success_count,
+            "method_count": method_count,
+            "success_method_count": success_method_count,
+            "success_method_rate": success_method_count / method_count if method_count > 0 else 0,
+            "target_list": [run.to_dict() for run in self.run_list],
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("campaign_path", type=str)
+    parser.add_argument("--output_dir", type=str, default="")
+    parser.add_argument("--max_parallel_count", type=int, default=-1)
+    args = parser.parse_args()
+
+    with open(args.campaign_path, "r") as f:
+        campaign_config = CampaignConfig.from_dict(json.load(f))
+    if args.output_dir:
+        campaign_config.output_dir = args.output_dir
+    if args.max_parallel_count >= 0:
+        campaign_config.max_parallel_count = args.max_parallel_count
+
+    campaign = Campaign(campaign_config)
+    signal.signal(signal.SIGTERM, lambda signum, frame: campaign.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: campaign.stop())
+    campaign_report = campaign.run()
+    for target_dict in campaign_report["target_list"]:
+        summary = target_dict["summary"] or {}
+        logger.info(
+            f"{target_dict['name']}: {target_dict['status']} after {target_dict['attempt_count']} attempts, "
+            f"{summary.get('request_count', 0)} requests, "
+            f"{len(summary.get('success_method_list', []))} / {summary.get('method_count', 0)} methods succeeded"
+        )
+    logger.info(
+        f"campaign: {campaign_report['finished_count']} / {campaign_report['target_count']} targets finished, "
+        f"{campaign_report['success_method_count']} / {campaign_report['method_count']} methods succeeded"
+    )
+    if campaign_report["failed_list"]:
+        sys.exit(1)
@@ -1,23 +1,33 @@
 import argparse
+import dataclasses
 import glob
+import json
 import shutil
+import signal
 from typing import List
 
 import loguru
-import prance
 
 from constant.task_config import TaskConfig
 from algo.fuzzer import Fuzzer
+from constant.data_generation_config import DataGenerationConfig
 from constant.fuzzer_config import FuzzerConfig
 from model.api import API
 from model.operation_dependency_graph import OperationDependencyGraph
-from util.api_document_warpper import wrap_methods_from_open_api_document
-from prance.util.url import absurl
-from prance.util.fs import abspath
-from prance.util.resolver import RefResolver
-import yaml
-import json
-import os
+from util.random_source import seed_default_random_source
+from util.specification_loader import load_apis, validate_specification
+
+
+def str_to_bool(value: str) -> bool:
+    """
+    argparse type for flags given as --chatgpt False, type=bool treats any non-empty string as True
+    """
+    if value.lower() in ("true", "1", "yes", "y"):
+        return True
+    if value.lower() in ("false", "0", "no", "n"):
+        return False
+    raise argparse.ArgumentTypeError(f"boolean value expected, got {value}")
+
 
 yaml_path = "specifications/openapi/scout-api/openapi.yaml"
 parser = argparse.ArgumentParser()
@@ -25,43 +35,57 @@ parser.add_argument("--yaml_path", type=str, default=yaml_path)
 parser.add_argument("--time_budget", type=float, default=600)
 parser.add_argument("--warm_up_times", type=int, default=5)
 parser.add_argument("--url", type=str, default="https://restcountries.com")
-parser.add_argument("--chatgpt", type=bool, default=False)
+parser.add_argument("--chatgpt", type=str_to_bool, default=False)
 parser.add_argument("--output_dir", type=str, default="output")
-parser.add_argument("--rl", type=bool, default=True)
+parser.add_argument("--rl", type=str_to_bool, default=True)
+parser.add_argument("--spec_reload_interval", type=float, default=0)
+parser.add_argument("--verbose", action="store_true")
+# validate the document against the OpenAPI schema before fuzzing, loads prance
+parser.add_argument("--validate_spec", action="store_true")
+parser.add_argument("--metrics_format", type=str, default="prometheus", choices=["prometheus", "json"])
+parser.add_argument("--metrics_port", type=int, default=0)
+parser.add_argument("--sampling_profiler", action="store_true")
+parser.add_argument("--sampling_interval", type=float, default=0.005)
+# replay answers chatgpt prompts from the cache only, for offline runs
+parser.add_argument("--llm_mode", type=str, default="live", choices=["live", "replay"])
+parser.add_argument("--llm_cache_dir", type=str, default=".llm_cache")
+# requests of the model which worked, replayed by later runs against the same url
+parser.add_argument("--seed_corpus_dir", type=str, default=".seed_corpus")
+parser.add_argument("--checkpoint_interval", type=float, default=300)
+# checkpoint directory of an interrupted run, it is restored instead of warming up and written on
+parser.add_argument("--resume", type=str, default="")
+# output directories, checkpoints or result files of earlier runs against the same service
+parser.add_argument("--warm_start", type=str, nargs="*", default=[])
+# requests per second to the target, 0 is unlimited
+parser.add_argument("--rate_limit", type=float, default=0)
+parser.add_argument("--max_connections", type=int, default=10)
+# seeds every random stream of the run, -1 leaves them unseeded
+parser.add_argument("--seed", type=int, default=-1)
+parser.add_argument("--sequence_length", type=int, default=2)
+# FuzzerConfig fields, or DataGenerationConfig fields prefixed with data_generation., e.g. data_generation.example_skip_probability=0.2
+parser.add_argument("--override", type=str, nargs="*", default=[])
 args = parser.parse_args()
 
 logger = loguru.logger
 logger.add("log/{time}.log")
 
 
-def default_reclimit_handler(limit, parsed_url, recursions=()):
-    """Raise prance.util.url.ResolutionError."""
-    return {
-        "type": "object",
-    }
-
-
-def load_specification(file_path: str):
-    if file_path.endswith(".yaml"):
-        return yaml.load(open(file_path, "r"), Loader=yaml.FullLoader)
-    elif file_path.endswith(".json"):
-        return json.load(open(file_path, "r"))
-    else:
-        raise Exception(f"unknown file type {file_path}")
-
-
 def parsing(api_document_path: str) -> List[API]:
-    url = absurl(api_document_path, abspath(os.getcwd()))
-    specification = load_specification(api_document_path)
-    resolver = RefResolver(specification, url, default_reclimit_handler=default_reclimit_handler)
-    resolver.resolve_references()
     # parser = prance.ResolvingParser(
     #     api_document_path,
     #     backend="openapi-spec-validator",
     #     recursion_limit_handler=default_reclimit_handler,
     #     strict=False,
     # )
-    apis = wrap_methods_from_open_api_document(resolver.specs)
+    if args.validate_spec:
+        validate_specification(api_document_path)
+    apis = load_apis(api_document_path)
+    if args.verbose:
+        dump_apis(apis)
+    return apis
+
+
+def dump_apis(apis: List[API]):
     for api in apis:
         for method in api.method_dict.values():
             print("operationId:", method.operation_id)
@@ -76,14 +100,38 @@ def parsing(api_document_path: str) -> List[API]:
             for parameter in method.response_parameter.values():
                 for attribute in parameter.attribute_dict:
                     print(attribute)
-    return apis
+
+
+def apply_override_list(config: FuzzerConfig, data_generation_config: DataGenerationConfig, override_list: List[str]):
+    """
+    :param override_list: KEY=VALUE items, values are parsed as json and kept as strings otherwise
+    """
+    for override in override_list:
+        key, separator, raw_value = override.partition("=")
+        if not separator:
+            parser.error(f"override {override} is not KEY=VALUE")
+        target = config
+        if key.startswith("data_generation."):
+            target, key = data_generation_config, key[len("data_generation."):]
+        if key not in {field.name for field in dataclasses.fields(target)}:
+            parser.error(f"unknown override {key}")
+        try:
+            value = json.loads(raw_value)
+        except ValueError:
+            value = raw_value
+        setattr(target, key, value)
 
 
 def main(task_config: TaskConfig):
+    seed = task_config.seed if task_config.seed >= 0 else None
+    # before parsing, the model ids are drawn from it
+    seed_default_random_source(seed)
+
     apis = parsing(task_config.yaml_path)
 
     # build odg
     odg = OperationDependencyGraph(apis)
+    odg.sequence_length = task_config.sequence_length
     odg.build()
     # graph = odg.generate_graph()
 
@@ -95,16 +143,40 @@ def main(task_config: TaskConfig):
     config.enable_chatgpt = task_config.chatgpt
     config.output_dir = task_config.output_dir
     config.enable_reinforcement_learning = task_config.rl
+    config.spec_path = task_config.yaml_path
+    config.spec_reload_interval = task_config.spec_reload_interval
+    config.metrics_format = task_config.metrics_format
+    config.metrics_http_port = task_config.metrics_port
+    config.enable_sampling_profiler = task_config.sampling_profiler
+    config.sampling_profiler_interval = task_config.sampling_interval
+    config.llm_mode = task_config.llm_mode
+    config.llm_cache_dir = task_config.llm_cache_dir
+    config.seed_corpus_dir = task_config.seed_corpus_dir
+    config.checkpoint_interval = task_config.checkpoint_interval
+    config.warm_start_path_list = list(task_config.warm_start)
+    config.request_rate_limit = task_config.rate_limit
+    config.max_connection_count = task_config.max_connections
+    config.seed = seed
+    if task_config.resume:
+        config.checkpoint_dir = task_config.resume
+        config.resume = True
+    data_generation_config = DataGenerationConfig()
+    apply_override_list(config, data_generation_config, task_config.override)
     fuzzer = Fuzzer(odg, config)
-
-    # setup fuzzer
-    fuzzer.setup()
-
-    # warm up
-    fuzzer.warm_up()
-
-    # start fuzzing
-    fuzzer.fuzz()
+    fuzzer.data_generation_config = data_generation_config
+    # end the run like an expired budget, the results are still written
+    signal.signal(signal.SIGTERM, lambda signum, frame: fuzzer.deadline.cancel())
+
+    # setup, warm up and fuzz
+    result = fuzzer.run()
+    logger.info(
+        f"finished in {result.elapsed:.1f}s: {result.request_count} requests, "
+        f"{len(result.success_method_list)} / {result.method_count} methods succeeded, "
+        f"results in {result.output_dir}"
+    )
+    # read by the campaign and experiment runners
+    with open(result.output_dir / "summary.json", "w") as f:
+        json.dump(result.to_dict(), f, indent=4)
 
 
 def list_folder_extract_yaml_files(folder_path: str):
@@ -120,12 +192,7 @@ def list_folder_extract_yaml_files(folder_path: str):
             loguru.logger.info(f"parsing {yaml_file_absolute_path}")
             # apis = parsing(yaml_file_absolute_path)
             # count += len(apis)
-            specification = prance.ResolvingParser(
-                yaml_file_absolute_path,
-                backend="openapi-spec-validator",
-                recursion_limit_handler=default_reclimit_handler,
-                strict=False,
-            )
+            specification = validate_specification(yaml_file_absolute_path)
             valid_doc_count += 1
             url = specification.specification["servers"][0]["url"]
             yaml_file_name = yaml_file_absolute_path.split("/")[-1].split(".")[0]
@@ -0,0 +1,49 @@
+import argparse
+import sys
+
+import loguru
+
+from constant.mock_server_config import MockServerConfig
+from mock_server.application import MockApplication
+from mock_server.server import MockServer
+from util.specification_loader import load_apis
+
+logger = loguru.logger
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m mock_server")
+    parser.add_argument("--yaml_path", type=str, required=True)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--base_path", type=str, default="")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--latency_jitter", type=float, default=0)
+    parser.add_argument("--error_rate", type=float, default=0)
+    parser.add_argument("--error_status_code", type=int, default=500)
+    parser.add_argument("--no_validation", action="store_true")
+    parser.add_argument("--no_state", action="store_true")
+    args = parser.parse_args()
+
+    # parsing logs every attribute, only keep the server messages and warnings
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        filter=lambda record: record["level"].no >= logger.level("WARNING").no
+        or record["name"].startswith("mock_server"),
+    )
+
+    config = MockServerConfig()
+    config.host = args.host
+    config.port = args.port
+    config.base_path = args.base_path
+    config.worker_count = args.workers
+    config.latency = args.latency
+    config.latency_jitter = args.latency_jitter
+    config.error_rate = args.error_rate
+    config.error_status_code = args.error_status_code
+    config.enable_validation = not args.no_validation
+    config.enable_state = not args.no_state
+
+    application = MockApplication(load_apis(args.yaml_path), config)
+    MockServer(application, config).serve_forever()
@@ -0,0 +1,198 @@
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import loguru
+
+from constant.api import MethodRequestType
+from constant.mock_server_config import MockServerConfig
+from constant.parameter import ParameterType
+from model.api import API
+from model.method import Method
+from mock_server.response_generator import ResponseGenerator, success_status_code
+from mock_server.router import Route, Router
+from mock_server.state import ResourceStore
+from mock_server.validator import validate_request
+
+logger = loguru.logger
+
+# status code, headers, body
+MockResponse = Tuple[int, Dict[str, str], bytes]
+
+JSON_HEADER_MAP = {"Content-Type": "application/json"}
+# items returned by GET on a collection
+MAX_LIST_LENGTH = 100
+
+
+def _error(status_code: int, message: str) -> MockResponse:
+    body = json.dumps({"code": status_code, "message": message}).encode("utf-8")
+    return status_code, JSON_HEADER_MAP, body
+
+
+class MockApplication:
+    """
+    Answer requests for the operations of an api document, independent of the http server.
+    Items created by POST on a collection are returned by GET, PUT and DELETE on its item path.
+    """
+
+    def __init__(self, api_list: List[API], config: MockServerConfig):
+        self.config: MockServerConfig = config
+        self.method_list: List[Method] = [
+            method for api in api_list for method in api.method_dict.values()
+        ]
+        for method in self.method_list:
+            method.parse_parameters()
+        self.router: Router = Router(self.method_list)
+        self.response_generator: ResponseGenerator = ResponseGenerator(
+            config.max_response_depth
+        )
+        self.store: ResourceStore = ResourceStore()
+        # encoded responses of operations without state
+        self._body_cache: Dict[Method, bytes] = {}
+        self.request_count: int = 0
+
+    def _strip_base_path(self, path: str) -> Optional[str]:
+        base_path = self.config.base_path.rstrip("/")
+        if not base_path:
+            return path
+        if path == base_path or path.startswith(base_path + "/"):
+            return path[len(base_path):] or "/"
+        return None
+
+    def _inject_latency(self):
+        latency = self.config.latency
+        if self.config.latency_jitter > 0:
+            latency += random.uniform(0, self.config.latency_jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def handle(
+        self,
+        method_type: str,
+        raw_path: str,
+        header_map: Dict[str, str],
+        body_bytes: bytes,
+    ) -> MockResponse:
+        """
+        :param method_type: lower case http method
+        :param raw_path: path with query string
+        :param header_map: header names in lower case
+        """
+        self.request_count += 1
+        self._inject_latency()
+        if self.config.error_rate > 0 and random.random() < self.config.error_rate:
+            return _error(self.config.error_status_code, "injected error")
+
+        path, _, query_string = raw_path.partition("?")
+        path = self._strip_base_path(path)
+        if path is None:
+            return _error(404, "not found")
+        match = self.router.match(method_type, path)
+        if match is None:
+            return _error(404, f"no operation for {method_type.upper()} {path}")
+        route, path_value_map = match
+
+        body, is_body_valid_json = None, True
+        if body_bytes:
+            try:
+                body = json.loads(body_bytes)
+            except ValueError:
+                is_body_valid_json = False
+
+        if self.config.enable_validation:
+            error_list = validate_request(
+                route.method,
+                path_value_map,
+                parse_qs(query_string, keep_blank_values=True),
+                header_map,
+                body,
+                is_body_valid_json,
+            )
+            if len(error_list) > 0:
+                return _error(400, "; ".join(error_list))
+
+        if self.config.enable_state:
+            response = self._handle_stateful(route, path, path_value_map, body)
+            if response is not None:
+                return response
+        return self._handle_stateless(route.method)
+
+    def _handle_stateless(self, method: Method) -> MockResponse:
+        status_code, attribute = success_status_code(method)
+        if method not in self._body_cache:
+            value = self.response_generator.generate(attribute)
+            self._body_cache[method] = b"" if value is None else json.dumps(value).encode("utf-8")
+        return status_code, JSON_HEADER_MAP, self._body_cache[method]
+
+    def _encode(self, status_code: int, value: Any) -> MockResponse:
+        return status_code, JSON_HEADER_MAP, json.dumps(value).encode("utf-8")
+
+    def _handle_stateful(
+        self, route: Route, path: str, path_value_map: Dict[str, str], body: Any
+    ) -> Optional[MockResponse]:
+        """
+        :return: None if the operation is not part of a collection
+        """
+        method = route.method
+        method_type = method.method_type
+        status_code, attribute = success_status_code(method)
+
+        if route.is_item_route:
+            collection_path = path.rstrip("/").rsplit("/", 1)[0]
+            item_id = path_value_map[route.path_parameter_name_list[-1]]
+            if method_type == MethodRequestType.GET:
+                item = self.store.get(collection_path, item_id)
+                if item is None:
+                    return _error(404, f"{item_id} not found")
+                return self._encode(status_code, item)
+            if method_type in (MethodRequestType.PUT, MethodRequestType.PATCH):
+                if not self.store.update(collection_path, item_id, body):
+                    return _error(404, f"{item_id} not found")
+                return self._encode(status_code, self.store.get(collection_path, item_id))
+            if method_type == MethodRequestType.DELETE:
+                if not self.store.delete(collection_path, item_id):
+                    return _error(404, f"{item_id} not found")
+                return self._handle_stateless(method)
+            return None
+
+        item_parameter_name = self.router.item_parameter_name_map.get(
+            route.collection_template, None
+        )
+        if item_parameter_name is None:
+            return None
+        collection_path = path.rstrip("/")
+        if method_type == MethodRequestType.POST:
+            item = self.response_generator.generate(attribute)
+            if isinstance(item, dict) and isinstance(body, dict):
+                item.update(body)
+            elif item is None or body is not None:
+                item = body
+            id_key = self._id_key(item, item_parameter_name)
+            # keep the id chosen by the client, generated ids are all the same
+            item_id = body.get(id_key, None) if isinstance(body, dict) else None
+            if not isinstance(item_id, (int, str)) or isinstance(item_id, bool):
+                item_id = None
+            item_id = self.store.create(collection_path, item, item_id)
+            if isinstance(item, dict):
+                item[id_key] = item_id
+            return self._encode(status_code, item)
+        if method_type == MethodRequestType.GET and attribute is not None:
+            if attribute.parameter_type == ParameterType.ARRAY:
+                return self._encode(
+                    status_code, self.store.list(collection_path)[:MAX_LIST_LENGTH]
+                )
+        return None
+
+    @staticmethod
+    def _id_key(item: Any, item_parameter_name: str) -> str:
+        """
+        The property holding the id, petId for /pets/{petId} if the item has it, else id
+        """
+        if isinstance(item, dict):
+            if item_parameter_name in item:
+                return item_parameter_name
+            if "id" in item:
+                return "id"
+        return item_parameter_name
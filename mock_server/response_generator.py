@@ -0,0 +1,103 @@
+import copy
+from typing import Any, Dict, Optional, Tuple
+
+import rstr
+
+from constant.parameter import ParameterType
+from model.method import Method
+from model.parameter import ParameterAttribute
+
+STRING_FORMAT_VALUE_MAP: Dict[str, str] = {
+    "date-time": "2023-01-01T00:00:00Z",
+    "date": "2023-01-01",
+    "time": "00:00:00",
+    "email": "user@example.com",
+    "uuid": "00000000-0000-4000-8000-000000000000",
+    "uri": "http://example.com",
+    "url": "http://example.com",
+    "hostname": "example.com",
+    "ipv4": "127.0.0.1",
+    "ipv6": "::1",
+    "byte": "ZXhhbXBsZQ==",
+    "password": "password",
+}
+
+
+def success_status_code(method: Method) -> Tuple[int, Optional[ParameterAttribute]]:
+    """
+    :return: the first 2xx status code of the method and its response schema
+    """
+    response_parameter_map = method.response_parameter
+    for status_code in sorted(response_parameter_map):
+        if status_code.startswith("2") and status_code.isdigit():
+            return int(status_code), response_parameter_map[status_code].parameter
+    if "default" in response_parameter_map:
+        return 200, response_parameter_map["default"].parameter
+    return 200, None
+
+
+class ResponseGenerator:
+    """
+    Build schema conformant values from response attributes. Examples are used when the
+    schema has them, otherwise the first enum value or a value fitting type, format and bounds.
+    """
+
+    def __init__(self, max_depth: int = 5):
+        self.max_depth: int = max_depth
+        # values without state are generated once per attribute
+        self._template_map: Dict[int, Any] = {}
+
+    def generate(self, attribute: Optional[ParameterAttribute]) -> Any:
+        if attribute is None:
+            return None
+        key = id(attribute)
+        if key not in self._template_map:
+            self._template_map[key] = self._generate_value(attribute, 0)
+        return copy.deepcopy(self._template_map[key])
+
+    def _generate_value(self, attribute: ParameterAttribute, depth: int) -> Any:
+        if attribute.recursive_reference is not None:
+            attribute = attribute.recursive_reference
+        schema_info = attribute.schema_info
+        if schema_info.has_example:
+            return copy.deepcopy(schema_info.example)
+        if schema_info.has_enum:
+            return schema_info.enum[0]
+
+        parameter_type = attribute.parameter_type
+        if parameter_type == ParameterType.OBJECT:
+            if depth >= self.max_depth:
+                return {}
+            return {
+                child.attribute_name: self._generate_value(child, depth + 1)
+                for child in attribute.child_parameter_attribute_list
+            }
+        if parameter_type == ParameterType.ARRAY:
+            if depth >= self.max_depth or len(attribute.child_parameter_attribute_list) == 0:
+                return []
+            return [self._generate_value(attribute.child_parameter_attribute_list[0], depth + 1)]
+        if parameter_type == ParameterType.INTEGER:
+            return int(schema_info.minimum) if schema_info.has_minimum else 1
+        if parameter_type == ParameterType.NUMBER:
+            return float(schema_info.minimum) if schema_info.has_minimum else 1.0
+        if parameter_type == ParameterType.BOOLEAN:
+            return True
+        if parameter_type == ParameterType.STRING:
+            return self._generate_string(attribute)
+        return None
+
+    def _generate_string(self, attribute: ParameterAttribute) -> str:
+        schema_info = attribute.schema_info
+        if schema_info.has_format and schema_info.format in STRING_FORMAT_VALUE_MAP:
+            return STRING_FORMAT_VALUE_MAP[schema_info.format]
+        if schema_info.has_pattern:
+            try:
+                return rstr.xeger(schema_info.pattern)
+            except Exception:
+                pass
+        value = attribute.attribute_name.split("[")[0] or "string"
+        if schema_info.has_min_length and len(value) < schema_info.minLength:
+            value = value.ljust(schema_info.minLength, "x")
+        if schema_info.has_max_length:
+            value = value[: schema_info.maxLength]
+        return value
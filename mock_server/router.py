@@ -0,0 +1,78 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from model.method import Method
+
+PATH_PARAMETER_PATTERN = re.compile(r"\{([^}/]+)\}")
+
+
+class Route:
+    def __init__(self, method: Method):
+        self.method: Method = method
+        self.template: str = method.method_path
+        self.path_parameter_name_list: List[str] = PATH_PARAMETER_PATTERN.findall(
+            self.template
+        )
+        # re.escape turns {name} into \{name\}
+        pattern = re.sub(
+            r"\\\{[^/]+?\\\}", "([^/]+)", re.escape(self.template.rstrip("/"))
+        )
+        self.pattern: re.Pattern = re.compile(f"^{pattern}/?$")
+        self.segment_count: int = len(self.template.strip("/").split("/"))
+        self.static_segment_count: int = self.segment_count - len(
+            self.path_parameter_name_list
+        )
+
+    @property
+    def is_item_route(self) -> bool:
+        """
+        The last segment is a path parameter, e.g. /pets/{petId}
+        """
+        return self.template.rstrip("/").endswith("}")
+
+    @property
+    def collection_template(self) -> str:
+        if self.is_item_route:
+            return self.template.rstrip("/").rsplit("/", 1)[0]
+        return self.template.rstrip("/")
+
+    def match(self, path: str) -> Optional[Dict[str, str]]:
+        match = self.pattern.match(path)
+        if match is None:
+            return None
+        return {
+            name: unquote(value)
+            for name, value in zip(self.path_parameter_name_list, match.groups())
+        }
+
+
+class Router:
+    """
+    Match request paths to the methods of an api document.
+    Routes are indexed by http method and segment count, routes with more static
+    segments win, e.g. /pets/findByStatus before /pets/{petId}.
+    """
+
+    def __init__(self, method_list: List[Method]):
+        self.route_map: Dict[Tuple[str, int], List[Route]] = {}
+        # collection path template to the path parameter naming its items
+        self.item_parameter_name_map: Dict[str, str] = {}
+        for method in method_list:
+            route = Route(method)
+            key = (method.method_type.value, route.segment_count)
+            self.route_map.setdefault(key, []).append(route)
+            if route.is_item_route:
+                self.item_parameter_name_map[route.collection_template] = (
+                    route.path_parameter_name_list[-1]
+                )
+        for route_list in self.route_map.values():
+            route_list.sort(key=lambda route: route.static_segment_count, reverse=True)
+
+    def match(self, method_type: str, path: str) -> Optional[Tuple[Route, Dict[str, str]]]:
+        segment_count = len(path.strip("/").split("/"))
+        for route in self.route_map.get((method_type, segment_count), []):
+            path_value_map = route.match(path)
+            if path_value_map is not None:
+                return route, path_value_map
+        return None
@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import loguru
+
+from constant.mock_server_config import MockServerConfig
+from mock_server.application import MockApplication
+from mock_server.state import ResourceStoreManager
+
+logger = loguru.logger
+
+# seconds between the checks of a worker that its parent is alive
+PARENT_CHECK_INTERVAL = 1
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _create_handler(application: MockApplication):
+    class MockRequestHandler(BaseHTTPRequestHandler):
+        # keep-alive, the fuzzer reuses one connection per sequence
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately, nagle would delay the body
+        disable_nagle_algorithm = True
+
+        def _handle(self):
+            content_length = int(self.headers.get("Content-Length", 0) or 0)
+            body_bytes = self.rfile.read(content_length) if content_length > 0 else b""
+            header_map = {key.lower(): value for key, value in self.headers.items()}
+            try:
+                status_code, response_header_map, body = application.handle(
+                    self.command.lower(), self.path, header_map, body_bytes
+                )
+            except Exception as e:
+                logger.error(f"mock server failed on {self.command} {self.path}: {e}")
+                status_code, response_header_map, body = 500, {}, b""
+            self.send_response(status_code)
+            for key, value in response_header_map.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockRequestHandler
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    reuse_port: bool = False
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+class MockServer:
+    """
+    Serve a mock application on one or more worker processes. Workers bind the same
+    port with SO_REUSEPORT and the kernel spreads the connections over them.
+    """
+
+    def __init__(self, application: MockApplication, config: MockServerConfig):
+        self.application: MockApplication = application
+        self.config: MockServerConfig = config
+        self.http_server: MockHTTPServer = None
+        self.worker_list: List[multiprocessing.Process] = []
+        self.store_manager: ResourceStoreManager = None
+
+    def _create_http_server(self, reuse_port: bool) -> MockHTTPServer:
+        MockHTTPServer.reuse_port = reuse_port
+        return MockHTTPServer(
+            (self.config.host, self.config.port), _create_handler(self.application)
+        )
+
+    def start(self):
+        """
+        Serve on a background thread of this process
+        """
+        self.http_server = self._create_http_server(reuse_port=False)
+        threading.Thread(
+            target=self.http_server.serve_forever, name="mock-server", daemon=True
+        ).start()
+        logger.info(f"mock server on http://{self.config.host}:{self.config.port}")
+
+    def _serve_worker(self, parent_pid: int):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        http_server = self._create_http_server(reuse_port=True)
+        # a parent killed without shutting down leaves the worker to init, stop instead of holding the port
+        threading.Thread(
+            target=self._watch_parent, args=(http_server, parent_pid), name="mock-parent-watch", daemon=True
+        ).start()
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+
+    @staticmethod
+    def _watch_parent(http_server: MockHTTPServer, parent_pid: int):
+        while os.getppid() == parent_pid:
+            threading.Event().wait(PARENT_CHECK_INTERVAL)
+        http_server.shutdown()
+
+    def serve_forever(self):
+        """
+        Serve on worker_count processes until interrupted
+        """
+        worker_count = self.config.worker_count
+        if worker_count > 1 and not hasattr(socket, "SO_REUSEPORT"):
+            logger.warning("SO_REUSEPORT is not available, serving with one worker")
+            worker_count = 1
+        logger.info(
+            f"mock server on http://{self.config.host}:{self.config.port} with {worker_count} workers"
+        )
+        if worker_count == 1:
+            self.http_server = self._create_http_server(reuse_port=False)
+            try:
+                self.http_server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            return
+
+        # terminate() of the runner stops the workers as well
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+        if self.config.enable_state:
+            self._share_store()
+        # fork, the parsed document is shared copy-on-write
+        context = multiprocessing.get_context("fork")
+        for _ in range(worker_count):
+            worker = context.Process(target=self._serve_worker, args=(os.getpid(),), daemon=True)
+            worker.start()
+            self.worker_list.append(worker)
+        try:
+            for worker in self.worker_list:
+                worker.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def _share_store(self):
+        """
+        Serve one store from a thread of this process, the workers get a proxy of it through the fork
+        """
+        store_server = ResourceStoreManager(address=("127.0.0.1", 0)).get_server()
+        threading.Thread(target=store_server.serve_forever, name="mock-store", daemon=True).start()
+        self.store_manager = ResourceStoreManager(address=store_server.address)
+        self.store_manager.connect()
+        self.application.store = self.store_manager.ResourceStore()
+
+    def shutdown(self):
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+        for worker in self.worker_list:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        self.worker_list = []
@@ -0,0 +1,59 @@
+import itertools
+import threading
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, List, Optional
+
+
+class ResourceStore:
+    """
+    In-memory collections keyed by the concrete collection path, e.g. /owners/1/pets.
+    With several worker processes the store lives in the parent and the workers use it
+    through a ResourceStoreManager proxy, so an item created on one worker is found on the others.
+    """
+
+    def __init__(self):
+        self.collection_map: Dict[str, Dict[str, Any]] = {}
+        self._id_counter = itertools.count(1)
+        self._lock: threading.Lock = threading.Lock()
+
+    def create(self, collection_path: str, item: Any, item_id: Any = None) -> Any:
+        """
+        :param item_id: id provided by the client, a new integer id is assigned if None
+        :return: the id of the item
+        """
+        with self._lock:
+            if item_id is None:
+                item_id = next(self._id_counter)
+            self.collection_map.setdefault(collection_path, {})[str(item_id)] = item
+        return item_id
+
+    def get(self, collection_path: str, item_id: str) -> Optional[Any]:
+        return self.collection_map.get(collection_path, {}).get(item_id, None)
+
+    def update(self, collection_path: str, item_id: str, item: Any) -> bool:
+        with self._lock:
+            collection = self.collection_map.get(collection_path, {})
+            if item_id not in collection:
+                return False
+            if isinstance(collection[item_id], dict) and isinstance(item, dict):
+                collection[item_id] = {**collection[item_id], **item}
+            else:
+                collection[item_id] = item
+        return True
+
+    def delete(self, collection_path: str, item_id: str) -> bool:
+        with self._lock:
+            return self.collection_map.get(collection_path, {}).pop(item_id, None) is not None
+
+    def list(self, collection_path: str) -> List[Any]:
+        with self._lock:
+            return list(self.collection_map.get(collection_path, {}).values())
+
+
+class ResourceStoreManager(BaseManager):
+    """
+    Serves ResourceStore objects to the worker processes of a mock server
+    """
+
+
+ResourceStoreManager.register("ResourceStore", ResourceStore)
@@ -0,0 +1,138 @@
+from typing import Any, Dict, List
+
+from constant.parameter import ParameterLocation, ParameterType
+from model.method import Method
+from model.parameter import ParameterAttribute
+
+# stop collecting errors of one request after this many
+MAX_ERROR_COUNT = 10
+# depth limit when following recursive schemas in a body
+MAX_VALIDATION_DEPTH = 32
+
+
+def _convert_scalar(parameter_type: ParameterType, value: str) -> Any:
+    """
+    Convert a path, query or header value to its declared type, raise ValueError if it does not fit
+    """
+    if parameter_type == ParameterType.INTEGER:
+        return int(value)
+    if parameter_type == ParameterType.NUMBER:
+        return float(value)
+    if parameter_type == ParameterType.BOOLEAN:
+        if value.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(f"{value} is not a boolean")
+        return value.lower() in ("true", "1")
+    return value
+
+
+def _has_type(parameter_type: ParameterType, value: Any) -> bool:
+    if parameter_type == ParameterType.INTEGER:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if parameter_type == ParameterType.NUMBER:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if parameter_type == ParameterType.STRING:
+        return isinstance(value, str)
+    if parameter_type == ParameterType.BOOLEAN:
+        return isinstance(value, bool)
+    if parameter_type == ParameterType.OBJECT:
+        return isinstance(value, dict)
+    if parameter_type == ParameterType.ARRAY:
+        return isinstance(value, list)
+    return True
+
+
+def _check_enum(attribute: ParameterAttribute, value: Any, name: str, error_list: List[str]):
+    if attribute.schema_info.has_enum and value not in attribute.schema_info.enum:
+        error_list.append(f"{name} must be one of {attribute.schema_info.enum}")
+
+
+def validate_body_value(
+    attribute: ParameterAttribute,
+    value: Any,
+    name: str,
+    error_list: List[str],
+    depth: int = 0,
+):
+    if len(error_list) >= MAX_ERROR_COUNT or depth > MAX_VALIDATION_DEPTH:
+        return
+    if attribute.recursive_reference is not None:
+        attribute = attribute.recursive_reference
+    if value is None:
+        return
+    if not _has_type(attribute.parameter_type, value):
+        error_list.append(f"{name} must be of type {attribute.parameter_type.value}")
+        return
+    if attribute.parameter_type == ParameterType.OBJECT:
+        for child in attribute.child_parameter_attribute_list:
+            child_name = f"{name}.{child.attribute_name}" if name else child.attribute_name
+            if child.attribute_name not in value:
+                if child.required:
+                    error_list.append(f"{child_name} is required")
+                continue
+            validate_body_value(
+                child, value[child.attribute_name], child_name, error_list, depth + 1
+            )
+    elif attribute.parameter_type == ParameterType.ARRAY:
+        if len(attribute.child_parameter_attribute_list) == 0:
+            return
+        item_attribute = attribute.child_parameter_attribute_list[0]
+        for index, item in enumerate(value):
+            validate_body_value(item_attribute, item, f"{name}[{index}]", error_list, depth + 1)
+    else:
+        _check_enum(attribute, value, name, error_list)
+
+
+def validate_request(
+    method: Method,
+    path_value_map: Dict[str, str],
+    query_map: Dict[str, List[str]],
+    header_map: Dict[str, str],
+    body: Any,
+    is_body_valid_json: bool,
+) -> List[str]:
+    """
+    :param header_map: header names in lower case
+    :param body: decoded json body, None if the request has no body
+    :return: error messages, empty if the request matches the method
+    """
+    error_list: List[str] = []
+    for parameter in method.request_parameter.values():
+        attribute: ParameterAttribute = parameter.parameter
+        if attribute is None:
+            continue
+        if parameter.location == ParameterLocation.BODY:
+            if not is_body_valid_json:
+                error_list.append("body is not valid json")
+            elif body is None:
+                if parameter.required:
+                    error_list.append("body is required")
+            else:
+                validate_body_value(attribute, body, "", error_list)
+            continue
+
+        if parameter.location == ParameterLocation.PATH:
+            value = path_value_map.get(parameter.name, None)
+        elif parameter.location == ParameterLocation.QUERY:
+            value_list = query_map.get(parameter.name, None)
+            value = value_list[0] if value_list else None
+        elif parameter.location == ParameterLocation.HEADER:
+            value = header_map.get(parameter.name.lower(), None)
+        else:
+            # form data is not decoded
+            continue
+
+        if value is None:
+            if parameter.required:
+                error_list.append(f"{parameter.location.value} parameter {parameter.name} is required")
+            continue
+        if attribute.parameter_type in (ParameterType.ARRAY, ParameterType.OBJECT):
+            continue
+        try:
+            converted_value = _convert_scalar(attribute.parameter_type, value)
+        except ValueError:
+            error_list.append(
+                f"{parameter.location.value} parameter {parameter.name} must be of type {attribute.parameter_type.value}"
+            )
+            continue
+        _check_enum(attribute, converted_value, parameter.name, error_list)
+    return error_list[:MAX_ERROR_COUNT]
@@ -0,0 +1,36 @@
+import dataclasses
+import pathlib
+from typing import Dict, List
+
+
+@dataclasses.dataclass
+class FuzzResult:
+    """
+    Summary of a finished run, returned by Fuzzer.run
+    """
+
+    output_dir: pathlib.Path = None
+    # seconds from the start of the run to the end of the shutdown
+    elapsed: float = 0
+    # True if the run was stopped before the budget was spent
+    is_cancelled: bool = False
+    request_count: int = 0
+    success_count: int = 0
+    method_count: int = 0
+    sequence_count: int = 0
+    # method signatures
+    success_method_list: List[str] = dataclasses.field(default_factory=list)
+    failed_method_list: List[str] = dataclasses.field(default_factory=list)
+    never_success_method_list: List[str] = dataclasses.field(default_factory=list)
+    status_code_count: Dict[int, int] = dataclasses.field(default_factory=dict)
+
+    @property
+    def success_method_rate(self) -> float:
+        return len(self.success_method_list) / self.method_count if self.method_count > 0 else 0
+
+    def to_dict(self) -> dict:
+        return {
+            **dataclasses.asdict(self),
+            "output_dir": str(self.output_dir),
+            "success_method_rate": self.success_method_rate,
+        }
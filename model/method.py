@@ -1,17 +1,26 @@
-import uuid
+import hashlib
+import json
+import threading
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import loguru
 
 from constant.api import MethodRequestType
 from constant.parameter import ParameterLocation, RequestBodyContent
-from model.parameter import Parameter
+from model.parameter import Parameter, SchemaRegistry
+from util.random_source import default_random_source
 
 logger = loguru.logger
 
 
 class Method:
-    def __init__(self, method_type: str, api_path: str, method_raw_body: dict):
+    def __init__(
+        self,
+        method_type: str,
+        api_path: str,
+        method_raw_body: dict,
+        schema_registry: SchemaRegistry = None,
+    ):
         self.method_path: str = api_path
         self.operation_id: str = method_raw_body.get("operationId", None)
         self.summary: str = method_raw_body.get("summary", None)
@@ -22,19 +31,49 @@ class Method:
         self.produces: List[str] = method_raw_body.get("produces", None)
         self.tags: List[str] = method_raw_body.get("tags", None)
 
-        # request parameter
-        self.request_parameter: Dict[str, Parameter] = {}
+        # request parameter, parsed on first access
+        self._request_parameter: Dict[str, Parameter] = {}
 
-        # response parameter
-        self.response_parameter: Dict[str, Parameter] = {}
+        # response parameter, parsed on first access
+        self._response_parameter: Dict[str, Parameter] = {}
+        self.is_parsed: bool = False
+        # runs sharing a method may access its parameters at the same time
+        self._parse_lock: threading.Lock = threading.Lock()
+        # shared by the methods of one document so common schemas are parsed once
+        self.schema_registry: SchemaRegistry = (
+            schema_registry if schema_registry is not None else SchemaRegistry()
+        )
 
         self.method_type: MethodRequestType = MethodRequestType(method_type)
         self.method_raw_body: dict = method_raw_body
 
         # method id
-        self.method_id: str = f"{uuid.uuid4()}"
+        self.method_id: str = f"{default_random_source().uuid4('method')}"
+        self._content_hash: str = None
+
+    @property
+    def request_parameter(self) -> Dict[str, Parameter]:
+        if not self.is_parsed:
+            self.parse_parameters()
+        return self._request_parameter
+
+    @property
+    def response_parameter(self) -> Dict[str, Parameter]:
+        if not self.is_parsed:
+            self.parse_parameters()
+        return self._response_parameter
 
     def parse_parameters(self):
+        if self.is_parsed:
+            return
+        with self._parse_lock:
+            if self.is_parsed:
+                return
+            self._parse_parameters()
+            # set once the parameters are complete, readers do not take the lock
+            self.is_parsed = True
+
+    def _parse_parameters(self):
         logger.info(f"parse method {self.signature}")
 
         # parse request parameters
@@ -42,7 +81,7 @@ class Method:
             raw_request_parameters = self.method_raw_body["parameters"]
             # if no parameters found
             if raw_request_parameters is None:
-                print("No raw request parameters found.")
+                logger.info(f"no raw request parameters found in {self.signature}")
                 return
             for raw_request_parameter in raw_request_parameters:
                 parameter_location: ParameterLocation = ParameterLocation(
@@ -57,6 +96,7 @@ class Method:
                     name=parameter_name,
                     parameter_location=parameter_location,
                     parameter_raw_body=raw_request_parameter,
+                    schema_registry=self.schema_registry,
                 )
                 parameter.parse_parameter()
 
@@ -67,7 +107,7 @@ class Method:
                 if ParameterLocation.BODY == parameter_location:
                     parameter.request_body_content = RequestBodyContent.JSON
 
-                self.request_parameter[parameter.name] = parameter
+                self._request_parameter[parameter.name] = parameter
         if self.method_raw_body.__contains__("requestBody"):
             raw_request_parameters = self.method_raw_body["requestBody"]
             parameter_location: ParameterLocation = ParameterLocation.BODY
@@ -89,6 +129,7 @@ class Method:
                     name=parameter_name,
                     parameter_location=parameter_location,
                     parameter_raw_body=body_schema,
+                    schema_registry=self.schema_registry,
                 )
                 required: bool = raw_request_parameters.get("required", False)
                 parameter.required = required
@@ -98,7 +139,7 @@ class Method:
                 description = body_schema.get("description", None)
                 parameter.description = description
                 parameter.method = self
-                self.request_parameter[parameter.name] = parameter
+                self._request_parameter[parameter.name] = parameter
 
         # parse response parameters
         if self.method_raw_body.__contains__("responses"):
@@ -108,6 +149,7 @@ class Method:
                     name=raw_response_parameter,
                     parameter_location=ParameterLocation.RESPONSE,
                     parameter_raw_body=raw_response_parameters[raw_response_parameter],
+                    schema_registry=self.schema_registry,
                 )
                 parameter.parse_parameter()
                 description: str = raw_response_parameters[raw_response_parameter].get(
@@ -115,12 +157,28 @@ class Method:
                 )
                 parameter.description = description
                 parameter.method = self
-                self.response_parameter[parameter.name] = parameter
+                self._response_parameter[parameter.name] = parameter
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Hash of the resolved method body, used to detect changed operations between spec versions
+        """
+        if self._content_hash is None:
+            self._content_hash = compute_content_hash(self.method_raw_body)
+        return self._content_hash
 
     @property
     def signature(self):
         return f"{self.method_type.value}_{self.operation_id}_{self.method_path}"
 
+    @property
+    def endpoint(self) -> str:
+        """
+        "TYPE path", stable across spec versions unlike the operation id
+        """
+        return f"{self.method_type.value.upper()} {self.method_path}"
+
     @property
     def full_description(self):
         return f"{self.signature}, {self.summary}, {self.description}"
@@ -135,3 +193,38 @@ class Method:
         if isinstance(other, Method):
             return self.signature == other.signature
         return False
+
+
+def compute_content_hash(method_raw_body: dict) -> str:
+    digest = hashlib.sha256()
+    _update_content_hash(digest, method_raw_body, [])
+    return digest.hexdigest()
+
+
+def _update_content_hash(digest, node: Any, enclosing_id_list: List[int]):
+    """
+    Feed a canonical form of the node into the digest. Resolved documents can contain
+    cycles, a back reference is encoded by its distance to the enclosing object.
+    """
+    if isinstance(node, (dict, list)):
+        if id(node) in enclosing_id_list:
+            distance = len(enclosing_id_list) - enclosing_id_list.index(id(node))
+            digest.update(f"<cycle:{distance}>".encode("utf-8"))
+            return
+        enclosing_id_list.append(id(node))
+        if isinstance(node, dict):
+            digest.update(b"{")
+            for key in sorted(node, key=str):
+                digest.update(json.dumps(str(key)).encode("utf-8") + b":")
+                _update_content_hash(digest, node[key], enclosing_id_list)
+                digest.update(b",")
+            digest.update(b"}")
+        else:
+            digest.update(b"[")
+            for item in node:
+                _update_content_hash(digest, item, enclosing_id_list)
+                digest.update(b",")
+            digest.update(b"]")
+        enclosing_id_list.pop()
+    else:
+        digest.update(json.dumps(node, default=str).encode("utf-8"))
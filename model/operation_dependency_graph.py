@@ -1,10 +1,8 @@
 import dataclasses
-from typing import Dict, List, Tuple
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 import loguru
-from graphviz import Digraph
 
-from algo.chatgpt_agent import ChatGPTAgent
 from model.api import API
 from model.match_rule.base_rule import Rule
 from model.match_rule.substr_rule import SubStringRule
@@ -13,6 +11,8 @@ from model.parameter import ParameterAttribute
 from model.parameter_dependency import (InContextParameterDependency,
                                         ParameterDependency)
 from model.sequence import Sequence
+from model.util.sparse_graph import CSRGraph
+from util.spec_diff import SpecificationDiff, apply_diff_to_api_list
 
 logger = loguru.logger
 
@@ -50,77 +50,312 @@ class OperationDependencyGraph:
         self.consumer_and_parameter_attribute_to_edge_map: Dict[
             Tuple[Method, ParameterAttribute], List[ParameterDependency]
         ] = {}
-        self.graph: Digraph = Digraph(comment="Operation Dependency Graph")
+        self.graph: "Digraph" = None
+
+        # compact graph core, method ids are positions in method_list
+        self.method_index_map: Dict[Method, int] = {}
+        self.operation_id_to_method_map: Dict[str, Method] = {}
+        self.adjacency: CSRGraph = None
+        self.topological_order: List[Method] = []
+        self.strongly_connected_component_list: List[List[Method]] = []
+        self.transitive_producer_map: Dict[Method, FrozenSet[Method]] = {}
 
     def build(self):
         # extract methods from apis
         for api in self.api_list:
             for method in api.method_dict.values():
-                self.method_list.append(method)
+                self._index_method(method)
 
         # build producer-consumer map
         for producer in self.method_list:
             for consumer in self.method_list:
                 if producer == consumer:
                     continue
-                for rule in self.rule_list:
-                    if (
-                        producer.operation_id == "addPet"
-                        and consumer.operation_id == "getPetById"
-                    ):
-                        a = 1
-                    if rule.has_parameter_dependency(producer, consumer):
-                        parameter_dependency_list = rule.build_parameter_dependency(
-                            producer, consumer
-                        )
-                        if producer not in self.producer_consumer_map:
-                            self.producer_consumer_map[producer] = []
-                        self.producer_consumer_map[producer].append(consumer)
-                        if consumer not in self.consumer_producer_map:
-                            self.consumer_producer_map[consumer] = []
-                        self.consumer_producer_map[consumer].append(producer)
-                        edge = Edge(producer, consumer, parameter_dependency_list)
-                        self.edge_list.append(edge)
-                        if producer not in self.producer_consumer_edge_map:
-                            self.producer_consumer_edge_map[producer] = []
-                        self.producer_consumer_edge_map[producer].append(edge)
-                        if consumer not in self.consumer_producer_edge_map:
-                            self.consumer_producer_edge_map[consumer] = []
-                        self.consumer_producer_edge_map[consumer].append(edge)
-                        self.producer_consumer_to_edge_map[(producer, consumer)] = edge
-
-                        for parameter_dependency in parameter_dependency_list:
-                            producer_tuple = (
-                                producer,
-                                parameter_dependency.producer_parameter,
-                            )
-                            if (
-                                producer_tuple
-                                not in self.producer_and_parameter_attribute_to_edge_map
-                            ):
-                                self.producer_and_parameter_attribute_to_edge_map[
-                                    producer_tuple
-                                ] = []
-                            self.producer_and_parameter_attribute_to_edge_map[
-                                producer_tuple
-                            ].append(parameter_dependency)
-                            consumer_tuple = (
-                                consumer,
-                                parameter_dependency.consumer_parameter,
-                            )
-                            if (
-                                consumer_tuple
-                                not in self.consumer_and_parameter_attribute_to_edge_map
-                            ):
-                                self.consumer_and_parameter_attribute_to_edge_map[
-                                    consumer_tuple
-                                ] = []
-                            self.consumer_and_parameter_attribute_to_edge_map[
-                                consumer_tuple
-                            ].append(parameter_dependency)
-
-                        self._add_edge(edge)
-                        break
+                self._connect(producer, consumer)
+
+        self._build_index()
+
+    def fork(self) -> "OperationDependencyGraph":
+        """
+        Copy a built graph for another run without matching the rules again.
+        Methods are shared, they do not change once parsed. Dependencies are copied,
+        their rewards are learned per run, and edges added at runtime stay in one copy.
+        """
+        api_list: List[API] = []
+        for api in self.api_list:
+            api_copy = API(api.path, api.api_raw_data)
+            api_copy.method_dict = dict(api.method_dict)
+            api_list.append(api_copy)
+        graph = OperationDependencyGraph(api_list)
+        graph.rule_list = list(self.rule_list)
+        graph.sequence_length = self.sequence_length
+        for method in self.method_list:
+            graph._index_method(method)
+        for edge in self.edge_list:
+            graph._add_edge(
+                edge.producer,
+                edge.consumer,
+                [
+                    dataclasses.replace(parameter_dependency)
+                    for parameter_dependency in edge.parameter_dependency_list
+                ],
+            )
+        graph._build_index()
+        return graph
+
+    def _connect(self, producer: Method, consumer: Method) -> Optional[Edge]:
+        """
+        Match the rules on a producer-consumer pair and add the edge if one matches
+        """
+        for rule in self.rule_list:
+            if rule.has_parameter_dependency(producer, consumer):
+                parameter_dependency_list = rule.build_parameter_dependency(
+                    producer, consumer
+                )
+                return self._add_edge(producer, consumer, parameter_dependency_list)
+        return None
+
+    def apply_specification_diff(self, diff: SpecificationDiff) -> List[Edge]:
+        """
+        Update a built graph to a new version of the api document.
+        Rules are only matched on pairs involving an added or changed method.
+
+        :param diff: SpecificationDiff
+        :return: the edges touching the new methods
+        """
+        outdated_method_set = set(diff.outdated_method_list)
+        if len(outdated_method_set) > 0:
+            self._remove_methods(outdated_method_set)
+        apply_diff_to_api_list(self.api_list, diff)
+
+        new_method_list = diff.new_method_list
+        for method in new_method_list:
+            self._index_method(method)
+
+        new_edge_list: List[Edge] = []
+        new_method_set = set(new_method_list)
+        for method in new_method_list:
+            for other in self.method_list:
+                if other == method:
+                    continue
+                edge = self._connect(method, other)
+                if edge is not None:
+                    new_edge_list.append(edge)
+                # pairs of two new methods are visited from both sides
+                if other in new_method_set:
+                    continue
+                edge = self._connect(other, method)
+                if edge is not None:
+                    new_edge_list.append(edge)
+
+        self._build_index()
+        logger.info(f"applied {diff}, {len(new_edge_list)} edges recomputed")
+        return new_edge_list
+
+    def _remove_methods(self, method_set: Set[Method]):
+        """
+        Drop the methods and every edge touching them, the other edges keep their dependencies
+        """
+        kept_edge_list = [
+            edge
+            for edge in self.edge_list
+            if edge.producer not in method_set and edge.consumer not in method_set
+        ]
+        kept_method_list = [
+            method for method in self.method_list if method not in method_set
+        ]
+
+        self.method_list = []
+        self.method_index_map = {}
+        self.operation_id_to_method_map = {}
+        self.edge_list = []
+        self.producer_consumer_map = {}
+        self.consumer_producer_map = {}
+        self.producer_consumer_edge_map = {}
+        self.consumer_producer_edge_map = {}
+        self.producer_consumer_to_edge_map = {}
+        self.producer_and_parameter_attribute_to_edge_map = {}
+        self.consumer_and_parameter_attribute_to_edge_map = {}
+
+        for method in kept_method_list:
+            self._index_method(method)
+        for edge in kept_edge_list:
+            self._add_edge(edge.producer, edge.consumer, edge.parameter_dependency_list)
+
+    def _add_edge(
+        self,
+        producer: Method,
+        consumer: Method,
+        parameter_dependency_list: List[ParameterDependency],
+    ) -> Edge:
+        if producer not in self.producer_consumer_map:
+            self.producer_consumer_map[producer] = []
+        self.producer_consumer_map[producer].append(consumer)
+        if consumer not in self.consumer_producer_map:
+            self.consumer_producer_map[consumer] = []
+        self.consumer_producer_map[consumer].append(producer)
+        edge = Edge(producer, consumer, [])
+        self.edge_list.append(edge)
+        if producer not in self.producer_consumer_edge_map:
+            self.producer_consumer_edge_map[producer] = []
+        self.producer_consumer_edge_map[producer].append(edge)
+        if consumer not in self.consumer_producer_edge_map:
+            self.consumer_producer_edge_map[consumer] = []
+        self.consumer_producer_edge_map[consumer].append(edge)
+        self.producer_consumer_to_edge_map[(producer, consumer)] = edge
+
+        for parameter_dependency in parameter_dependency_list:
+            self._add_edge_parameter_dependency(edge, parameter_dependency)
+        return edge
+
+    def _add_edge_parameter_dependency(
+        self, edge: Edge, parameter_dependency: ParameterDependency
+    ):
+        edge.parameter_dependency_list.append(parameter_dependency)
+        producer_tuple = (edge.producer, parameter_dependency.producer_parameter)
+        if producer_tuple not in self.producer_and_parameter_attribute_to_edge_map:
+            self.producer_and_parameter_attribute_to_edge_map[producer_tuple] = []
+        self.producer_and_parameter_attribute_to_edge_map[producer_tuple].append(
+            parameter_dependency
+        )
+        consumer_tuple = (edge.consumer, parameter_dependency.consumer_parameter)
+        if consumer_tuple not in self.consumer_and_parameter_attribute_to_edge_map:
+            self.consumer_and_parameter_attribute_to_edge_map[consumer_tuple] = []
+        self.consumer_and_parameter_attribute_to_edge_map[consumer_tuple].append(
+            parameter_dependency
+        )
+
+    def add_parameter_dependency(
+        self, parameter_dependency: ParameterDependency
+    ) -> Optional[Edge]:
+        """
+        Incrementally add a dependency discovered at runtime to the built graph.
+        All index maps are kept up to date without a rebuild.
+
+        :param parameter_dependency: ParameterDependency
+        :return: the new Edge if the producer-consumer pair was not connected before, otherwise None
+        """
+        producer = parameter_dependency.producer
+        consumer = parameter_dependency.consumer
+        if producer == consumer or producer not in self.method_index_map:
+            return None
+        if consumer not in self.method_index_map:
+            return None
+
+        edge = self.producer_consumer_to_edge_map.get((producer, consumer), None)
+        if edge is not None:
+            if parameter_dependency not in edge.parameter_dependency_list:
+                self._add_edge_parameter_dependency(edge, parameter_dependency)
+            return None
+
+        edge = self._add_edge(producer, consumer, [parameter_dependency])
+        self._update_index_for_edge(edge)
+        logger.info(f"add runtime edge: {producer} -> {consumer}")
+        return edge
+
+    def _update_index_for_edge(self, edge: Edge):
+        """
+        Maintain the CSR adjacency and the precomputed queries after a new edge
+        """
+        producer_index = self.method_index_map[edge.producer]
+        consumer_index = self.method_index_map[edge.consumer]
+        self.adjacency.add_edge(producer_index, consumer_index)
+
+        # every method reaching the consumer now also reaches the producer's ancestors
+        new_producer_set = self.transitive_producer_map[edge.producer] | {edge.producer}
+        closes_cycle = edge.consumer in new_producer_set
+        for method, producer_set in self.transitive_producer_map.items():
+            if method == edge.consumer or edge.consumer in producer_set:
+                self.transitive_producer_map[method] = producer_set | new_producer_set
+
+        # the order is only invalidated by a cycle or a backward edge
+        position_map = {
+            method: position for position, method in enumerate(self.topological_order)
+        }
+        if closes_cycle or position_map[edge.producer] > position_map[edge.consumer]:
+            component_list = self.adjacency.strongly_connected_components()
+            self.strongly_connected_component_list = [
+                [self.method_list[index] for index in component]
+                for component in reversed(component_list)
+            ]
+            self.topological_order = [
+                self.method_list[index]
+                for index in self.adjacency.topological_order(component_list)
+            ]
+
+    def _index_method(self, method: Method):
+        self.method_index_map[method] = len(self.method_list)
+        self.method_list.append(method)
+        if method.operation_id is not None:
+            self.operation_id_to_method_map[method.operation_id] = method
+
+    def _build_index(self):
+        """
+        Build the CSR adjacency over method ids and precompute the graph queries
+        """
+        self.adjacency = CSRGraph(
+            len(self.method_list),
+            [
+                (self.method_index_map[edge.producer], self.method_index_map[edge.consumer])
+                for edge in self.edge_list
+            ],
+        )
+        component_list = self.adjacency.strongly_connected_components()
+        self.strongly_connected_component_list = [
+            [self.method_list[index] for index in component]
+            for component in reversed(component_list)
+        ]
+        self.topological_order = [
+            self.method_list[index]
+            for index in self.adjacency.topological_order(component_list)
+        ]
+        transitive_predecessor_list = self.adjacency.transitive_predecessors(
+            component_list
+        )
+        self.transitive_producer_map = {
+            method: frozenset(
+                self.method_list[index]
+                for index in transitive_predecessor_list[method_index]
+            )
+            for method, method_index in self.method_index_map.items()
+        }
+        logger.info(
+            f"odg index built: {self.adjacency.node_count} methods, {self.adjacency.edge_count} edges, "
+            f"{len(self.strongly_connected_component_list)} strongly connected components"
+        )
+
+    def get_producers(self, consumer: Method) -> List[Method]:
+        """
+        Direct producers of the consumer
+
+        :param consumer: Method
+        :return: List[Method]
+        """
+        return [
+            self.method_list[index]
+            for index in self.adjacency.predecessors(self.method_index_map[consumer])
+        ]
+
+    def get_consumers(self, producer: Method) -> List[Method]:
+        """
+        Direct consumers of the producer
+
+        :param producer: Method
+        :return: List[Method]
+        """
+        return [
+            self.method_list[index]
+            for index in self.adjacency.successors(self.method_index_map[producer])
+        ]
+
+    def get_transitive_producers(self, consumer: Method) -> FrozenSet[Method]:
+        """
+        Every method whose output can flow, directly or not, into the consumer
+
+        :param consumer: Method
+        :return: FrozenSet[Method]
+        """
+        return self.transitive_producer_map.get(consumer, frozenset())
 
     def generate_sequence(self) -> List[Sequence]:
         """
@@ -171,6 +406,25 @@ class OperationDependencyGraph:
 
         return sequence_list
 
+    def generate_sequence_through_edge(self, edge: Edge) -> List[Sequence]:
+        """
+        Generate the sequences starting with the given edge, used for edges added after build
+
+        :param edge: Edge
+        :return: List[Sequence]
+        """
+        sequence = Sequence()
+        sequence.add_method(edge.producer)
+        dependency: InContextParameterDependency = InContextParameterDependency(
+            producer=edge.producer, consumer=edge.consumer
+        )
+        for parameter_dependency in edge.parameter_dependency_list:
+            dependency.add_parameter_dependency(parameter_dependency)
+        dependency.producer_index = 0
+        dependency.consumer_index = 1
+        sequence.add_parameter_dependency(dependency)
+        return self._generate_sequence(edge.consumer, sequence)
+
     def _generate_single_method_sequence(self) -> List[Sequence]:
         """
         Generate sequence by single method
@@ -184,10 +438,7 @@ class OperationDependencyGraph:
         return sequence_list
 
     def _find_method_by_name(self, method_name: str) -> Method:
-        for method in self.method_list:
-            if method.operation_id == method_name:
-                return method
-        return None
+        return self.operation_id_to_method_map.get(method_name, None)
 
     def _generate_sequence(
         self, producer: Method, sequence: Sequence
@@ -232,22 +483,34 @@ class OperationDependencyGraph:
             sequence_list += self._generate_sequence(consumer, seq.copy())
         return sequence_list
 
-    def _add_edge(self, edge: Edge) -> str:
+    def to_dot(self) -> str:
         """
-        Add edge to graph
+        Export the graph as DOT source, edges point from consumer to producer
 
-        :param edge:
-        :return: None
+        :return: str
         """
-        self.graph.node(edge.producer.operation_id)
-        self.graph.node(edge.consumer.operation_id)
-        self.graph.edge(edge.consumer.operation_id, edge.producer.operation_id)
+        line_list = ["// Operation Dependency Graph", "digraph {"]
+        for method in self.method_list:
+            line_list.append(f'\t"{method.operation_id}"')
+        for edge in self.edge_list:
+            line_list.append(
+                f'\t"{edge.consumer.operation_id}" -> "{edge.producer.operation_id}"'
+            )
+        line_list.append("}")
+        return "\n".join(line_list) + "\n"
 
-    def generate_graph(self) -> Digraph:
+    def generate_graph(self) -> str:
         """
-        Generate graph
+        Render the graph with graphviz, the Digraph is only built on demand
 
         :return: str
         """
+        from graphviz import Digraph
+
+        self.graph = Digraph(comment="Operation Dependency Graph")
+        for method in self.method_list:
+            self.graph.node(method.operation_id)
+        for edge in self.edge_list:
+            self.graph.edge(edge.consumer.operation_id, edge.producer.operation_id)
         self.graph.render("odg")
         return self.graph.source
@@ -1,5 +1,5 @@
 import dataclasses
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 import loguru
 
@@ -55,6 +55,96 @@ class ParameterAttributeSchemaInfo:
         return self.minLength is not None
 
 
+@dataclasses.dataclass
+class SchemaNode:
+    """
+    Operation independent result of parsing a schema. It is a flyweight shared by every
+    attribute whose raw body is the same (resolved) schema object.
+    """
+
+    parameter_type: ParameterType = None
+    schema_info: ParameterAttributeSchemaInfo = None
+    # properties and required names merged with allOf
+    property_map: Dict[str, dict] = None
+    required_list: List[str] = None
+
+    @staticmethod
+    def from_raw_body(parameter_attribute_raw_body: dict) -> "SchemaNode":
+        node = SchemaNode()
+        # check if the parameter attribute is a schema
+        if (
+                parameter_attribute_raw_body.__contains__("schema")
+                and parameter_attribute_raw_body["schema"].__contains__("properties")
+        ) or parameter_attribute_raw_body.__contains__("properties"):
+            node.parameter_type = ParameterType.OBJECT
+        else:
+            if parameter_attribute_raw_body.__contains__("schema"):
+                node.parameter_type = ParameterType(
+                    parameter_attribute_raw_body["schema"]["type"]
+                )
+            elif parameter_attribute_raw_body.__contains__("anyOf"):
+                # temp support for anyOf
+                node.parameter_type = ParameterType(
+                    parameter_attribute_raw_body["anyOf"][0]["type"]
+                )
+            elif "type" not in parameter_attribute_raw_body:
+                # temp support for typeless
+                node.parameter_type = ParameterType.STRING
+            else:
+                node.parameter_type = ParameterType(
+                    parameter_attribute_raw_body["type"]
+                )
+
+        # update schema info
+        node.schema_info = ParameterAttributeSchemaInfo()
+        if parameter_attribute_raw_body.__contains__("schema"):
+            parameter_attribute_raw_body = parameter_attribute_raw_body["schema"]
+        node.schema_info.raw_schema = parameter_attribute_raw_body
+        node.schema_info.enum = parameter_attribute_raw_body.get("enum", None)
+        node.schema_info.example = parameter_attribute_raw_body.get("example", None)
+        node.schema_info.format = parameter_attribute_raw_body.get("format", None)
+        node.schema_info.maximum = parameter_attribute_raw_body.get("maximum", None)
+        node.schema_info.minimum = parameter_attribute_raw_body.get("minimum", None)
+        node.schema_info.pattern = parameter_attribute_raw_body.get("pattern", None)
+        node.schema_info.maxLength = parameter_attribute_raw_body.get("maxLength", None)
+        node.schema_info.minLength = parameter_attribute_raw_body.get("minLength", None)
+        return node
+
+    def merge_properties(self, parameter_body: dict):
+        # copy, the raw body can be shared by many operations
+        self.required_list = list(parameter_body.get("required", []))
+        self.property_map = dict(parameter_body.get("properties", {}))
+        if parameter_body.__contains__("allOf"):
+            all_of: List[dict] = parameter_body.get("allOf", [])
+            for all_of_item in all_of:
+                if all_of_item.__contains__("properties"):
+                    self.property_map.update(all_of_item.get("properties", {}))
+                if all_of_item.__contains__("required"):
+                    self.required_list.extend(all_of_item.get("required", []))
+
+
+class SchemaRegistry:
+    """
+    Cache of schema nodes keyed by the identity of the raw schema object.
+    With shared reference resolution a component is parsed once per document.
+    """
+
+    def __init__(self):
+        # keep the raw body alive so its id can not be reused
+        self._node_map: Dict[int, Tuple[dict, SchemaNode]] = {}
+
+    def get_node(self, raw_body: dict) -> SchemaNode:
+        entry = self._node_map.get(id(raw_body), None)
+        if entry is not None:
+            return entry[1]
+        node = SchemaNode.from_raw_body(raw_body)
+        self._node_map[id(raw_body)] = (raw_body, node)
+        return node
+
+    def __len__(self):
+        return len(self._node_map)
+
+
 class ParameterAttribute:
     schema_info: ParameterAttributeSchemaInfo = None
     parameter: "Parameter" = None
@@ -66,13 +156,13 @@ class ParameterAttribute:
             attribute_path: str,
             parameter: "Parameter",
             parameter_attribute_raw_body: dict,
+            schema_node: "SchemaNode" = None,
     ):
         # root parameter
         self.parameter: Parameter = parameter
 
         # parameter attribute structure
         self.parent_parameter_attribute: ParameterAttribute = None
-        self.sibling_parameter_attribute_list: List[ParameterAttribute] = []
         self.child_parameter_attribute_list: List[ParameterAttribute] = []
 
         # parameter attribute data
@@ -83,55 +173,35 @@ class ParameterAttribute:
         self.required: bool = False
         self.global_required: bool = False
 
+        # the enclosing attribute of the same schema if this attribute closes a recursion
+        self.recursive_reference: ParameterAttribute = None
+
         # if parameter is None, this is a runtime parameter
         self.parameter_value_list = []
 
         if self.parameter is None:
             return
 
-        # check if the parameter attribute is a schema
-        if (
-                parameter_attribute_raw_body.__contains__("schema")
-                and parameter_attribute_raw_body["schema"].__contains__("properties")
-        ) or parameter_attribute_raw_body.__contains__("properties"):
-            self.parameter_type: ParameterType = ParameterType.OBJECT
-        else:
-            if parameter_attribute_raw_body.__contains__("schema"):
-                self.parameter_type: ParameterType = ParameterType(
-                    parameter_attribute_raw_body["schema"]["type"]
-                )
-            elif parameter_attribute_raw_body.__contains__("anyOf"):
-                # temp support for anyOf
-                self.parameter_type: ParameterType = ParameterType(
-                    parameter_attribute_raw_body["anyOf"][0]["type"]
-                )
-            elif "type" not in parameter_attribute_raw_body:
-                # temp support for typeless
-                self.parameter_type: ParameterType = ParameterType.STRING
-            else:
-                self.parameter_type: ParameterType = ParameterType(
-                    parameter_attribute_raw_body["type"]
-                )
-
-        # update schema info
-        self.schema_info = ParameterAttributeSchemaInfo()
-        if parameter_attribute_raw_body.__contains__("schema"):
-            parameter_attribute_raw_body = parameter_attribute_raw_body["schema"]
-        self.schema_info.raw_schema = parameter_attribute_raw_body
-        self.schema_info.enum = parameter_attribute_raw_body.get("enum", None)
-        self.schema_info.example = parameter_attribute_raw_body.get("example", None)
-        self.schema_info.format = parameter_attribute_raw_body.get("format", None)
-        self.schema_info.maximum = parameter_attribute_raw_body.get("maximum", None)
-        self.schema_info.minimum = parameter_attribute_raw_body.get("minimum", None)
-        self.schema_info.pattern = parameter_attribute_raw_body.get("pattern", None)
-        self.schema_info.maxLength = parameter_attribute_raw_body.get("maxLength", None)
-        self.schema_info.minLength = parameter_attribute_raw_body.get("minLength", None)
+        # schema derived data is shared by every attribute using the same schema
+        if schema_node is None:
+            schema_node = SchemaNode.from_raw_body(parameter_attribute_raw_body)
+        self.schema_node: SchemaNode = schema_node
+        self.parameter_type: ParameterType = schema_node.parameter_type
+        self.schema_info = schema_node.schema_info
 
     def set_parent_parameter_attribute(self, parent_parameter_attribute):
         self.parent_parameter_attribute = parent_parameter_attribute
 
-    def add_sibling_parameter_attribute(self, sibling_parameter_attribute):
-        self.sibling_parameter_attribute_list.append(sibling_parameter_attribute)
+    @property
+    def sibling_parameter_attribute_list(self) -> List["ParameterAttribute"]:
+        # derived from the parent, materializing it is quadratic in the number of properties
+        if self.parent_parameter_attribute is None:
+            return []
+        return [
+            sibling
+            for sibling in self.parent_parameter_attribute.child_parameter_attribute_list
+            if sibling is not self
+        ]
 
     def add_child_parameter_attribute(self, child_parameter_attribute):
         self.child_parameter_attribute_list.append(child_parameter_attribute)
@@ -164,9 +234,18 @@ class ParameterAttribute:
 
 class Parameter:
     def __init__(
-            self, name: str, parameter_location: ParameterLocation, parameter_raw_body: dict
+            self,
+            name: str,
+            parameter_location: ParameterLocation,
+            parameter_raw_body: dict,
+            schema_registry: SchemaRegistry = None,
     ):
         self.parameter_raw_body: dict = parameter_raw_body
+        self.schema_registry: SchemaRegistry = (
+            schema_registry if schema_registry is not None else SchemaRegistry()
+        )
+        # schema id to attribute of the schemas enclosing the attribute being parsed
+        self._parsing_schema_attribute_map: Dict[int, ParameterAttribute] = {}
         self.name: str = name
         self.description: str = None
         self.required: bool = parameter_raw_body.get("required", False)
@@ -259,6 +338,7 @@ class Parameter:
             attribute_path=parameter_path,
             parameter=self,
             parameter_attribute_raw_body=parameter_body,
+            schema_node=self.schema_registry.get_node(parameter_body),
         )
 
         # root parameter
@@ -275,6 +355,27 @@ class Parameter:
             parent_attribute.add_child_parameter_attribute(parameter_attribute)
             parameter_attribute.set_parent_parameter_attribute(parent_attribute)
 
+        # a schema nested in itself closes a recursion, refer back instead of expanding it
+        enclosing_attribute = self._parsing_schema_attribute_map.get(
+            id(parameter_body), None
+        )
+        if enclosing_attribute is not None:
+            parameter_attribute.recursive_reference = enclosing_attribute
+            self.add_attribute_attribute(parameter_attribute)
+            return parameter_attribute
+        self._parsing_schema_attribute_map[id(parameter_body)] = parameter_attribute
+        self._parse_children(parameter_attribute, parameter_body, parameter_path)
+        del self._parsing_schema_attribute_map[id(parameter_body)]
+
+        self.add_attribute_attribute(parameter_attribute)
+        return parameter_attribute
+
+    def _parse_children(
+            self,
+            parameter_attribute: ParameterAttribute,
+            parameter_body: dict,
+            parameter_path: str,
+    ):
         if parameter_attribute.parameter_type == ParameterType.ARRAY:
             parameter_body_items: dict = (
                 parameter_body["items"]
@@ -289,16 +390,11 @@ class Parameter:
                 parent_required=parameter_attribute.global_required,
             )
         elif parameter_attribute.parameter_type == ParameterType.OBJECT:
-            required_list: List[str] = parameter_body.get("required", [])
-            properties: dict = parameter_body.get("properties", {})
-            if parameter_body.__contains__("allOf"):
-                all_of: List[dict] = parameter_body.get("allOf", [])
-                for all_of_item in all_of:
-                    if all_of_item.__contains__("properties"):
-                        properties.update(all_of_item.get("properties", {}))
-                    if all_of_item.__contains__("required"):
-                        required_list.extend(all_of_item.get("required", []))
-            children: List[ParameterAttribute] = []
+            schema_node: SchemaNode = parameter_attribute.schema_node
+            if schema_node.property_map is None:
+                schema_node.merge_properties(parameter_body)
+            required_list: List[str] = schema_node.required_list
+            properties: dict = schema_node.property_map
 
             # iterate property
             for property_name in properties:
@@ -315,13 +411,6 @@ class Parameter:
                 child_attribute.global_required = (
                         parameter_attribute.global_required and is_required
                 )
-                children.append(child_attribute)
-
-            # add sibling
-            for child in children:
-                for sibling in children:
-                    if child != sibling:
-                        child.add_sibling_parameter_attribute(sibling)
 
         elif parameter_attribute.parameter_type in (
                 ParameterType.STRING,
@@ -336,9 +425,6 @@ class Parameter:
                 f"parameter type {parameter_attribute.parameter_type} is not supported yet"
             )
 
-        self.add_attribute_attribute(parameter_attribute)
-        return parameter_attribute
-
     def add_attribute_attribute(self, attribute_attribute: ParameterAttribute):
         if attribute_attribute.attribute_path in self.attribute_dict:
             raise Exception(
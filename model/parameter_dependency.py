@@ -19,6 +19,13 @@ class ParameterDependency:
     def signature(self):
         return f"producer: {self.producer_parameter.signature} -> consumer: {self.consumer_parameter.signature}"
 
+    @property
+    def sort_key(self) -> Tuple[str, str, str]:
+        """
+        Sets of dependencies iterate in the order of the string hashes, which differs per process
+        """
+        return self.producer.signature, self.consumer.signature, self.signature
+
     def __repr__(self):
         return self.signature
 
@@ -1,5 +1,6 @@
 import dataclasses
 import enum
+import json
 from typing import Any, Dict, List, Tuple
 
 import requests
@@ -25,6 +26,7 @@ class Request:
     def to_dict(self):
         return {
             "method": self.method.method_path,
+            "endpoint": self.method.endpoint,
             "url": self.url,
             "params": self.params,
             "data": self.data,
@@ -41,6 +43,8 @@ class Response:
     request: Request = None
     text: str = None
     headers: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    # seconds from sending the request to receiving the response body
+    elapsed: float = None
     response_header_value_map: Dict[str, ParameterAttribute] = dataclasses.field(
         default_factory=dict
     )
@@ -107,5 +111,15 @@ class Response:
             )
         self._parse_json_value("", response.json(), ParameterLocation.BODY)
 
+    def parse_text(self):
+        """
+        Parse the body from the saved text, for responses read back from a result file
+        """
+        self._parse_json_value("", json.loads(self.text), ParameterLocation.BODY)
+
     def to_dict(self):
-        return {"status_code": self.status_code, "text": self.text}
+        return {
+            "status_code": self.status_code,
+            "text": self.text,
+            "elapsed": self.elapsed,
+        }
@@ -1,6 +1,5 @@
 import copy
 import dataclasses
-import uuid
 from typing import Dict, List, Tuple
 
 from model.method import Method
@@ -8,6 +7,7 @@ from model.parameter import Parameter, ParameterAttribute
 from model.parameter_dependency import (InContextAttributeDependency,
                                         InContextParameterDependency,
                                         ParameterDependency)
+from util.random_source import default_random_source
 
 
 @dataclasses.dataclass
@@ -23,7 +23,7 @@ class Sequence:
         int, List[InContextAttributeDependency]
     ] = dataclasses.field(default_factory=dict)
     is_from_chatgpt: bool = False
-    sequence_id: str = dataclasses.field(default_factory=lambda: str(uuid.uuid4()))
+    sequence_id: str = dataclasses.field(default_factory=lambda: str(default_random_source().uuid4("sequence")))
 
     def add_method(self, method: Method):
         self.method_sequence.append(method)
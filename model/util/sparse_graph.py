@@ -0,0 +1,166 @@
+from typing import Iterable, List, Set, Tuple
+
+import numpy as np
+
+
+class CSRGraph:
+    """
+    Compressed sparse row adjacency over integer node ids.
+
+    ``indptr[i]:indptr[i + 1]`` slices ``indices`` into the successors of node ``i``.
+    The transposed structure is kept as well so predecessor lookups are O(degree).
+    """
+
+    def __init__(self, node_count: int, edge_list: Iterable[Tuple[int, int]]):
+        self.node_count: int = node_count
+        edges = np.array(sorted(set(edge_list)), dtype=np.int64).reshape(-1, 2)
+        self.edge_count: int = len(edges)
+        self.indptr, self.indices = self._compress(edges[:, 0], edges[:, 1])
+        self.reverse_indptr, self.reverse_indices = self._compress(
+            edges[:, 1], edges[:, 0]
+        )
+
+    def _compress(self, sources: np.ndarray, targets: np.ndarray):
+        order = np.lexsort((targets, sources))
+        counts = np.bincount(sources, minlength=self.node_count)
+        indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, targets[order].astype(np.int32)
+
+    def successors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]: self.indptr[node + 1]]
+
+    def predecessors(self, node: int) -> np.ndarray:
+        return self.reverse_indices[
+            self.reverse_indptr[node]: self.reverse_indptr[node + 1]
+        ]
+
+    def has_edge(self, source: int, target: int) -> bool:
+        successors = self.successors(source)
+        position = np.searchsorted(successors, target)
+        return position < len(successors) and successors[position] == target
+
+    def add_edge(self, source: int, target: int) -> bool:
+        """
+        Insert an edge in place, keeping the rows sorted. Returns False if it already exists.
+        """
+        if self.has_edge(source, target):
+            return False
+        self.indptr, self.indices = self._insert(
+            self.indptr, self.indices, source, target
+        )
+        self.reverse_indptr, self.reverse_indices = self._insert(
+            self.reverse_indptr, self.reverse_indices, target, source
+        )
+        self.edge_count += 1
+        return True
+
+    @staticmethod
+    def _insert(indptr: np.ndarray, indices: np.ndarray, row: int, column: int):
+        row_begin, row_end = indptr[row], indptr[row + 1]
+        position = row_begin + np.searchsorted(indices[row_begin:row_end], column)
+        indices = np.insert(indices, position, column)
+        indptr = indptr.copy()
+        indptr[row + 1:] += 1
+        return indptr, indices
+
+    def strongly_connected_components(self) -> List[List[int]]:
+        """
+        Iterative Tarjan algorithm.
+
+        Components are returned in reverse topological order of the condensation,
+        i.e. a component is emitted only after every component it can reach.
+        """
+        index_counter = 0
+        index = [-1] * self.node_count
+        low_link = [0] * self.node_count
+        on_stack = [False] * self.node_count
+        stack: List[int] = []
+        component_list: List[List[int]] = []
+
+        for root in range(self.node_count):
+            if index[root] != -1:
+                continue
+            work_stack = [(root, 0)]
+            while work_stack:
+                node, child_position = work_stack.pop()
+                if child_position == 0:
+                    index[node] = low_link[node] = index_counter
+                    index_counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                successors = self.successors(node)
+                recurse = False
+                while child_position < len(successors):
+                    child = int(successors[child_position])
+                    child_position += 1
+                    if index[child] == -1:
+                        work_stack.append((node, child_position))
+                        work_stack.append((child, 0))
+                        recurse = True
+                        break
+                    if on_stack[child]:
+                        low_link[node] = min(low_link[node], index[child])
+                if recurse:
+                    continue
+                if low_link[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    component_list.append(sorted(component))
+                if work_stack:
+                    parent = work_stack[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[node])
+        return component_list
+
+    def topological_order(self, component_list: List[List[int]] = None) -> List[int]:
+        """
+        Topological order of the nodes, producers first.
+
+        Cycles are collapsed through the strongly connected components, members of the
+        same component are adjacent in the result.
+        """
+        if component_list is None:
+            component_list = self.strongly_connected_components()
+        order: List[int] = []
+        for component in reversed(component_list):
+            order.extend(component)
+        return order
+
+    def transitive_predecessors(
+        self, component_list: List[List[int]] = None
+    ) -> List[Set[int]]:
+        """
+        For each node, every node which can reach it (excluding itself unless it lies on a cycle).
+        """
+        if component_list is None:
+            component_list = self.strongly_connected_components()
+        component_of = [0] * self.node_count
+        for component_id, component in enumerate(component_list):
+            for node in component:
+                component_of[node] = component_id
+
+        component_ancestor_list: List[Set[int]] = [set() for _ in component_list]
+        # walk the condensation producers first so every ancestor set is complete
+        for component_id in reversed(range(len(component_list))):
+            component = component_list[component_id]
+            ancestors = component_ancestor_list[component_id]
+            if len(component) > 1:
+                ancestors.update(component)
+            for node in component:
+                for predecessor in self.predecessors(node):
+                    predecessor = int(predecessor)
+                    predecessor_component = component_of[predecessor]
+                    if predecessor_component == component_id:
+                        ancestors.add(predecessor)
+                        continue
+                    ancestors.add(predecessor)
+                    ancestors.update(component_ancestor_list[predecessor_component])
+        return [
+            component_ancestor_list[component_of[node]]
+            for node in range(self.node_count)
+        ]
@@ -0,0 +1,24 @@
+from benchmark.import_benchmark import measure_import
+
+# importing the command line may take this many times as long as importing requests, which it needs anyway
+IMPORT_BUDGET_RATIO = 4
+
+
+def best_import_time(module: str, cwd, repeat: int = 3) -> float:
+    """
+    The best of a few runs, a busy machine only makes a run slower
+    """
+    return min(measure_import([module], cwd)["total"] for _ in range(repeat))
+
+
+def test_import_main_within_budget(tmp_path):
+    # main.py writes its log to the working directory
+    import_time = best_import_time("main", tmp_path)
+    baseline_time = best_import_time("requests", tmp_path)
+    assert import_time < IMPORT_BUDGET_RATIO * baseline_time, (
+        f"importing main takes {import_time:.3f}s, requests {baseline_time:.3f}s"
+    )
+
+
+def test_import_main_skips_optional_modules(tmp_path):
+    assert measure_import(["main"], tmp_path)["loaded_optional_modules"] == []
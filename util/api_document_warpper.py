@@ -1,11 +1,22 @@
-from typing import List
+from typing import Iterator, List, Tuple
 
 from model.api import API
 from model.method import Method
+from model.parameter import SchemaRegistry
+
+
+def iterate_operations(open_api_doc: dict) -> Iterator[Tuple[str, str, dict]]:
+    """
+    Yield (path, method type, method raw body) for every operation of the document
+    """
+    for path in open_api_doc["paths"]:
+        for method_type in open_api_doc["paths"][path]:
+            yield path, method_type, open_api_doc["paths"][path][method_type]
 
 
 def wrap_methods_from_open_api_document(open_api_doc: dict) -> List[API]:
     apis: List[API] = []
+    schema_registry: SchemaRegistry = SchemaRegistry()
 
     for path in open_api_doc["paths"]:
         api = API(path, open_api_doc["paths"][path])
@@ -13,7 +24,7 @@ def wrap_methods_from_open_api_document(open_api_doc: dict) -> List[API]:
 
         for method_type in open_api_doc["paths"][path]:
             method_raw_data = open_api_doc["paths"][path][method_type]
-            method = Method(method_type, path, method_raw_data)
-            method.parse_parameters()
+            # parameters are parsed on first access
+            method = Method(method_type, path, method_raw_data, schema_registry)
             api.add_method(method)
     return apis
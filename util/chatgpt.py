@@ -2,32 +2,139 @@
 
 import dataclasses
 import json
+import os
 import re
+import threading
 import time
 from typing import Any, Dict, List, Tuple
 from uuid import uuid1
 
 import loguru
-import openai
-import requests
+
+from util.deadline import DeadlineExceeded
+from util.llm_cache import LLMCache
+from util.metrics import MetricsRegistry
+from util.token_bucket import TokenBucket
 
 logger = loguru.logger
 
-config = json.load(open("./config.json", "r"))
+CONFIG_PATH = "./config.json"
+_config: Dict[str, Any] = None
+
+
+def load_config() -> Dict[str, Any]:
+    """
+    Read the api key on first use, only runs with chatgpt enabled need config.json.
+    OPENAI_API_KEY is used when the file does not exist.
+    """
+    global _config
+    if _config is None:
+        import openai
+
+        if os.path.exists(CONFIG_PATH):
+            with open(CONFIG_PATH, "r") as f:
+                _config = json.load(f)
+        elif "OPENAI_API_KEY" in os.environ:
+            _config = {"api_key": os.environ["OPENAI_API_KEY"]}
+        else:
+            raise FileNotFoundError(
+                f"{CONFIG_PATH} or OPENAI_API_KEY is required when chatgpt is enabled"
+            )
+        openai.api_key = _config["api_key"]
+    return _config
 
-openai.api_key = config["api_key"]
 
+DEFAULT_MODEL = "gpt-4"
+PROVIDER = "openai"
+# answer of the stub to prompts missing from the cache in replay mode
+STUB_RESPONSE = ""
 
-def chatgpt_completion(history: List) -> str:
+
+def chatgpt_completion(history: List, model: str = DEFAULT_MODEL) -> str:
+    # the openai client takes longer to import than the rest of the fuzzer
+    import openai
+
+    load_config()
     response = openai.ChatCompletion.create(
-        model="gpt-4",
+        model=model,
         messages=history,
     )
     return response["choices"][0]["message"]["content"]
 
 
+def stub_completion(history: List, model: str = DEFAULT_MODEL) -> str:
+    return STUB_RESPONSE
+
+
+_rate_limiter_map: Dict[Tuple[str, float, int], TokenBucket] = {}
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, rate: float, burst: int) -> TokenBucket:
+    """
+    One bucket per provider and limit, shared by the agents of the process configured with it
+    """
+    key = (provider, rate, burst)
+    with _rate_limiter_lock:
+        if key not in _rate_limiter_map:
+            _rate_limiter_map[key] = TokenBucket(burst, rate)
+        return _rate_limiter_map[key]
+
+
 class ChatGPT:
+    """
+    :param cache: completions are looked up here first and stored after every call
+    :param replay: never call the model, misses are answered by stub_completion
+    :param rate_limiter: taken once per call to the model, cache hits are free
+    :param metrics: counts the answers by source and times them
+    :param stop_event: stops the wait for the rate limiter, e.g. on shutdown
+    """
+
+    def __init__(
+        self,
+        cache: LLMCache = None,
+        replay: bool = False,
+        model: str = DEFAULT_MODEL,
+        rate_limiter: TokenBucket = None,
+        metrics: MetricsRegistry = None,
+        stop_event: threading.Event = None,
+    ):
+        self.cache: LLMCache = cache
+        self.replay: bool = replay
+        self.model: str = model
+        self.rate_limiter: TokenBucket = rate_limiter
+        self.stop_event: threading.Event = stop_event
+        self.stub_count: int = 0
+        metrics = metrics if metrics is not None else MetricsRegistry()
+        self.request_counter = metrics.counter(
+            "morest_llm_requests_total", "Prompts answered, by source (cache, model or stub)"
+        )
+        self.request_latency_histogram = metrics.histogram(
+            "morest_llm_request_seconds", "Time to answer a prompt, by source"
+        )
+
+    def _answer(self, history: List) -> Tuple[str, str]:
+        """
+        :return: the answer and its source
+        """
+        if self.cache is not None:
+            response = self.cache.get(self.model, history)
+            if response is not None:
+                return response, "cache"
+        if self.replay:
+            self.stub_count += 1
+            return stub_completion(history, self.model), "stub"
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(stop_event=self.stop_event):
+            raise DeadlineExceeded("stopped while waiting for the rate limiter")
+        response = chatgpt_completion(history, self.model)
+        if self.cache is not None:
+            self.cache.put(self.model, history, response)
+        return response, "model"
+
     def send_message(self, message):
         history = [{"role": "user", "content": message}]
-        response = chatgpt_completion(history)
+        start_time = time.perf_counter()
+        response, source = self._answer(history)
+        self.request_counter.inc(source=source)
+        self.request_latency_histogram.observe(time.perf_counter() - start_time, source=source)
         return response
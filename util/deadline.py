@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when work is abandoned because the deadline passed
+    """
+
+
+class Deadline:
+    """
+    End of the time budget, shared by the fuzzing loop, the request timeouts and the background
+    threads. cancel() ends the run before the budget is spent, e.g. on an interrupt.
+    """
+
+    def __init__(self, time_budget: float, begin_time: float = None):
+        self.begin_time: float = time.time() if begin_time is None else begin_time
+        self.end_time: float = self.begin_time + time_budget
+        self._cancel_event: threading.Event = threading.Event()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def is_expired(self) -> bool:
+        return self._cancel_event.is_set() or time.time() >= self.end_time
+
+    def remaining(self) -> float:
+        if self._cancel_event.is_set():
+            return 0
+        return max(0.0, self.end_time - time.time())
+
+    def timeout(self, max_timeout: float) -> float:
+        """
+        :param max_timeout: timeout of the operation without a deadline
+        :return: the timeout clipped to the remaining time
+        """
+        return min(max_timeout, self.remaining())
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def expire(self):
+        """
+        End the budget now, when the time left is too short for any more work. Unlike cancel()
+        the budget counts as spent.
+        """
+        self.end_time = min(self.end_time, time.time())
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Sleep up to timeout seconds, waking up early when the deadline passes or is cancelled
+
+        :return: True if the deadline is expired
+        """
+        self._cancel_event.wait(min(timeout, self.remaining()))
+        return self.is_expired
@@ -0,0 +1,107 @@
+import math
+from typing import Dict
+
+
+class HdrHistogram:
+    """
+    High dynamic range histogram of positive values.
+
+    Values are recorded in integer units (microseconds for latencies) into log-linear
+    buckets, every bucket spans at most 1 / 10 ** significant_figures of its value, so
+    percentiles keep that relative precision from microseconds to hours in a few
+    hundred counters. Recording is O(1).
+    """
+
+    def __init__(self, significant_figures: int = 2, unit_scale: float = 1e6):
+        self.significant_figures: int = significant_figures
+        # seconds to recorded units
+        self.unit_scale: float = unit_scale
+        self.sub_bucket_bits: int = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self.sub_bucket_count: int = 1 << self.sub_bucket_bits
+        self.sub_bucket_half_count: int = self.sub_bucket_count >> 1
+        self.count_map: Dict[int, int] = {}
+        self.total_count: int = 0
+        self.total_value: float = 0
+        self.min_value: float = None
+        self.max_value: float = None
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        sub_bucket = value >> shift
+        return (
+            self.sub_bucket_count
+            + (shift - 1) * self.sub_bucket_half_count
+            + sub_bucket
+            - self.sub_bucket_half_count
+        )
+
+    def _bucket_range(self, index: int):
+        if index < self.sub_bucket_count:
+            return index, index
+        shift = (index - self.sub_bucket_count) // self.sub_bucket_half_count + 1
+        sub_bucket = (
+            (index - self.sub_bucket_count) % self.sub_bucket_half_count
+            + self.sub_bucket_half_count
+        )
+        return sub_bucket << shift, ((sub_bucket + 1) << shift) - 1
+
+    def record(self, value: float, count: int = 1):
+        """
+        :param value: value in seconds
+        """
+        scaled_value = max(0, int(value * self.unit_scale))
+        index = self._index(scaled_value)
+        self.count_map[index] = self.count_map.get(index, 0) + count
+        self.total_count += count
+        self.total_value += value * count
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+        self.max_value = value if self.max_value is None else max(self.max_value, value)
+
+    def merge(self, other: "HdrHistogram"):
+        for index, count in other.count_map.items():
+            self.count_map[index] = self.count_map.get(index, 0) + count
+        self.total_count += other.total_count
+        self.total_value += other.total_value
+        if other.total_count > 0:
+            self.min_value = (
+                other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+            )
+            self.max_value = (
+                other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+            )
+
+    def percentile(self, percentile: float) -> float:
+        """
+        :param percentile: between 0 and 100
+        :return: value in seconds, the midpoint of the bucket holding the percentile
+        """
+        if self.total_count == 0:
+            return 0
+        target_count = max(1, math.ceil(self.total_count * percentile / 100))
+        cumulative_count = 0
+        for index in sorted(self.count_map):
+            cumulative_count += self.count_map[index]
+            if cumulative_count >= target_count:
+                low, high = self._bucket_range(index)
+                value = (low + high) / 2 / self.unit_scale
+                return min(max(value, self.min_value), self.max_value)
+        return self.max_value
+
+    @property
+    def mean(self) -> float:
+        if self.total_count == 0:
+            return 0
+        return self.total_value / self.total_count
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.total_count,
+            "min": self.min_value,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max_value,
+        }
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import loguru
+
+logger = loguru.logger
+
+# puts between two scans of the directory for size based eviction
+EVICTION_CHECK_INTERVAL = 32
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]]) -> str:
+    """
+    Content address of a completion request
+    """
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Completions on disk, one json file per request under <cache_dir>/<key[:2]>/<key>.json.
+    Files are written to a temporary name and renamed, so runs in other processes sharing the
+    directory never read a partial entry. Entries older than ttl are misses, and the least
+    recently used entries are removed once the directory grows over max_size bytes.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = 7 * 24 * 3600, max_size: int = 256 * 1024 * 1024):
+        self.cache_dir: pathlib.Path = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl: float = ttl
+        self.max_size: int = max_size
+        self.hit_count: int = 0
+        self.miss_count: int = 0
+        self._put_count: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, model: str, messages: List[Dict[str, Any]]) -> Optional[str]:
+        path = self._path(cache_key(model, messages))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None and self.ttl > 0 and entry["created_time"] + self.ttl < time.time():
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.miss_count += 1
+                return None
+            self.hit_count += 1
+        try:
+            # the access time drives eviction, noatime mounts do not update it on read
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["response"]
+
+    def put(self, model: str, messages: List[Dict[str, Any]], response: str):
+        path = self._path(cache_key(model, messages))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"model": model, "created_time": time.time(), "response": response}
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(f.name, path)
+
+        with self._lock:
+            self._put_count += 1
+            should_check = self._put_count % EVICTION_CHECK_INTERVAL == 0
+        if should_check:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then the least recently used ones until the size fits
+
+        :return: number of removed entries
+        """
+        entry_list = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                # removed by another process
+                continue
+            entry_list.append((stat.st_mtime, stat.st_size, path))
+        entry_list.sort()
+
+        total_size = sum(size for _, size, _ in entry_list)
+        expire_time = time.time() - self.ttl if self.ttl > 0 else 0
+        removed_count = 0
+        for mtime, size, path in entry_list:
+            if total_size <= self.max_size and mtime >= expire_time:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_size -= size
+            removed_count += 1
+        if removed_count > 0:
+            logger.info(f"llm cache evicted {removed_count} entries, {total_size} bytes left")
+        return removed_count
@@ -0,0 +1,281 @@
+import bisect
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import loguru
+
+logger = loguru.logger
+
+LabelTuple = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKET_LIST: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+
+
+def _label_tuple(labels: Dict[str, str]) -> LabelTuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_tuple: LabelTuple, extra: str = "") -> str:
+    label_list = [f'{key}="{value}"' for key, value in label_tuple]
+    if extra:
+        label_list.append(extra)
+    if len(label_list) == 0:
+        return ""
+    return "{" + ",".join(label_list) + "}"
+
+
+class Metric:
+    type_name: str = "untyped"
+
+    def __init__(self, name: str, description: str, lock: threading.Lock):
+        self.name: str = name
+        self.description: str = description
+        self._lock: threading.Lock = lock
+
+    def to_prometheus(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+
+    def to_dict(self) -> dict:
+        return {}
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, lock: threading.Lock):
+        super().__init__(name, description, lock)
+        self.value_map: Dict[LabelTuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        label_tuple = _label_tuple(labels)
+        with self._lock:
+            self.value_map[label_tuple] = self.value_map.get(label_tuple, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.value_map.get(_label_tuple(labels), 0)
+
+    def to_prometheus(self) -> List[str]:
+        line_list = super().to_prometheus()
+        for label_tuple, value in list(self.value_map.items()):
+            line_list.append(f"{self.name}{_format_labels(label_tuple)} {value}")
+        return line_list
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type_name,
+            "values": [
+                {"labels": dict(label_tuple), "value": value}
+                for label_tuple, value in list(self.value_map.items())
+            ],
+        }
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        label_tuple = _label_tuple(labels)
+        with self._lock:
+            self.value_map[label_tuple] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        lock: threading.Lock,
+        bucket_list: Sequence[float] = DEFAULT_BUCKET_LIST,
+    ):
+        super().__init__(name, description, lock)
+        self.bucket_list: List[float] = sorted(bucket_list)
+        # per label: non-cumulative bucket counts (+Inf last), sum, count
+        self.value_map: Dict[LabelTuple, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        label_tuple = _label_tuple(labels)
+        bucket_index = bisect.bisect_left(self.bucket_list, value)
+        with self._lock:
+            if label_tuple not in self.value_map:
+                self.value_map[label_tuple] = ([0] * (len(self.bucket_list) + 1), [0.0, 0])
+            bucket_count_list, total = self.value_map[label_tuple]
+            bucket_count_list[bucket_index] += 1
+            total[0] += value
+            total[1] += 1
+
+    def to_prometheus(self) -> List[str]:
+        line_list = super().to_prometheus()
+        for label_tuple, (bucket_count_list, total) in list(self.value_map.items()):
+            cumulative_count = 0
+            for bound, count in zip(self.bucket_list + ["+Inf"], bucket_count_list):
+                cumulative_count += count
+                bucket_labels = _format_labels(label_tuple, f'le="{bound}"')
+                line_list.append(f"{self.name}_bucket{bucket_labels} {cumulative_count}")
+            line_list.append(f"{self.name}_sum{_format_labels(label_tuple)} {total[0]}")
+            line_list.append(f"{self.name}_count{_format_labels(label_tuple)} {total[1]}")
+        return line_list
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type_name,
+            "buckets": self.bucket_list,
+            "values": [
+                {
+                    "labels": dict(label_tuple),
+                    "bucket_counts": list(bucket_count_list),
+                    "sum": total[0],
+                    "count": total[1],
+                }
+                for label_tuple, (bucket_count_list, total) in list(self.value_map.items())
+            ],
+        }
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms updated in O(1) per event.
+    Snapshots are rendered on demand in Prometheus text format or JSON.
+    """
+
+    def __init__(self):
+        self._lock: threading.Lock = threading.Lock()
+        self.metric_map: Dict[str, Metric] = {}
+        self._http_server: "ThreadingHTTPServer" = None
+        self._snapshot_stop_event: threading.Event = None
+        self._snapshot_thread: threading.Thread = None
+
+    def _get_or_create(self, metric_class, name: str, description: str, **kwargs) -> Metric:
+        with self._lock:
+            if name not in self.metric_map:
+                self.metric_map[name] = metric_class(name, description, self._lock, **kwargs)
+            metric = self.metric_map[name]
+        if not isinstance(metric, metric_class):
+            raise Exception(f"metric {name} is already registered as {metric.type_name}")
+        return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        bucket_list: Sequence[float] = DEFAULT_BUCKET_LIST,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, description, bucket_list=bucket_list)
+
+    def to_prometheus(self) -> str:
+        line_list = []
+        for metric in list(self.metric_map.values()):
+            line_list.extend(metric.to_prometheus())
+        return "\n".join(line_list) + "\n"
+
+    def to_dict(self) -> dict:
+        return {
+            "timestamp": time.time(),
+            "metrics": {
+                name: metric.to_dict() for name, metric in list(self.metric_map.items())
+            },
+        }
+
+    def render(self, metrics_format: str) -> str:
+        if metrics_format == "json":
+            return json.dumps(self.to_dict(), indent=4)
+        if metrics_format == "prometheus":
+            return self.to_prometheus()
+        raise Exception(f"unknown metrics format {metrics_format}")
+
+    def write_snapshot(self, file_path: pathlib.Path, metrics_format: str):
+        """
+        Atomically replace the snapshot file, readers never see a partial file
+        """
+        content = self.render(metrics_format)
+        file_path = pathlib.Path(file_path)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=file_path.parent, prefix=file_path.name, delete=False
+        ) as f:
+            f.write(content)
+        os.replace(f.name, file_path)
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1"):
+        """
+        Serve the Prometheus text format on /metrics and JSON on /metrics.json
+        """
+        # http.server pulls in the html and email packages, only load it for the endpoint
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = registry.to_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = registry.render("json").encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(
+            target=self._http_server.serve_forever, name="metrics-http", daemon=True
+        ).start()
+        logger.info(f"metrics endpoint: http://{host}:{port}/metrics")
+
+    def stop_http_server(self):
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
+
+    def start_snapshot_writer(
+        self, file_path: pathlib.Path, metrics_format: str, interval: float
+    ):
+        """
+        Write a snapshot every interval seconds on a background thread
+        """
+        self._snapshot_stop_event = threading.Event()
+
+        def write_periodically():
+            while not self._snapshot_stop_event.wait(interval):
+                try:
+                    self.write_snapshot(file_path, metrics_format)
+                except Exception as e:
+                    logger.error(f"failed to write metrics snapshot: {e}")
+
+        self._snapshot_thread = threading.Thread(
+            target=write_periodically, name="metrics-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def stop_snapshot_writer(self):
+        if self._snapshot_stop_event is None:
+            return
+        self._snapshot_stop_event.set()
+        self._snapshot_thread.join()
+        self._snapshot_stop_event = None
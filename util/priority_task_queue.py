@@ -0,0 +1,88 @@
+import heapq
+import itertools
+import threading
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+
+class PriorityTaskQueue:
+    """
+    Bounded queue handing out the task with the highest priority first.
+    A task is queued at most once: putting it again only raises its priority, and a task
+    is not queued again while a consumer works on it. When the queue is full the task
+    with the lowest priority is dropped.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size: int = max_size
+        # (-priority, order, task), outdated entries stay in the heap until popped
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._priority_map: Dict[Hashable, float] = {}
+        self._running_task_set: Set[Hashable] = set()
+        self._order = itertools.count()
+        self._condition: threading.Condition = threading.Condition()
+        self._is_closed: bool = False
+        self.dropped_count: int = 0
+
+    def __len__(self) -> int:
+        return len(self._priority_map)
+
+    def _compact(self):
+        self._heap = [
+            entry for entry in self._heap if self._priority_map.get(entry[2], None) == -entry[0]
+        ]
+        heapq.heapify(self._heap)
+
+    def put(self, task: Hashable, priority: float) -> bool:
+        """
+        :return: False if the task is running or was dropped because the queue is full
+        """
+        with self._condition:
+            if self._is_closed or task in self._running_task_set:
+                return False
+            queued_priority = self._priority_map.get(task, None)
+            if queued_priority is not None and queued_priority >= priority:
+                return True
+            if queued_priority is None and len(self._priority_map) >= self.max_size:
+                lowest_task = min(self._priority_map, key=self._priority_map.get)
+                if self._priority_map[lowest_task] >= priority:
+                    self.dropped_count += 1
+                    return False
+                del self._priority_map[lowest_task]
+                self.dropped_count += 1
+            self._priority_map[task] = priority
+            heapq.heappush(self._heap, (-priority, next(self._order), task))
+            if len(self._heap) > 4 * max(len(self._priority_map), 16):
+                self._compact()
+            self._condition.notify()
+            return True
+
+    def get(self, timeout: float = None) -> Optional[Hashable]:
+        """
+        Block until a task is available, the task is marked as running until task_done
+
+        :return: None on timeout or when the queue is closed
+        """
+        with self._condition:
+            while True:
+                while self._heap:
+                    negative_priority, _, task = heapq.heappop(self._heap)
+                    if self._priority_map.get(task, None) == -negative_priority:
+                        del self._priority_map[task]
+                        self._running_task_set.add(task)
+                        return task
+                if self._is_closed:
+                    return None
+                if not self._condition.wait(timeout):
+                    return None
+
+    def task_done(self, task: Hashable):
+        with self._condition:
+            self._running_task_set.discard(task)
+
+    def close(self):
+        """
+        Wake up every consumer waiting in get
+        """
+        with self._condition:
+            self._is_closed = True
+            self._condition.notify_all()
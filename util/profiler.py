@@ -0,0 +1,170 @@
+import collections
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+import loguru
+
+from util.hdr_histogram import HdrHistogram
+
+logger = loguru.logger
+
+
+class PhaseStatistic:
+    def __init__(self):
+        self.histogram: HdrHistogram = HdrHistogram()
+        self.total_time: float = 0
+
+    def record(self, elapsed: float):
+        self.histogram.record(elapsed)
+        self.total_time += elapsed
+
+    def to_dict(self) -> dict:
+        return {"total": self.total_time, **self.histogram.to_dict()}
+
+
+class _PhaseTimer:
+    __slots__ = ("profiler", "phase_name", "start_time")
+
+    def __init__(self, profiler: "PhaseProfiler", phase_name: str):
+        self.profiler: "PhaseProfiler" = profiler
+        self.phase_name: str = phase_name
+        self.start_time: float = 0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.phase_name, time.perf_counter() - self.start_time)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class PhaseProfiler:
+    """
+    Wall time of the phases of the fuzzing loop (generate, build, send, parse,
+    dictionary update, analysis). A disabled profiler hands out a shared no-op timer.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled: bool = enabled
+        self.begin_time: float = time.perf_counter()
+        self.phase_map: Dict[str, PhaseStatistic] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def phase(self, phase_name: str):
+        """
+        :return: context manager timing its body as the given phase
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _PhaseTimer(self, phase_name)
+
+    def record(self, phase_name: str, elapsed: float):
+        statistic = self.phase_map.get(phase_name, None)
+        if statistic is None:
+            with self._lock:
+                statistic = self.phase_map.setdefault(phase_name, PhaseStatistic())
+        statistic.record(elapsed)
+
+    def to_dict(self) -> dict:
+        wall_time = time.perf_counter() - self.begin_time
+        return {
+            "wall_time": wall_time,
+            "phases": {
+                phase_name: {
+                    **statistic.to_dict(),
+                    "share": statistic.total_time / wall_time if wall_time > 0 else 0,
+                }
+                for phase_name, statistic in list(self.phase_map.items())
+            },
+        }
+
+    def write(self, file_path: pathlib.Path):
+        if not self.enabled:
+            return
+        profile = self.to_dict()
+        with open(file_path, "w") as f:
+            json.dump(profile, f, indent=4)
+        for phase_name, statistic in sorted(
+            profile["phases"].items(), key=lambda item: item[1]["total"], reverse=True
+        ):
+            logger.info(
+                f"Phase {phase_name}: {statistic['total']:.3f}s ({statistic['share']:.1%}), "
+                f"{statistic['count']} calls, p99 {statistic['p99'] * 1000:.3f}ms"
+            )
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread at a fixed interval and writes them in the folded
+    format (``frame;frame;frame count``) read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, root_dir: Optional[str] = None):
+        self.interval: float = interval
+        self.root_dir: str = root_dir or os.getcwd()
+        self.stack_count: collections.Counter = collections.Counter()
+        self.sample_count: int = 0
+        self._stop_event: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(
+            target=self._sample, name="sampling-profiler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def _frame_name(self, frame) -> str:
+        code = frame.f_code
+        file_name = code.co_filename
+        if file_name.startswith(self.root_dir):
+            file_name = os.path.relpath(file_name, self.root_dir)
+        else:
+            file_name = os.path.basename(file_name)
+        # ";" separates the frames, the count follows the last space
+        return f"{code.co_name} ({file_name}:{code.co_firstlineno})".replace(";", ":")
+
+    def _sample(self):
+        own_thread_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            thread_name_map = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                frame_name_list = []
+                while frame is not None:
+                    frame_name_list.append(self._frame_name(frame))
+                    frame = frame.f_back
+                thread_name = thread_name_map.get(thread_id, str(thread_id)).replace(";", ":")
+                frame_name_list.append(thread_name)
+                self.stack_count[";".join(reversed(frame_name_list))] += 1
+            self.sample_count += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def write(self, file_path: pathlib.Path):
+        with open(file_path, "w") as f:
+            for stack, count in self.stack_count.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"wrote {self.sample_count} stack samples to {file_path}")
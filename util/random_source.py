@@ -0,0 +1,76 @@
+import hashlib
+import random
+import threading
+import uuid
+from typing import Dict, Optional
+
+
+class RandomSource:
+    """
+    Independent random streams of the components of a run, by name. With a seed every stream is
+    derived from the seed and its name, so a component draws the same values whatever the other
+    components draw. Without a seed the streams are seeded from the system.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed: Optional[int] = seed
+        self._random_map: Dict[str, random.Random] = {}
+        self._numpy_map: Dict[str, "np.random.RandomState"] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def is_seeded(self) -> bool:
+        return self.seed is not None
+
+    def _stream_seed(self, name: str) -> Optional[int]:
+        if self.seed is None:
+            return None
+        digest = hashlib.sha256(f"{self.seed}:{name}".encode("utf-8")).digest()
+        # RandomState takes 32 bit seeds
+        return int.from_bytes(digest[:4], "big")
+
+    def random(self, name: str) -> random.Random:
+        with self._lock:
+            if name not in self._random_map:
+                self._random_map[name] = random.Random(self._stream_seed(name))
+            return self._random_map[name]
+
+    def numpy(self, name: str) -> "np.random.RandomState":
+        """
+        :return: a stream with the api of np.random, e.g. random(), randint() and choice()
+        """
+        # the model imports this module, numpy is only loaded by the generators
+        import numpy as np
+
+        with self._lock:
+            if name not in self._numpy_map:
+                self._numpy_map[name] = np.random.RandomState(self._stream_seed(f"numpy:{name}"))
+            return self._numpy_map[name]
+
+    def uuid4(self, name: str) -> uuid.UUID:
+        if self.seed is None:
+            return uuid.uuid4()
+        stream = self.random(f"uuid:{name}")
+        with self._lock:
+            return uuid.UUID(int=stream.getrandbits(128), version=4)
+
+
+# ids of the model objects, they are created before any fuzzer exists
+_default_random_source: RandomSource = RandomSource()
+
+
+def default_random_source() -> RandomSource:
+    return _default_random_source
+
+
+def seed_default_random_source(seed: Optional[int]):
+    """
+    Replace the source of the model ids and seed the global generators used by libraries
+    """
+    global _default_random_source
+    _default_random_source = RandomSource(seed)
+    if seed is not None:
+        import numpy as np
+
+        random.seed(seed)
+        np.random.seed(seed)
@@ -0,0 +1,95 @@
+from typing import Any, Dict, Set
+from urllib.parse import unquote
+
+import loguru
+
+logger = loguru.logger
+
+
+class SharedRefResolver:
+    """
+    Resolve the local references of an api document in place.
+
+    Every ``$ref`` is replaced by the one resolved object of its target instead of a copy,
+    so a component used by many operations exists once in memory. Recursive schemas are
+    kept as cycles in the object graph, i.e. the inner reference points back at the outer
+    object instead of being cut off by a recursion limit.
+    """
+
+    def __init__(self, specification: dict):
+        self.specs: dict = specification
+        self._ref_cache: Dict[str, Any] = {}
+        self._resolving_ref_set: Set[str] = set()
+        self._visited_id_set: Set[int] = set()
+
+    @staticmethod
+    def has_external_references(node: Any) -> bool:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                ref = node.get("$ref", None)
+                if isinstance(ref, str) and not ref.startswith("#"):
+                    return True
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+        return False
+
+    def resolve_references(self):
+        self.specs = self._resolve_node(self.specs)
+
+    def _lookup(self, ref: str) -> Any:
+        node = self.specs
+        for token in ref[1:].split("/")[1:]:
+            token = unquote(token).replace("~1", "/").replace("~0", "~")
+            if isinstance(node, list):
+                node = node[int(token)]
+            else:
+                node = node[token]
+        return node
+
+    def _resolve_ref(self, ref: str) -> Any:
+        if ref in self._ref_cache:
+            return self._ref_cache[ref]
+        if ref in self._resolving_ref_set:
+            raise Exception(f"reference {ref} only refers to itself")
+        self._resolving_ref_set.add(ref)
+        target = self._lookup(ref)
+        if isinstance(target, dict) and isinstance(target.get("$ref", None), str):
+            # alias of another reference
+            target = self._resolve_reference_node(target)
+        # register before descending, so a recursive reference gets the same object
+        self._ref_cache[ref] = target
+        self._resolving_ref_set.discard(ref)
+        return self._resolve_node(target)
+
+    def _resolve_reference_node(self, node: dict) -> Any:
+        target = self._resolve_ref(node["$ref"])
+        if len(node) == 1:
+            return target
+        # sibling keywords next to the reference override the target
+        merged = dict(target)
+        merged.update(
+            {key: self._resolve_node(value) for key, value in node.items() if key != "$ref"}
+        )
+        return merged
+
+    def _resolve_node(self, node: Any) -> Any:
+        if isinstance(node, dict):
+            if isinstance(node.get("$ref", None), str):
+                return self._resolve_reference_node(node)
+            if id(node) in self._visited_id_set:
+                return node
+            self._visited_id_set.add(id(node))
+            for key, value in node.items():
+                if isinstance(value, (dict, list)):
+                    node[key] = self._resolve_node(value)
+        elif isinstance(node, list):
+            if id(node) in self._visited_id_set:
+                return node
+            self._visited_id_set.add(id(node))
+            for index, value in enumerate(node):
+                if isinstance(value, (dict, list)):
+                    node[index] = self._resolve_node(value)
+        return node
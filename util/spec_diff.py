@@ -0,0 +1,122 @@
+import dataclasses
+from typing import Dict, List, Tuple
+
+import loguru
+
+from model.api import API
+from model.method import Method, compute_content_hash
+from model.parameter import SchemaRegistry
+from util.api_document_warpper import iterate_operations
+
+logger = loguru.logger
+
+MethodKey = Tuple[str, str]
+
+
+@dataclasses.dataclass
+class SpecificationDiff:
+    """
+    Operations added, removed and changed between two versions of an api document.
+    Only added and changed operations are wrapped into new methods.
+    """
+
+    added_method_list: List[Method] = dataclasses.field(default_factory=list)
+    removed_method_list: List[Method] = dataclasses.field(default_factory=list)
+    # (old method, new method)
+    changed_method_list: List[Tuple[Method, Method]] = dataclasses.field(
+        default_factory=list
+    )
+    # raw path item of every path owning an added or changed method
+    path_raw_data_map: Dict[str, dict] = dataclasses.field(default_factory=dict)
+    unchanged_count: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return (
+            len(self.added_method_list) == 0
+            and len(self.removed_method_list) == 0
+            and len(self.changed_method_list) == 0
+        )
+
+    @property
+    def outdated_method_list(self) -> List[Method]:
+        """
+        Methods of the old version which are no longer valid
+        """
+        return self.removed_method_list + [old for old, _ in self.changed_method_list]
+
+    @property
+    def new_method_list(self) -> List[Method]:
+        """
+        Methods of the new version which have to be added
+        """
+        return self.added_method_list + [new for _, new in self.changed_method_list]
+
+    def __repr__(self):
+        return (
+            f"SpecificationDiff(added={len(self.added_method_list)}, removed={len(self.removed_method_list)}, "
+            f"changed={len(self.changed_method_list)}, unchanged={self.unchanged_count})"
+        )
+
+
+def _method_key(method: Method) -> MethodKey:
+    return method.method_path, method.method_type.value
+
+
+def diff_specification(
+    method_list: List[Method], open_api_doc: dict
+) -> SpecificationDiff:
+    """
+    Compare the parsed methods of the old version with a resolved api document
+
+    :param method_list: List[Method]
+    :param open_api_doc: dict
+    :return: SpecificationDiff
+    """
+    diff = SpecificationDiff()
+    old_method_map: Dict[MethodKey, Method] = {
+        _method_key(method): method for method in method_list
+    }
+    seen_key_set = set()
+    schema_registry: SchemaRegistry = SchemaRegistry()
+
+    for path, method_type, method_raw_data in iterate_operations(open_api_doc):
+        key = (path, method_type)
+        seen_key_set.add(key)
+        old_method = old_method_map.get(key, None)
+        if old_method is not None:
+            if old_method.content_hash == compute_content_hash(method_raw_data):
+                diff.unchanged_count += 1
+                continue
+
+        method = Method(method_type, path, method_raw_data, schema_registry)
+        diff.path_raw_data_map[path] = open_api_doc["paths"][path]
+        if old_method is None:
+            diff.added_method_list.append(method)
+        else:
+            diff.changed_method_list.append((old_method, method))
+
+    for key, old_method in old_method_map.items():
+        if key not in seen_key_set:
+            diff.removed_method_list.append(old_method)
+
+    logger.info(f"specification diff: {diff}")
+    return diff
+
+
+def apply_diff_to_api_list(api_list: List[API], diff: SpecificationDiff):
+    """
+    Keep the api wrappers consistent with the diff
+    """
+    api_map: Dict[str, API] = {api.path: api for api in api_list}
+    for method in diff.outdated_method_list:
+        api = api_map.get(method.method_path, None)
+        if api is not None and api.method_dict.get(method.method_type) is method:
+            del api.method_dict[method.method_type]
+    for method in diff.new_method_list:
+        if method.method_path not in api_map:
+            api = API(method.method_path, diff.path_raw_data_map[method.method_path])
+            api_map[method.method_path] = api
+            api_list.append(api)
+        api_map[method.method_path].add_method(method)
+    api_list[:] = [api for api in api_list if len(api.method_dict) > 0]
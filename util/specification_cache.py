@@ -0,0 +1,62 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+import loguru
+
+from model.operation_dependency_graph import OperationDependencyGraph
+from util.specification_loader import load_apis
+
+logger = loguru.logger
+
+
+class SpecificationCache:
+    """
+    Parsed api documents and built ODGs shared by the runs of one process.
+    A document is parsed and its graph built once, every run gets a fork of the graph.
+    Entries are keyed by path and modification time, an edited document is loaded again.
+    """
+
+    def __init__(self):
+        self.graph_map: Dict[Tuple[str, float, int], OperationDependencyGraph] = {}
+        self._lock: threading.Lock = threading.Lock()
+        # one lock per document, runs asking for different documents do not wait for each other
+        self._key_lock_map: Dict[Tuple[str, float, int], threading.Lock] = {}
+
+    @staticmethod
+    def _key(spec_path: str) -> Tuple[str, float, int]:
+        spec_path = os.path.abspath(spec_path)
+        stat = os.stat(spec_path)
+        return spec_path, stat.st_mtime, stat.st_size
+
+    def _build(self, spec_path: str) -> OperationDependencyGraph:
+        apis = load_apis(spec_path)
+        graph = OperationDependencyGraph(apis)
+        graph.build()
+        return graph
+
+    def get_graph(self, spec_path: str) -> OperationDependencyGraph:
+        """
+        :param spec_path: path of the api document
+        :return: a fork of the cached graph, owned by the caller
+        """
+        key = self._key(spec_path)
+        with self._lock:
+            key_lock = self._key_lock_map.setdefault(key, threading.Lock())
+        with key_lock:
+            graph = self.graph_map.get(key, None)
+            if graph is None:
+                logger.info(f"building odg for {spec_path}")
+                graph = self._build(spec_path)
+                with self._lock:
+                    # drop older versions of the same document
+                    for stale_key in [k for k in self.graph_map if k[0] == key[0]]:
+                        del self.graph_map[stale_key]
+                        self._key_lock_map.pop(stale_key, None)
+                    self.graph_map[key] = graph
+        return graph.fork()
+
+    def clear(self):
+        with self._lock:
+            self.graph_map.clear()
+            self._key_lock_map.clear()
@@ -0,0 +1,98 @@
+import json
+import os
+from typing import List
+
+import yaml
+from model.api import API
+from util.api_document_warpper import wrap_methods_from_open_api_document
+from util.ref_resolver import SharedRefResolver
+
+# prefer the libyaml bindings, the pure python loader dominates startup on large documents
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+try:
+    import orjson
+
+    def _load_json(file) -> dict:
+        return orjson.loads(file.read())
+
+except ImportError:
+
+    def _load_json(file) -> dict:
+        return json.load(file)
+
+
+def default_reclimit_handler(limit, parsed_url, recursions=()):
+    """Cut recursive references instead of raising prance.util.url.ResolutionError."""
+    return {
+        "type": "object",
+    }
+
+
+def load_specification(file_path: str):
+    if file_path.endswith(".yaml") or file_path.endswith(".yml"):
+        with open(file_path, "rb") as file:
+            return yaml.load(file, Loader=YAML_LOADER)
+    elif file_path.endswith(".json"):
+        with open(file_path, "rb") as file:
+            return _load_json(file)
+    else:
+        raise Exception(f"unknown file type {file_path}")
+
+
+def resolve_specification(api_document_path: str) -> dict:
+    """
+    Load the api document and resolve every reference.
+    Local references are resolved to shared objects, documents with references to other
+    files fall back to prance, which inlines a copy per reference.
+
+    :param api_document_path: str
+    :return: dict
+    """
+    specification = load_specification(api_document_path)
+    if not SharedRefResolver.has_external_references(specification):
+        resolver = SharedRefResolver(specification)
+        resolver.resolve_references()
+        return resolver.specs
+
+    # prance is only needed for documents spread over several files
+    from prance.util.fs import abspath
+    from prance.util.resolver import RefResolver
+    from prance.util.url import absurl
+
+    url = absurl(api_document_path, abspath(os.getcwd()))
+    resolver = RefResolver(
+        specification, url, recursion_limit_handler=default_reclimit_handler
+    )
+    resolver.resolve_references()
+    return resolver.specs
+
+
+def validate_specification(api_document_path: str):
+    """
+    Validate the api document against the OpenAPI schema, prance and openapi-spec-validator
+    are only imported when validation is asked for
+
+    :param api_document_path: str
+    :return: prance.ResolvingParser, raises prance.ValidationError on an invalid document
+    """
+    import prance
+
+    return prance.ResolvingParser(
+        api_document_path,
+        backend="openapi-spec-validator",
+        recursion_limit_handler=default_reclimit_handler,
+        strict=False,
+    )
+
+
+def load_apis(api_document_path: str) -> List[API]:
+    """
+    Resolve the api document and wrap its operations, parameters are parsed lazily
+
+    :param api_document_path: str
+    :return: List[API]
+    """
+    return wrap_methods_from_open_api_document(
+        resolve_specification(api_document_path)
+    )
@@ -1,5 +1,8 @@
 import threading
 import time
+from typing import Union
+
+from util.deadline import Deadline
 
 
 class TokenBucket:
@@ -27,3 +30,19 @@ class TokenBucket:
                 return True
             else:
                 return False
+
+    def acquire(self, num_tokens=1, stop_event: Union[threading.Event, Deadline] = None) -> bool:
+        """
+        Block until num_tokens are available
+
+        :param stop_event: ends the wait once it is set, or for a deadline once it is expired
+        :return: False if the wait was ended by stop_event
+        """
+        while not self.get_tokens(num_tokens):
+            with self.lock:
+                wait_time = (num_tokens - self.tokens) / self.rate
+            if stop_event is None:
+                time.sleep(wait_time)
+            elif stop_event.wait(wait_time):
+                return False
+        return True